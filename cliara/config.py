@@ -189,6 +189,12 @@ class Config:
         "llm_wizard_dismissed": False,  # True after user deliberately skips the setup wizard
         "regression_snapshots": True,  # Capture success snapshots; on failure compare and suggest ? why
         "stream_llm": True,  # Stream LLM responses token-by-token when enabled
+        # Reuse generated commands for a repeated `? query` in the same directory
+        # (persisted to nl_query_cache.json; `? ... --no-cache` forces a fresh call).
+        "nl_cache_size": 256,
+        # Remembered error translations for repeated (command, exit code, stderr).
+        "error_cache_size": 256,
+        "nl_max_concurrency": 4,  # parallel LLM requests for batch work (macro import)
         # Scrub likely secrets (API keys, tokens, inline passwords) from command
         # text before it is persisted to history.txt / semantic_history.json or
         # sent to the cloud for summarisation. Redaction is global, not just for
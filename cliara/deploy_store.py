@@ -7,11 +7,14 @@ confirmed plan is reused without re-detection.
 """
 
 import json
+import time
 from datetime import datetime, timezone
 from dataclasses import dataclass, field
 from pathlib import Path
 from typing import Optional, List, Dict
 
+from cliara.file_lock import atomic_write
+
 
 @dataclass
 class SavedDeploy:
@@ -21,8 +24,9 @@ class SavedDeploy:
     steps: List[str]
     project_name: str = ""
     framework: str = ""
-    last_deployed: str = ""           # ISO timestamp
+    last_deployed: str = ""           # ISO timestamp (display)
     deploy_count: int = 0
+    last_deployed_epoch: float = 0.0  # Unix time of last_deployed (age math)
 
     def to_dict(self) -> dict:
         return {
@@ -32,20 +36,36 @@ class SavedDeploy:
             "framework": self.framework,
             "last_deployed": self.last_deployed,
             "deploy_count": self.deploy_count,
+            "last_deployed_epoch": self.last_deployed_epoch,
         }
 
     @classmethod
     def from_dict(cls, data: dict) -> "SavedDeploy":
+        last_deployed = data.get("last_deployed", "")
+        epoch = data.get("last_deployed_epoch")
+        if epoch is None:
+            epoch = _iso_to_epoch(last_deployed)
         return cls(
             platform=data.get("platform", "unknown"),
             steps=data.get("steps", []),
             project_name=data.get("project_name", ""),
             framework=data.get("framework", ""),
-            last_deployed=data.get("last_deployed", ""),
+            last_deployed=last_deployed,
             deploy_count=data.get("deploy_count", 0),
+            last_deployed_epoch=float(epoch or 0.0),
         )
 
 
+def _iso_to_epoch(value: str) -> float:
+    """Epoch seconds for an ISO timestamp; 0.0 if empty (entries from older versions)."""
+    if not value:
+        return 0.0
+    try:
+        return datetime.fromisoformat(value).timestamp()
+    except ValueError:
+        return 0.0
+
+
 class DeployStore:
     """
     Read/write ``~/.cliara/deploys.json``.
@@ -73,10 +93,7 @@ class DeployStore:
 
     def _save(self):
         self._path.parent.mkdir(parents=True, exist_ok=True)
-        self._path.write_text(
-            json.dumps(self._data, indent=2, ensure_ascii=False) + "\n",
-            encoding="utf-8",
-        )
+        atomic_write(self._path, json.dumps(self._data, indent=2, ensure_ascii=False) + "\n")
 
     # ------------------------------------------------------------------
     # Public API
@@ -99,6 +116,38 @@ class DeployStore:
         framework: str = "",
     ):
         """Save or update deploy config for a project directory."""
+        self._put(project_dir, platform, steps, project_name, framework)
+        self._save()
+
+    def record_deploy(self, project_dir: Path):
+        """Bump deploy count and update the last-deployed timestamp."""
+        entry = self._data.get(str(project_dir.resolve()))
+        if entry is None:
+            return
+        self._bump(entry)
+        self._save()
+
+    def save_and_record(
+        self,
+        project_dir: Path,
+        platform: str,
+        steps: List[str],
+        project_name: str = "",
+        framework: str = "",
+    ):
+        """``save`` followed by ``record_deploy``, in a single file write."""
+        entry = self._put(project_dir, platform, steps, project_name, framework)
+        self._bump(entry)
+        self._save()
+
+    def _put(
+        self,
+        project_dir: Path,
+        platform: str,
+        steps: List[str],
+        project_name: str,
+        framework: str,
+    ) -> dict:
         key = str(project_dir.resolve())
         existing = self._data.get(key, {})
         entry = SavedDeploy(
@@ -108,19 +157,19 @@ class DeployStore:
             framework=framework,
             last_deployed=existing.get("last_deployed", ""),
             deploy_count=existing.get("deploy_count", 0),
-        )
-        self._data[key] = entry.to_dict()
-        self._save()
-
-    def record_deploy(self, project_dir: Path):
-        """Bump deploy count and update the last-deployed timestamp."""
-        key = str(project_dir.resolve())
-        entry = self._data.get(key)
-        if entry is None:
-            return
+            last_deployed_epoch=existing.get(
+                "last_deployed_epoch", _iso_to_epoch(existing.get("last_deployed", ""))
+            ),
+        ).to_dict()
+        self._data[key] = entry
+        return entry
+
+    @staticmethod
+    def _bump(entry: dict):
         entry["deploy_count"] = entry.get("deploy_count", 0) + 1
-        entry["last_deployed"] = datetime.now(timezone.utc).isoformat()
-        self._save()
+        now = time.time()
+        entry["last_deployed"] = datetime.fromtimestamp(now, timezone.utc).isoformat()
+        entry["last_deployed_epoch"] = now
 
     def remove(self, project_dir: Path):
         """Delete saved config for a project."""
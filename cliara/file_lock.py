@@ -5,8 +5,9 @@ Allows multiple Cliara processes to run simultaneously (like multiple PowerShell
 windows) by using file locks when reading/writing shared state files.
 """
 
+import os
 from pathlib import Path
-from typing import Optional
+from typing import Optional, Union
 
 _LOCK_TIMEOUT = 10  # seconds to wait for lock before giving up
 
@@ -34,3 +35,24 @@ def with_file_lock(file_path: Path, timeout: float = _LOCK_TIMEOUT):
 
     lock_path = _get_lock_path(file_path)
     return FileLock(lock_path, timeout=timeout)
+
+
+def atomic_write(file_path: Path, data: Union[str, bytes], fsync: bool = False) -> None:
+    """
+    Replace *file_path* with *data* (str is written as UTF-8).
+
+    The data goes to a sibling temp file that is then swapped in with
+    ``os.replace``, so a crash mid-write never leaves a truncated file.
+    Pass ``fsync=True`` when something is deleted on the strength of this
+    write having reached the disk. Callers sharing the file with other
+    Cliara processes should hold ``with_file_lock`` around the call.
+    """
+    if isinstance(data, str):
+        data = data.encode("utf-8")
+    tmp = file_path.with_name(file_path.name + ".tmp")
+    with open(tmp, "wb") as f:
+        f.write(data)
+        if fsync:
+            f.flush()
+            os.fsync(f.fileno())
+    os.replace(tmp, file_path)
@@ -4,18 +4,23 @@ Handles creation, storage, retrieval, and execution of command macros.
 """
 
 import json
+from collections import OrderedDict
 from pathlib import Path
 from typing import Dict, List, Optional, Any
 from datetime import datetime
 import getpass
 
-from cliara.storage import StorageBackend
+from cliara.storage import MacroTable, StorageBackend
 from cliara.storage.factory import get_storage_backend
 
 
 class Macro:
     """Represents a single macro."""
     
+    # One instance per stored macro (list_all/search build them in bulk).
+    __slots__ = ("name", "commands", "description", "created", "tags",
+                 "params", "run_count", "last_run")
+    
     def __init__(self, name: str, commands: List[str], description: str = "",
                  created: Optional[str] = None, tags: Optional[List[str]] = None,
                  params: Optional[List[str]] = None):
@@ -67,6 +72,11 @@ class Macro:
 
 class MacroManager:
     """Manages macro storage and operations."""
+
+    # Unknown inputs are fuzzy-matched on every prompt; remember recent answers.
+    _FUZZY_CACHE_SIZE = 128
+    # Run stats are buffered; write them out after this many unsaved runs.
+    _RUN_FLUSH_EVERY = 20
     
     def __init__(self, storage_backend: Optional[StorageBackend] = None, 
                  storage_path: Optional[Path] = None, config: Optional[Dict[str, Any]] = None):
@@ -93,6 +103,15 @@ class MacroManager:
         
         # Get current user ID (for multi-user support)
         self.user_id = self._get_user_id()
+
+        # (normalized query, threshold) -> best match; cleared whenever the
+        # set of macro names can change.
+        self._fuzzy_cache: "OrderedDict[tuple, Optional[str]]" = OrderedDict()
+
+        # Macros whose run_count/last_run changed but are not saved yet
+        # (see record_run / flush_runs).
+        self._pending_runs: Dict[str, Macro] = {}
+        self._unsaved_runs = 0
     
     def _get_user_id(self) -> Optional[str]:
         """Get current user ID."""
@@ -120,13 +139,48 @@ class MacroManager:
             Created/updated Macro object
         """
         macro = Macro(name, commands, description, tags=tags, params=params)
+        self._pending_runs.pop(name, None)
         self.storage.add(macro, user_id=self.user_id)
+        self._fuzzy_cache.clear()
         return macro
     
     def get(self, name: str) -> Optional[Macro]:
         """Get a macro by name."""
+        pending = self._pending_runs.get(name)
+        if pending is not None:
+            return pending
         return self.storage.get(name, user_id=self.user_id)
     
+    def record_run(self, macro: Macro):
+        """
+        Mark *macro* as run. The updated stats are saved in batches
+        (see flush_runs) rather than rewriting storage after every run.
+        """
+        macro.mark_run()
+        self._pending_runs[macro.name] = macro
+        self._unsaved_runs += 1
+        if self._unsaved_runs >= self._RUN_FLUSH_EVERY:
+            self.flush_runs()
+    
+    def flush_runs(self):
+        """Save run stats buffered by record_run in one batch."""
+        pending, self._pending_runs = self._pending_runs, {}
+        self._unsaved_runs = 0
+        if pending:
+            self.storage.add_many(list(pending.values()), user_id=self.user_id)
+    
+    def flush(self):
+        """Save buffered run stats and let the storage persist what it buffers.
+        
+        Called on clean shutdown.
+        """
+        self.flush_runs()
+        self.storage.flush()
+    
+    def transaction(self):
+        """Context manager grouping several writes into one storage transaction."""
+        return self.storage.transaction()
+    
     def delete(self, name: str) -> bool:
         """
         Delete a macro.
@@ -134,12 +188,20 @@ class MacroManager:
         Returns:
             True if deleted, False if not found
         """
+        self._fuzzy_cache.clear()
+        self._pending_runs.pop(name, None)
         return self.storage.delete(name, user_id=self.user_id)
     
     def list_all(self) -> Dict[str, Macro]:
         """Return all macros."""
+        self.flush_runs()
         return self.storage.list_all(user_id=self.user_id)
     
+    def list_table(self) -> MacroTable:
+        """Return all macros as a name-sorted column table (for listings)."""
+        self.flush_runs()
+        return self.storage.list_table(user_id=self.user_id)
+    
     def search(self, query: str) -> List[Macro]:
         """
         Search macros by name, description, or tags.
@@ -150,6 +212,7 @@ class MacroManager:
         Returns:
             List of matching macros
         """
+        self.flush_runs()
         return self.storage.search(query, user_id=self.user_id)
     
     def find_fuzzy(self, query: str, threshold: int = 70) -> Optional[str]:
@@ -165,22 +228,29 @@ class MacroManager:
         """
         try:
             from thefuzz import fuzz
-            
-            query_normalized = query.lower().strip()
-            best_match = None
-            best_score = threshold
-            
-            macros = self.list_all()
-            for name in macros.keys():
-                score = fuzz.ratio(query_normalized, name.lower())
-                if score > best_score:
-                    best_score = score
-                    best_match = name
-            
-            return best_match
         except ImportError:
             # Fallback to exact match if thefuzz not installed
             return query if self.exists(query) else None
+
+        query_normalized = query.lower().strip()
+        key = (query_normalized, threshold)
+        if key in self._fuzzy_cache:
+            self._fuzzy_cache.move_to_end(key)
+            return self._fuzzy_cache[key]
+
+        best_match = None
+        best_score = threshold
+
+        for name in self.list_table().names:
+            score = fuzz.ratio(query_normalized, name.lower())
+            if score > best_score:
+                best_score = score
+                best_match = name
+
+        self._fuzzy_cache[key] = best_match
+        if len(self._fuzzy_cache) > self._FUZZY_CACHE_SIZE:
+            self._fuzzy_cache.popitem(last=False)
+        return best_match
     
     def exists(self, name: str) -> bool:
         """Check if a macro exists."""
@@ -220,7 +290,9 @@ class MacroManager:
     def import_macro(self, name: str, data: Dict[str, Any]) -> Macro:
         """Import a macro from dictionary."""
         macro = Macro.from_dict(name, data)
+        self._pending_runs.pop(name, None)
         self.storage.add(macro, user_id=self.user_id)
+        self._fuzzy_cache.clear()
         return macro
 
     def update_params(self, name: str, params: List[str]) -> bool:
@@ -229,5 +301,6 @@ class MacroManager:
         if not macro:
             return False
         macro.params = params
+        self._pending_runs.pop(name, None)
         self.storage.add(macro, user_id=self.user_id)
         return True
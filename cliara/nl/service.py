@@ -11,8 +11,6 @@ import subprocess
 import time
 from pathlib import Path
 import math
-
-import numpy as np
 from shutil import which
 from typing import List, Tuple, Optional, Dict, Any, Callable, Literal
 
@@ -40,6 +38,17 @@ _PROVIDER_BASE_URLS = PROVIDER_BASE_URLS
 _PROVIDER_DEFAULT_MODELS = PROVIDER_DEFAULT_MODELS
 _STREAMING_SAFE_AGENTS = STREAMING_SAFE_AGENTS
 
+# A lone line with one of these prefixes is an explanation/error from the
+# model rather than a runnable command.
+_LLM_REFUSAL_PREFIXES = ("#", "ERROR", "Error:")
+
+
+def _is_llm_refusal(commands: List[str]) -> bool:
+    """True if *commands* is empty or just a single non-command message."""
+    return not commands or (
+        len(commands) == 1 and str(commands[0]).startswith(_LLM_REFUSAL_PREFIXES)
+    )
+
 
 def _default_session_reflect_plan() -> List[Dict[str, Any]]:
     """Backward-compatible wrapper for session_reflect default plan."""
@@ -1103,10 +1112,13 @@ class NLHandler:
         dir_listing = context.get("directory_listing", "")
         mentioned_builtins = self._mentioned_cliara_builtins(query)
 
-        prompt = f"User's request: {query}\n\nContext:\n"
+        # Session-stable lines first and the request last, so consecutive
+        # calls share the longest possible prefix (provider prompt caching).
+        prompt = "Context:\n"
         prompt += f"- Operating System: {os_name}\n"
         prompt += f"- Runtime: {runtime} interactive shell (Cliara intercepts built-ins before host shell)\n"
         prompt += f"- Host Shell: {shell}\n"
+        prompt += "- Cliara built-ins include: help, explain, push, readme, deploy, session, config, theme, setup-llm, setup-ollama, macro aliases (mc/ml/ma/mr/mh).\n"
         prompt += f"- Current Directory: {cwd}\n"
         ide = context.get("ide") or {}
         if isinstance(ide, dict):
@@ -1119,7 +1131,6 @@ class NLHandler:
                 prompt += f"- IDE workspace: {wr}\n"
             if af:
                 prompt += f"- IDE active file: {af}\n"
-        prompt += "- Cliara built-ins include: help, explain, push, readme, deploy, session, config, theme, setup-llm, setup-ollama, macro aliases (mc/ml/ma/mr/mh).\n"
 
         if mentioned_builtins:
             prompt += (
@@ -1145,6 +1156,7 @@ class NLHandler:
                 f"{git_snap}\n"
             )
 
+        prompt += f"\nUser's request: {query}\n"
         return prompt
 
     def _create_macro_prompt(self, query: str, context: dict) -> str:
@@ -1939,10 +1951,7 @@ class NLHandler:
                 commands_fb = self.generate_commands_from_nl(
                     nl_description, context_info, include_git_snapshot=True
                 )
-                if (
-                    commands_fb
-                    and not (len(commands_fb) == 1 and str(commands_fb[0]).startswith("#"))
-                ):
+                if not _is_llm_refusal(commands_fb):
                     nm = self._fallback_macro_name_from_text(nl_description)
                     return (
                         nm,
@@ -2830,6 +2839,9 @@ Command: {cmd_for_prompt}"""
         if not query_emb:
             return []
 
+        # numpy costs ~80 ms to import; only pay for it on this path.
+        import numpy as np
+
         q = np.asarray(query_emb, dtype=np.float32)
         try:
             M = np.stack(
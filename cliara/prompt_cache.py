@@ -0,0 +1,86 @@
+"""
+Prompt cache for NL macro creation.
+
+Remembers the commands saved for a natural-language macro description
+in ~/.cliara/nl_macro_cache.json so a repeated request can skip the LLM
+round-trip. Only an exact (whitespace/case-normalized) repeat is reused:
+paraphrases like "older than 7 days" / "older than 30 days" differ in the
+details that matter. Entries are only ever reused within the same context
+(cwd + os + shell), so commands never bleed across shells or platforms.
+"""
+
+import hashlib
+from pathlib import Path
+from typing import Any, Dict, List, Optional
+
+from cliara.result_cache import ResultCache
+
+
+def context_hash(context: Dict[str, str]) -> str:
+    """Stable hash of the fields that change what a command means."""
+    raw = "\x1f".join(
+        (context.get("cwd", ""), context.get("os", ""), context.get("shell", ""))
+    )
+    return hashlib.sha256(raw.encode("utf-8", errors="replace")).hexdigest()
+
+
+def _norm_text(text: str) -> str:
+    return " ".join((text or "").lower().split())
+
+
+def _valid_entry(value: Any) -> bool:
+    return (
+        isinstance(value, dict)
+        and isinstance(value.get("commands"), list)
+        and bool(value["commands"])
+    )
+
+
+class PromptCache:
+    """
+    Saved (description, context) -> commands, kept in a ResultCache. Keys
+    are hashed, so the file holds no description text.
+    """
+
+    def __init__(self, store_path: Optional[Path] = None, max_entries: int = 200):
+        self._cache = ResultCache(
+            store_path or (Path.home() / ".cliara" / "nl_macro_cache.json"),
+            max(1, max_entries),
+            validate=_valid_entry,
+        )
+
+    @staticmethod
+    def _key(norm: str, ctx_hash: str) -> str:
+        raw = f"{ctx_hash}\x1f{norm}"
+        return hashlib.blake2b(raw.encode("utf-8", "replace"), digest_size=16).hexdigest()
+
+    def lookup(self, text: str, ctx_hash: str) -> Optional[List[str]]:
+        """Return cached commands for *text* in context *ctx_hash*, or None."""
+        norm = _norm_text(text)
+        if not norm:
+            return None
+        entry = self._cache.get(self._key(norm, ctx_hash))
+        return list(entry["commands"]) if entry else None
+
+    def add(
+        self,
+        text: str,
+        ctx_hash: str,
+        commands: List[str],
+        macro_name: str = "",
+    ) -> None:
+        """Remember *commands* for *text* in context *ctx_hash*."""
+        norm = _norm_text(text)
+        if not commands or not norm:
+            return
+        self._cache.put(
+            self._key(norm, ctx_hash),
+            {"commands": list(commands), "macro": macro_name},
+        )
+        # Only user-confirmed saves land here, so they are rare; keep them.
+        self._cache.flush()
+
+    def forget_macro(self, macro_name: str) -> None:
+        """Drop entries that produced *macro_name* (called when the macro is deleted)."""
+        self._cache.discard(lambda value: value.get("macro") == macro_name)
+        self._cache.flush()
@@ -0,0 +1,140 @@
+"""
+Persistent LRU cache for LLM results.
+
+Keeps recently used ``key -> value`` pairs in memory (most recently used
+last) and writes them to a small JSON file under ~/.cliara when flushed:
+on exit, and every few new entries so a crash loses little. A flush merges
+into what is on disk, so concurrent Cliara sessions keep each other's
+entries. Lookups never touch the disk.
+"""
+
+import json
+import threading
+from collections import OrderedDict
+from pathlib import Path
+from typing import Any, Callable, List, Optional
+
+from cliara.file_lock import atomic_write, with_file_lock
+
+
+# put() flushes once this many entries are waiting to be written.
+_FLUSH_EVERY = 16
+
+
+class ResultCache:
+    """
+    Bounded LRU of JSON-serializable values, persisted as ``[[key, value], ...]``
+    (oldest first). *max_entries* <= 0 disables the cache entirely.
+    """
+
+    def __init__(
+        self,
+        store_path: Path,
+        max_entries: int = 256,
+        validate: Optional[Callable[[Any], bool]] = None,
+    ):
+        self._path = store_path
+        try:
+            self._max_entries = max(0, int(max_entries or 0))
+        except (TypeError, ValueError):
+            self._max_entries = 0
+        self._validate = validate or (lambda _value: True)
+        self._entries: "OrderedDict[str, Any]" = OrderedDict()
+        # Entries put since the last flush, in insertion order, and discard()
+        # predicates still to be applied to the rows on disk.
+        self._pending: "OrderedDict[str, Any]" = OrderedDict()
+        self._discards: List[Callable[[Any], bool]] = []
+        self._lock = threading.Lock()
+        self._load()
+
+    @property
+    def enabled(self) -> bool:
+        return self._max_entries > 0
+
+    def _load(self) -> None:
+        """Load from disk. Treat missing or malformed file as empty."""
+        if not self.enabled or not self._path.exists():
+            return
+        try:
+            with with_file_lock(self._path):
+                self._entries = self._read_rows()
+        except Exception:
+            return
+
+    def _read_rows(self) -> "OrderedDict[str, Any]":
+        """Valid rows currently on disk, oldest first. Caller holds the file lock."""
+        entries: "OrderedDict[str, Any]" = OrderedDict()
+        try:
+            rows = json.loads(self._path.read_text(encoding="utf-8"))
+        except (OSError, ValueError):
+            return entries
+        if not isinstance(rows, list):
+            return entries
+        for row in rows[-self._max_entries:]:
+            if (
+                isinstance(row, list)
+                and len(row) == 2
+                and isinstance(row[0], str)
+                and self._validate(row[1])
+            ):
+                entries[row[0]] = row[1]
+        return entries
+
+    def get(self, key: str) -> Optional[Any]:
+        """Return the cached value for *key* (marking it recently used), or None."""
+        with self._lock:
+            value = self._entries.get(key)
+            if value is not None:
+                self._entries.move_to_end(key)
+            return value
+
+    def put(self, key: str, value: Any) -> None:
+        """Store *value* under *key*, evicting the least recently used entries."""
+        if not self.enabled:
+            return
+        with self._lock:
+            self._entries[key] = value
+            self._entries.move_to_end(key)
+            while len(self._entries) > self._max_entries:
+                self._entries.popitem(last=False)
+            self._pending[key] = value
+            self._pending.move_to_end(key)
+            due = len(self._pending) >= _FLUSH_EVERY
+        if due:
+            self.flush()
+
+    def discard(self, predicate: Callable[[Any], bool]) -> None:
+        """Drop every entry whose value matches *predicate*, here and (on the
+        next flush) in the file, including rows other processes wrote."""
+        with self._lock:
+            for entries in (self._entries, self._pending):
+                for key in [k for k, v in entries.items() if predicate(v)]:
+                    del entries[key]
+            self._discards.append(predicate)
+
+    def flush(self) -> None:
+        """Merge entries added since the last flush into the file on disk.
+
+        Rows written meanwhile by other Cliara processes are kept (unless
+        discarded); ours count as the most recently used.
+        """
+        with self._lock:
+            if not self._pending and not self._discards:
+                return
+            pending, self._pending = self._pending, OrderedDict()
+            discards, self._discards = self._discards, []
+        try:
+            self._path.parent.mkdir(parents=True, exist_ok=True)
+            with with_file_lock(self._path):
+                merged = self._read_rows()
+                for key in [k for k, v in merged.items() if any(d(v) for d in discards)]:
+                    del merged[key]
+                for key, value in pending.items():
+                    merged[key] = value
+                    merged.move_to_end(key)
+                while len(merged) > self._max_entries:
+                    merged.popitem(last=False)
+                rows = [[k, v] for k, v in merged.items()]
+                atomic_write(self._path, json.dumps(rows, ensure_ascii=False))
+        except OSError:
+            pass
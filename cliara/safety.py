@@ -3,6 +3,7 @@ Safety checks for potentially dangerous commands.
 Enhanced version for Cliara with better detection and warnings.
 """
 
+import functools
 import re
 from typing import List, Tuple, Dict, Optional
 from enum import Enum
@@ -67,16 +68,39 @@ DANGER_PATTERNS = {
 }
 
 
+_LEVEL_RANK = {
+    DangerLevel.SAFE: 0,
+    DangerLevel.CAUTION: 1,
+    DangerLevel.DANGEROUS: 2,
+    DangerLevel.CRITICAL: 3,
+}
+
+# Most severe first: once a stage matches a level, lower levels can't raise it.
+_CHECK_ORDER = (DangerLevel.CRITICAL, DangerLevel.DANGEROUS, DangerLevel.CAUTION)
+
+# Compiled once at import and shared by every SafetyChecker.
+_COMPILED_PATTERNS = {
+    level: [re.compile(pattern, re.IGNORECASE) for pattern in patterns]
+    for level, patterns in DANGER_PATTERNS.items()
+}
+
+# One alternation per level: a single regex scan decides whether any pattern
+# of that level matches; the individual patterns are only consulted on a hit
+# (to report which one matched), which keeps the common SAFE path cheap.
+_COMBINED_PATTERNS = {
+    level: re.compile("|".join(f"(?:{p})" for p in patterns), re.IGNORECASE)
+    for level, patterns in DANGER_PATTERNS.items()
+}
+
+
 class SafetyChecker:
     """Checks commands for potentially dangerous operations."""
     
+    __slots__ = ("compiled_patterns",)
+    
     def __init__(self):
         """Initialize safety checker with compiled patterns."""
-        self.compiled_patterns = {}
-        for level, patterns in DANGER_PATTERNS.items():
-            self.compiled_patterns[level] = [
-                re.compile(pattern, re.IGNORECASE) for pattern in patterns
-            ]
+        self.compiled_patterns = _COMPILED_PATTERNS
     
     # Split tokens: pipe, semicolon, &&, ||, command-substitution openers.
     # We intentionally keep this simple (no full shell parser) — false negatives
@@ -105,23 +129,35 @@ class SafetyChecker:
         constructs like ``find . -name '*.bak' | xargs rm -rf`` are correctly
         classified as DANGEROUS rather than SAFE.
         """
-        stages = self._split_pipeline_stages(command)
+        return self._scan_command(command)
+
+    # The patterns are fixed at import, so a command's result never changes;
+    # explain -> edit -> explain loops and re-runs hit the cache.
+    @staticmethod
+    @functools.lru_cache(maxsize=256)
+    def _scan_command(command: str) -> Tuple[DangerLevel, Optional[str]]:
+        stages = SafetyChecker._split_pipeline_stages(command)
         if not stages:
             stages = [command]
 
         highest = DangerLevel.SAFE
         matched_pattern: Optional[str] = None
-        level_order = [DangerLevel.SAFE, DangerLevel.CAUTION,
-                       DangerLevel.DANGEROUS, DangerLevel.CRITICAL]
 
         for stage in stages:
-            for level in [DangerLevel.CRITICAL, DangerLevel.DANGEROUS, DangerLevel.CAUTION]:
-                for pattern in self.compiled_patterns[level]:
+            for level in _CHECK_ORDER:
+                if _LEVEL_RANK[level] <= _LEVEL_RANK[highest]:
+                    break  # nothing left in this stage could raise the level
+                if not _COMBINED_PATTERNS[level].search(stage):
+                    continue
+                for pattern in _COMPILED_PATTERNS[level]:
                     if pattern.search(stage):
-                        if level_order.index(level) > level_order.index(highest):
-                            highest = level
-                            matched_pattern = pattern.pattern
-                        break  # one match per level per stage is enough
+                        highest = level
+                        matched_pattern = pattern.pattern
+                        break
+                break  # one match per stage is enough
+
+            if highest is DangerLevel.CRITICAL:
+                break
 
         return highest, matched_pattern
     
@@ -138,6 +174,13 @@ class SafetyChecker:
         highest_level = DangerLevel.SAFE
         dangerous_commands = []
         
+        # Scan all commands at once first. Joining can only add spurious hits
+        # (a pattern spanning two commands), never hide one, so a miss on
+        # every level means every command is SAFE.
+        joined = "\n".join(commands)
+        if not any(_COMBINED_PATTERNS[level].search(joined) for level in _CHECK_ORDER):
+            return highest_level, dangerous_commands
+        
         for cmd in commands:
             level, pattern = self.check_command(cmd)
             
@@ -145,9 +188,7 @@ class SafetyChecker:
                 dangerous_commands.append((cmd, pattern or "unknown"))
                 
                 # Update highest level
-                level_order = [DangerLevel.SAFE, DangerLevel.CAUTION, 
-                              DangerLevel.DANGEROUS, DangerLevel.CRITICAL]
-                if level_order.index(level) > level_order.index(highest_level):
+                if _LEVEL_RANK[level] > _LEVEL_RANK[highest_level]:
                     highest_level = level
         
         return highest_level, dangerous_commands
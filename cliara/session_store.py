@@ -8,12 +8,14 @@ structured summary and suggested next step. Sessions are keyed by
 """
 
 import json
+import os
 import subprocess
+from collections import OrderedDict
 import uuid
 from datetime import datetime, timezone
 from dataclasses import dataclass, field
 from pathlib import Path
-from typing import Any, Callable, Dict, List, Optional
+from typing import Any, Callable, Dict, List, Optional, Tuple
 
 from cliara.file_lock import with_file_lock
 
@@ -244,8 +246,24 @@ class TaskSession:
         return self.updated
 
 
+# Env vars that change how git discovers the repository; when any is set the
+# filesystem walk in _get_project_root defers to git itself.
+_GIT_DISCOVERY_ENV = ("GIT_DIR", "GIT_WORK_TREE", "GIT_CEILING_DIRECTORIES")
+
+
 def _get_project_root(cwd: Path) -> Optional[str]:
     """Return git root for cwd, or None if not in a repo."""
+    if not any(os.environ.get(k) for k in _GIT_DISCOVERY_ENV):
+        # One stat per ancestor instead of forking git. ``.git`` may be a
+        # directory or, for worktrees/submodules, a file.
+        cur = os.path.realpath(cwd)
+        while True:
+            if os.path.exists(os.path.join(cur, ".git")):
+                return cur
+            parent = os.path.dirname(cur)
+            if parent == cur:
+                return None
+            cur = parent
     try:
         r = subprocess.run(
             ["git", "rev-parse", "--show-toplevel"],
@@ -282,6 +300,42 @@ def _get_branch(cwd: Path) -> Optional[str]:
     return None
 
 
+# cwd -> (project_root, branch, stamp). The stamp is the mtime of the repo's
+# .git/HEAD (or of cwd itself outside a repo), so a checkout or `git init`
+# invalidates the entry with a stat instead of two git forks per command.
+_ROOT_CACHE: "OrderedDict[str, Tuple[Optional[str], Optional[str], float]]" = OrderedDict()
+_ROOT_CACHE_MAX = 64
+
+
+def _repo_stamp(cwd: str, root: Optional[str]) -> Optional[float]:
+    """Return the invalidation stamp for *cwd*, or None when it cannot be cached."""
+    try:
+        if root:
+            return os.stat(os.path.join(root, ".git", "HEAD")).st_mtime
+        return os.stat(cwd).st_mtime
+    except OSError:
+        # Worktrees/submodules keep HEAD elsewhere; always ask git.
+        return None
+
+
+def _cached_root_and_branch(cwd: str) -> Tuple[Optional[str], Optional[str]]:
+    """Return (project_root, branch) for *cwd*, reusing results until HEAD moves."""
+    entry = _ROOT_CACHE.get(cwd)
+    if entry is not None and _repo_stamp(cwd, entry[0]) == entry[2]:
+        _ROOT_CACHE.move_to_end(cwd)
+        return entry[0], entry[1]
+
+    root = _get_project_root(Path(cwd))
+    branch = _get_branch(Path(cwd)) if root else None
+    stamp = _repo_stamp(cwd, root)
+    if stamp is not None:
+        _ROOT_CACHE[cwd] = (root, branch, stamp)
+        _ROOT_CACHE.move_to_end(cwd)
+        while len(_ROOT_CACHE) > _ROOT_CACHE_MAX:
+            _ROOT_CACHE.popitem(last=False)
+    return root, branch
+
+
 def _session_key(name: str, project_root: Optional[str]) -> str:
     """Unique key for a session: name + project root (or 'global' if no repo)."""
     root = (project_root or "").strip() or "global"
@@ -400,42 +454,84 @@ class SessionStore:
         parent_id: Optional[str] = None,
         stderr_preview: Optional[str] = None,
         stdout_preview: Optional[str] = None,
+        entry_id: Optional[str] = None,
+        timestamp: Optional[str] = None,
     ) -> Optional[str]:
         """Append a command to the session and update cwds/branch/updated.
         Returns the new command's id, or None if session not found."""
         holder: List[Optional[str]] = [None]
 
         def _apply():
-            session = self.get_by_id(session_id)
-            if session is None:
-                return
-            now = datetime.now(timezone.utc).isoformat()
-            entry_id = str(uuid.uuid4())
-            entry = CommandEntry(
+            holder[0] = self._append_command_unlocked(
+                session_id,
                 command=command,
                 cwd=cwd,
                 exit_code=exit_code,
-                timestamp=now,
-                id=entry_id,
+                branch=branch,
+                project_root=project_root,
                 parent_id=parent_id,
                 stderr_preview=stderr_preview,
                 stdout_preview=stdout_preview,
+                entry_id=entry_id,
+                timestamp=timestamp,
             )
-            session.commands.append(entry)
-            if cwd and cwd not in session.cwds:
-                session.cwds.append(cwd)
-            if branch is not None:
-                session.branch = branch
-            if project_root is not None:
-                session.project_root = project_root
-            session.updated = now
-            key = _session_key(session.name, session.project_root)
-            self._data[key] = session.to_dict()
-            holder[0] = entry_id
 
         self._mutate(_apply)
         return holder[0]
 
+    def add_commands(self, items: List[Dict[str, Any]]) -> None:
+        """Append several commands (each a dict of add_command kwargs) in one write."""
+        if not items:
+            return
+
+        def _apply():
+            for item in items:
+                self._append_command_unlocked(**item)
+
+        self._mutate(_apply)
+
+    def _append_command_unlocked(
+        self,
+        session_id: str,
+        command: str,
+        cwd: str,
+        exit_code: int,
+        branch: Optional[str] = None,
+        project_root: Optional[str] = None,
+        parent_id: Optional[str] = None,
+        stderr_preview: Optional[str] = None,
+        stdout_preview: Optional[str] = None,
+        entry_id: Optional[str] = None,
+        timestamp: Optional[str] = None,
+    ) -> Optional[str]:
+        """Apply one add_command to ``_data`` (caller must hold the store lock)."""
+        session = self.get_by_id(session_id)
+        if session is None:
+            return None
+        now = timestamp or datetime.now(timezone.utc).isoformat()
+        entry_id = entry_id or str(uuid.uuid4())
+        entry = CommandEntry(
+            command=command,
+            cwd=cwd,
+            exit_code=exit_code,
+            timestamp=now,
+            id=entry_id,
+            parent_id=parent_id,
+            stderr_preview=stderr_preview,
+            stdout_preview=stdout_preview,
+        )
+        session.commands.append(entry)
+        if cwd and cwd not in session.cwds:
+            session.cwds.append(cwd)
+        if branch is not None:
+            session.branch = branch
+        if project_root is not None:
+            session.project_root = project_root
+        session.updated = now
+        key = _session_key(session.name, session.project_root)
+        self._data[key] = session.to_dict()
+        return entry_id
+
     def get_last_command_id(self, session_id: str) -> Optional[str]:
         """Return the id of the last command in the session, or None."""
         session = self.get_by_id(session_id)
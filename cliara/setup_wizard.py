@@ -176,6 +176,7 @@ def _apply_env_and_reinit(
                     reachable (e.g. auto_detect_ollama) to avoid a second probe.
     """
     os.environ[env_var] = key
+    shell._refresh_child_env()
     # Persist choice so OLLAMA_BASE_URL in ~/.cliara/.env does not shadow this provider.
     shell.config.settings["llm_provider"] = provider_id
 
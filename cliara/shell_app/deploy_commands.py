@@ -1,28 +1,39 @@
 """Deploy command mixin for Cliara shell."""
 
-import os
-import platform
 import re
 import subprocess
+import time
 from pathlib import Path
-from typing import Optional
+from typing import List, Optional, Tuple
 
 from cliara.deploy_detector import DeployPlan, detect_all as detect_deploy_targets
 from cliara import deploy_publish
+from cliara.nl.service import _is_llm_refusal
 from cliara.deploy_prereqs import (
     docker_daemon_running,
     get_requirements,
     is_authenticated,
 )
 from cliara.safety import DangerLevel
+from cliara.session_store import _get_project_root
 from cliara.shell_app.runtime import (
+    buffered_output,
     print_dim,
     print_error,
     print_info,
+    print_plain,
     print_success,
     print_warning,
 )
 
+# Prompt text and accepted answers shared by the deploy confirmations.
+_PROMPT_CONTINUE_YEN = "  Continue? (y)es / (e)dit / (n)o: "
+_PROMPT_CONTINUE_YERN = "  Continue? (y)es / (e)dit / (r)edetect / (n)o: "
+_YES = frozenset(("y", "yes"))
+_EDIT = frozenset(("e", "edit"))
+_REDETECT = frozenset(("r", "redetect"))
+_YES_OR_EDIT = _YES | _EDIT
+
 
 class DeployCommandMixin:
     """Deploy command handlers and helpers mixed into CliaraShell."""
@@ -95,45 +106,40 @@ class DeployCommandMixin:
                 return
             plan.steps = steps
 
-        # "?"? 5. Save config for next time "?"?
-        self.deploy_store.save(
+        # "?"? 5. Execute, saving the config for next time "?"?
+        self._deploy_execute(
             cwd,
-            platform=plan.platform,
-            steps=plan.steps,
-            project_name=plan.project_name,
-            framework=plan.framework,
+            plan.steps,
+            plan.platform,
+            save_config={
+                "platform": plan.platform,
+                "steps": plan.steps,
+                "project_name": plan.project_name,
+                "framework": plan.framework,
+            },
         )
 
-        # "?"? 6. Execute "?"?
-        self._deploy_execute(cwd, plan.steps, plan.platform)
-
     # -- Saved config flow ---------------------------------------------------
 
     def _deploy_from_saved(self, cwd: Path, saved):
         """Run a previously saved deploy config."""
         # Time-since-last-deploy hint
         age_hint = ""
-        if saved.last_deployed:
-            try:
-                from datetime import datetime, timezone
-                last = datetime.fromisoformat(saved.last_deployed)
-                delta = datetime.now(timezone.utc) - last
-                if delta.days > 0:
-                    age_hint = f"{delta.days}d ago"
-                elif delta.seconds >= 3600:
-                    age_hint = f"{delta.seconds // 3600}h ago"
-                else:
-                    age_hint = f"{delta.seconds // 60}m ago"
-            except Exception:
-                pass
+        if saved.last_deployed_epoch:
+            delta_s = max(0, int(time.time() - saved.last_deployed_epoch))
+            if delta_s >= 86400:
+                age_hint = f"{delta_s // 86400}d ago"
+            elif delta_s >= 3600:
+                age_hint = f"{delta_s // 3600}h ago"
+            else:
+                age_hint = f"{delta_s // 60}m ago"
 
         platform_label = saved.platform.title()
         if saved.framework:
             platform_label += f" ({saved.framework})"
 
         count_label = f"deployed {saved.deploy_count} time(s)" if saved.deploy_count else "never deployed"
-        time_label = f"last: {age_hint}" if age_hint else ""
-        meta = ", ".join(filter(None, [count_label, time_label]))
+        meta = f"{count_label}, last: {age_hint}" if age_hint else count_label
 
         print_info(f"\n[Cliara] Deploy to {platform_label}  ({meta})")
         print()
@@ -142,34 +148,35 @@ class DeployCommandMixin:
         print()
 
         try:
-            response = input(
-                "  Continue? (y)es / (e)dit / (r)edetect / (n)o: "
-            ).strip().lower()
+            response = input(_PROMPT_CONTINUE_YERN).strip().lower()
         except (EOFError, KeyboardInterrupt):
             print()
             return
 
-        if response in ("r", "redetect"):
+        if response in _REDETECT:
             self.deploy_store.remove(cwd)
             print_dim("  Saved config cleared  -  re-detecting...\n")
             self.handle_deploy()
             return
 
-        if response in ("e", "edit"):
+        if response in _EDIT:
             steps = self._deploy_edit_steps(saved.steps)
             if steps is None:
                 return
-            self.deploy_store.save(
+            self._deploy_execute(
                 cwd,
-                platform=saved.platform,
-                steps=steps,
-                project_name=saved.project_name,
-                framework=saved.framework,
+                steps,
+                saved.platform,
+                save_config={
+                    "platform": saved.platform,
+                    "steps": steps,
+                    "project_name": saved.project_name,
+                    "framework": saved.framework,
+                },
             )
-            self._deploy_execute(cwd, steps, saved.platform)
             return
 
-        if response not in ("y", "yes"):
+        if response not in _YES:
             print_warning("  [Cancelled]")
             return
 
@@ -185,15 +192,15 @@ class DeployCommandMixin:
 
         # Preflight may rewrite steps (e.g. resolving a Docker registry), so
         # run what the plan holds now, not the original saved list.
+        save_config = None
         if plan.steps != saved.steps:
-            self.deploy_store.save(
-                cwd,
-                platform=saved.platform,
-                steps=plan.steps,
-                project_name=saved.project_name,
-                framework=saved.framework,
-            )
-        self._deploy_execute(cwd, plan.steps, saved.platform)
+            save_config = {
+                "platform": saved.platform,
+                "steps": plan.steps,
+                "project_name": saved.project_name,
+                "framework": saved.framework,
+            }
+        self._deploy_execute(cwd, plan.steps, saved.platform, save_config=save_config)
 
     # -- Multiple targets ----------------------------------------------------
 
@@ -255,15 +262,11 @@ class DeployCommandMixin:
             return
 
         print_dim("\n  Generating deploy steps...\n")
-        context = {
-            "cwd": str(cwd),
-            "os": platform.system(),
-            "shell": self.shell_path or os.environ.get("SHELL", "bash"),
-        }
+        context = self._build_nl_context(cwd)
         # deploy agent returns JSON  -  do not stream raw JSON to the console
         commands = self.nl_handler.generate_deploy_steps(description, context, stream_callback=None)
 
-        if not commands or (len(commands) == 1 and commands[0].startswith("#")):
+        if _is_llm_refusal(commands):
             print_error("  Could not generate deploy steps.")
             return
 
@@ -280,12 +283,12 @@ class DeployCommandMixin:
             print()
             return
 
-        if response in ("e", "edit"):
+        if response in _EDIT:
             commands = self._deploy_edit_steps(commands)
             if commands is None:
                 return
 
-        if response not in ("y", "yes", "e", "edit"):
+        if response not in _YES_OR_EDIT:
             print_warning("  [Cancelled]")
             return
 
@@ -298,7 +301,7 @@ class DeployCommandMixin:
             print()
             save_resp = "n"
 
-        if save_resp in ("y", "yes"):
+        if save_resp in _YES:
             self.deploy_store.save(
                 cwd,
                 platform="custom",
@@ -316,13 +319,10 @@ class DeployCommandMixin:
         Run sanity checks before deploying.
         Returns True if OK to proceed, False to abort.
         """
+        git_state = self._deploy_git_state(cwd)
+
         # Check for uncommitted changes
-        result = subprocess.run(
-            ["git", "status", "--porcelain"],
-            capture_output=True, text=True, encoding="utf-8", errors="replace",
-            cwd=str(cwd),
-        )
-        if result.returncode == 0 and result.stdout.strip():
+        if git_state is not None and git_state[0]:
             print_warning(
                 "\n  [Warning] You have uncommitted changes."
             )
@@ -333,18 +333,13 @@ class DeployCommandMixin:
             except (EOFError, KeyboardInterrupt):
                 print()
                 return False
-            if resp in ("y", "yes"):
+            if resp in _YES:
                 self.handle_push()
                 print()
 
         # Check branch (warn if not main/master)
-        result = subprocess.run(
-            ["git", "branch", "--show-current"],
-            capture_output=True, text=True, encoding="utf-8", errors="replace",
-            cwd=str(cwd),
-        )
-        if result.returncode == 0:
-            branch = result.stdout.strip()
+        if git_state is not None:
+            branch = git_state[1]
             if branch and branch not in ("main", "master"):
                 print_warning(
                     f"\n  [Warning] You're on branch '{branch}', not main/master."
@@ -356,7 +351,7 @@ class DeployCommandMixin:
                 except (EOFError, KeyboardInterrupt):
                     print()
                     return False
-                if resp not in ("y", "yes"):
+                if resp not in _YES:
                     print_warning("  [Cancelled]")
                     return False
 
@@ -367,6 +362,67 @@ class DeployCommandMixin:
 
         return True
 
+    def _deploy_git_state(self, cwd: Path) -> Optional[Tuple[bool, str]]:
+        """
+        Return (has_uncommitted_changes, branch) from one ``git status
+        --porcelain --branch`` call, or None outside a git repo. Results are
+        reused for a couple of seconds so one deploy flow forks git once.
+        """
+        key = str(cwd)
+        now = time.monotonic()
+        cache = self._git_state_cache
+        hit = cache.get(key)
+        if hit is not None and now - hit[0] < 2.0:
+            return hit[1]
+
+        state: Optional[Tuple[bool, str]] = None
+        # Not inside a work tree (no .git here or in any parent): skip the
+        # fork, which would only fail.
+        if _get_project_root(cwd) is None:
+            cache[key] = (now, state)
+            return state
+        try:
+            result = subprocess.run(
+                ["git", "status", "--porcelain=v2", "-z", "--branch"],
+                capture_output=True, text=True, encoding="utf-8", errors="replace",
+                cwd=key,
+            )
+        except Exception:
+            result = None
+        if result is not None and result.returncode == 0:
+            branch, changes = self._parse_status_branch(result.stdout)
+            state = (bool(changes), branch)
+
+        cache[key] = (now, state)
+        return state
+
+    # Fields before the path in each `git status --porcelain=v2` entry type.
+    _STATUS_V2_FIELDS = {"1": 8, "2": 9, "u": 10, "?": 1, "!": 1}
+
+    @staticmethod
+    def _parse_status_branch(output: str) -> Tuple[str, List[str]]:
+        """
+        Parse ``git status --porcelain=v2 -z --branch`` output into
+        (branch, changed paths). *branch* is "" on a detached HEAD.
+        """
+        branch = ""
+        paths: List[str] = []
+        tokens = iter(output.split("\0"))
+        for entry in tokens:
+            if entry.startswith("# branch.head "):
+                head = entry[len("# branch.head "):]
+                branch = "" if head == "(detached)" else head
+                continue
+            n = DeployCommandMixin._STATUS_V2_FIELDS.get(entry[:1])
+            if n is None or entry[1:2] != " ":
+                continue
+            parts = entry.split(" ", n)
+            if len(parts) > n:
+                paths.append(parts[n])
+            if entry[0] == "2":
+                next(tokens, None)  # rename/copy: the original path follows
+        return branch, paths
+
     # -- Prerequisite preflight ----------------------------------------------
 
     def _deploy_yn(self, prompt: str) -> bool:
@@ -376,7 +432,7 @@ class DeployCommandMixin:
         except (EOFError, KeyboardInterrupt):
             print()
             return False
-        return resp in ("y", "yes")
+        return resp in _YES
 
     def _deploy_preflight(self, cwd: Path, plan: DeployPlan) -> bool:
         """
@@ -634,19 +690,20 @@ class DeployCommandMixin:
 
     def _deploy_show_plan(self, plan: DeployPlan, cwd: Path):
         """Print the detected deploy plan."""
-        print_info(f"\n[Cliara] Deploy detected for this project:\n")
-        print(f"  Platform:  {plan.platform.title()}")
-        if plan.project_name:
-            print(f"  Project:   {plan.project_name}")
-        if plan.framework:
-            print(f"  Framework: {plan.framework}")
-        if plan.detected_from:
-            print(f"  Detected:  {plan.detected_from}")
-        print()
-        print_dim("  Steps:")
-        for i, step in enumerate(plan.steps, 1):
-            print(f"    {i}. {step}")
-        print()
+        with buffered_output():
+            print_info(f"\n[Cliara] Deploy detected for this project:\n")
+            print_plain(f"  Platform:  {plan.platform.title()}")
+            if plan.project_name:
+                print_plain(f"  Project:   {plan.project_name}")
+            if plan.framework:
+                print_plain(f"  Framework: {plan.framework}")
+            if plan.detected_from:
+                print_plain(f"  Detected:  {plan.detected_from}")
+            print_plain()
+            print_dim("  Steps:")
+            for i, step in enumerate(plan.steps, 1):
+                print_plain(f"    {i}. {step}")
+            print_plain()
 
     def _deploy_confirm(self) -> Optional[str]:
         """
@@ -654,16 +711,14 @@ class DeployCommandMixin:
         Returns 'yes', 'edit', or None for cancel.
         """
         try:
-            response = input(
-                "  Continue? (y)es / (e)dit / (n)o: "
-            ).strip().lower()
+            response = input(_PROMPT_CONTINUE_YEN).strip().lower()
         except (EOFError, KeyboardInterrupt):
             print()
             return None
 
-        if response in ("y", "yes"):
+        if response in _YES:
             return "yes"
-        if response in ("e", "edit"):
+        if response in _EDIT:
             return "edit"
 
         print_warning("  [Cancelled]")
@@ -674,21 +729,16 @@ class DeployCommandMixin:
         print_dim(
             "\n  Edit steps (one command per line, empty line to finish):"
         )
-        new_steps = []
-        for i, step in enumerate(steps, 1):
+        new_steps = list(steps)
+        for i, step in enumerate(steps):
             try:
-                edited = input(f"  [{i}]: ").strip()
+                edited = input(f"  [{i + 1}]: ").strip()
             except (EOFError, KeyboardInterrupt):
                 print()
                 return None
             # If user just presses Enter, keep the original
-            if not edited:
-                # But if they entered nothing on a *new* slot, stop
-                if i > len(steps):
-                    break
-                new_steps.append(step)
-            else:
-                new_steps.append(edited)
+            if edited:
+                new_steps[i] = edited
 
         # Allow adding extra steps
         extra_idx = len(steps) + 1
@@ -712,10 +762,45 @@ class DeployCommandMixin:
 
     # -- Execution -----------------------------------------------------------
 
-    def _deploy_execute(self, cwd: Path, steps: list, platform_name: str):
-        """Execute each deploy step sequentially with progress feedback."""
-        total = len(steps)
+    def _deploy_execute(
+        self,
+        cwd: Path,
+        steps: list,
+        platform_name: str,
+        save_config: Optional[dict] = None,
+    ):
+        """
+        Execute each deploy step sequentially with progress feedback.
+
+        *save_config* holds ``DeployStore.save`` keyword arguments for a
+        config to persist; it is written together with the deploy record
+        so a successful run costs one write to deploys.json, not two.  A
+        failed or interrupted (Ctrl+C) run still saves it.
+        """
         print()
+        completed = False
+        try:
+            completed = self._deploy_run_steps(cwd, steps)
+        finally:
+            if save_config is not None and not completed:
+                self.deploy_store.save(cwd, **save_config)
+
+        if completed:
+            if save_config is not None:
+                self.deploy_store.save_and_record(cwd, **save_config)
+            else:
+                self.deploy_store.record_deploy(cwd)
+            print_success(
+                f"\n[Cliara] Deploy complete! ({platform_name.title()})"
+            )
+        else:
+            print_warning(
+                "\n[Cliara] Deploy did not complete successfully."
+            )
+
+    def _deploy_run_steps(self, cwd: Path, steps: list) -> bool:
+        """Run the deploy steps in order; True if every step succeeded."""
+        total = len(steps)
         all_ok = True
 
         for i, step in enumerate(steps, 1):
@@ -743,22 +828,14 @@ class DeployCommandMixin:
                     print()
                     all_ok = False
                     break
-                if resp not in ("y", "yes"):
+                if resp not in _YES:
                     all_ok = False
                     break
                 all_ok = False
             else:
                 all_ok = False
 
-        if all_ok:
-            self.deploy_store.record_deploy(cwd)
-            print_success(
-                f"\n[Cliara] Deploy complete! ({platform_name.title()})"
-            )
-        else:
-            print_warning(
-                "\n[Cliara] Deploy did not complete successfully."
-            )
+        return all_ok
 
     def _deploy_diagnose_failure(self, cwd: Path, step: str) -> bool:
         """
@@ -773,20 +850,15 @@ class DeployCommandMixin:
         if not stderr:
             return False
 
-        context = {
-            "cwd": str(cwd),
-            "os": platform.system(),
-            "shell": self.shell_path or os.environ.get("SHELL", "bash"),
-        }
+        context = self._build_nl_context(cwd)
 
         print_dim("  Analyzing the failure...")
         try:
-            result = self.nl_handler.translate_error(
+            result = self._translate_error_cached(
                 step,
                 self.last_exit_code,
                 stderr,
                 context,
-                stream_callback=None,
             )
         except Exception:
             return False
@@ -849,42 +921,51 @@ class DeployCommandMixin:
 
     def _deploy_show_config(self):
         """Show saved deploy config for the current project."""
-        saved = self.deploy_store.get(Path.cwd())
-        if saved is None:
-            print_info("[Cliara] No saved deploy config for this project.")
-            print_dim("  Run 'deploy' to auto-detect and configure.")
-            return
+        cwd = Path.cwd()
+        with buffered_output():
+            saved = self.deploy_store.get(cwd)
+            if saved is None:
+                print_info("[Cliara] No saved deploy config for this project.")
+                print_dim("  Run 'deploy' to auto-detect and configure.")
+                return
 
-        print_info(f"\n[Cliara] Deploy config for {Path.cwd().name}:\n")
-        print(f"  Platform:  {saved.platform}")
-        if saved.project_name:
-            print(f"  Project:   {saved.project_name}")
-        if saved.framework:
-            print(f"  Framework: {saved.framework}")
-        print(f"  Deploys:   {saved.deploy_count}")
-        if saved.last_deployed:
-            print(f"  Last:      {saved.last_deployed}")
-        print()
-        print_dim("  Steps:")
-        for i, step in enumerate(saved.steps, 1):
-            print(f"    {i}. {step}")
-        print()
+            print_info(f"\n[Cliara] Deploy config for {cwd.name}:\n")
+            print_plain(f"  Platform:  {saved.platform}")
+            if saved.project_name:
+                print_plain(f"  Project:   {saved.project_name}")
+            if saved.framework:
+                print_plain(f"  Framework: {saved.framework}")
+            print_plain(f"  Deploys:   {saved.deploy_count}")
+            if saved.last_deployed:
+                print_plain(f"  Last:      {saved.last_deployed}")
+            print_plain()
+            print_dim("  Steps:")
+            for i, step in enumerate(saved.steps, 1):
+                print_plain(f"    {i}. {step}")
+            print_plain()
 
     def _deploy_show_history(self):
         """Show all saved deploy configs across projects."""
-        all_configs = self.deploy_store.list_all()
-        if not all_configs:
-            print_info("[Cliara] No deploy history yet.")
-            return
+        with buffered_output():
+            all_configs = self.deploy_store.list_all()
+            if not all_configs:
+                print_info("[Cliara] No deploy history yet.")
+                return
 
-        print_info(f"\n[Cliara] Deploy history ({len(all_configs)} project(s)):\n")
-        for path, saved in all_configs.items():
-            deploys = f"{saved.deploy_count} deploy(s)" if saved.deploy_count else "never deployed"
-            print(f"  {path}")
-            print_dim(f"    {saved.platform.title()}  -  {deploys}")
-            if saved.last_deployed:
-                print_dim(f"    Last: {saved.last_deployed}")
-            print()
+            print_info(f"\n[Cliara] Deploy history ({len(all_configs)} project(s)):\n")
+            # Most recently deployed first; never-deployed projects sink.
+            ordered = sorted(
+                all_configs.items(),
+                key=lambda kv: kv[1].last_deployed_epoch,
+                reverse=True,
+            )
+            for path, saved in ordered:
+                deploys = f"{saved.deploy_count} deploy(s)" if saved.deploy_count else "never deployed"
+                print_plain(f"  {path}")
+                print_dim(f"    {saved.platform.title()}  -  {deploys}")
+                if saved.last_deployed:
+                    print_dim(f"    Last: {saved.last_deployed}")
+                print_plain()
 
     def _deploy_reset(self):
         """Forget saved deploy config for the current project."""
@@ -902,21 +983,22 @@ class DeployCommandMixin:
 
     def _deploy_help(self):
         """Show deploy subcommand help."""
-        print_info("\n[Cliara] Deploy Commands\n")
-        print("  deploy               Auto-detect and deploy this project")
-        print("  deploy config        Show saved deploy config")
-        print("  deploy history       Show deploy history across all projects")
-        print("  deploy reset         Forget saved config and re-detect")
-        print("  deploy help          Show this help")
-        print()
-        print_dim("  First run: Cliara detects your project type and proposes a plan.")
-        print_dim("  After confirming, the plan is saved  -  next time it's instant.")
-        print()
-        print_dim("  Before each deploy Cliara also checks prerequisites for you:")
-        print_dim("    - the platform CLI is installed (offers to install it if not)")
-        print_dim("    - you're logged in (offers to run the login command)")
-        print_dim("    - for npm/PyPI/crates.io: the version isn't already published (offers to bump)")
-        print_dim("    - Docker images get a real registry/namespace before pushing")
-        print_dim("  If a step fails, Cliara explains why in plain English and can run a fix + retry.")
-        print_dim("  PyPI: upload step uses twine --username __token__; paste your full pypi-... API token at the password prompt.")
-        print()
+        with buffered_output():
+            print_info("\n[Cliara] Deploy Commands\n")
+            print_plain("  deploy               Auto-detect and deploy this project")
+            print_plain("  deploy config        Show saved deploy config")
+            print_plain("  deploy history       Show deploy history across all projects")
+            print_plain("  deploy reset         Forget saved config and re-detect")
+            print_plain("  deploy help          Show this help")
+            print_plain()
+            print_dim("  First run: Cliara detects your project type and proposes a plan.")
+            print_dim("  After confirming, the plan is saved  -  next time it's instant.")
+            print_plain()
+            print_dim("  Before each deploy Cliara also checks prerequisites for you:")
+            print_dim("    - the platform CLI is installed (offers to install it if not)")
+            print_dim("    - you're logged in (offers to run the login command)")
+            print_dim("    - for npm/PyPI/crates.io: the version isn't already published (offers to bump)")
+            print_dim("    - Docker images get a real registry/namespace before pushing")
+            print_dim("  If a step fails, Cliara explains why in plain English and can run a fix + retry.")
+            print_dim("  PyPI: upload step uses twine --username __token__; paste your full pypi-... API token at the password prompt.")
+            print_plain()
@@ -1,19 +1,32 @@
 """Execution and error-handling mixin for Cliara shell."""
 
+import atexit
+import codecs
+import errno
+import hashlib
 import os
-import platform
+import queue
+import selectors
+import shutil
+from datetime import datetime, timezone
+import re
 import subprocess
 import sys
 import threading
 import time
 import uuid
 from pathlib import Path
-from typing import List, Optional
+from typing import Callable, Dict, List, Optional
 
 from cliara import regression
 from cliara.chat_export import truncate_text
 from cliara.safety import DangerLevel
-from cliara.session_store import _get_branch, _get_project_root
+from cliara.session_store import (
+    CommandEntry,
+    _cached_root_and_branch,
+    _get_branch,
+    _get_project_root,
+)
 from cliara.translation.core import (
     command_exists,
     get_base_command,
@@ -34,18 +47,288 @@ from cliara.shell_app.runtime import (
     print_warning,
 )
 
+# Terminal bell for long-command notifications: one raw write, no codec/lock.
+_BEL = b"\x07"
+_STDOUT_FD = 1
+
+# Streamed stderr is buffered as raw bytes and decoded once at the end.
+# Only the tail is retained: error translators never look past it.
+_STDERR_MAX_BYTES = 1024 * 1024
+
+
+# Error-translation cache keys ignore timestamps and only look at the tail
+# of stderr, so reruns of the same failure hit the same entry.
+_ERR_TIMESTAMP_RE = re.compile(r"\d{4}-\d{2}-\d{2}[T ]\d{2}:\d{2}:\d{2}(?:[.,]\d+)?")
+_ERR_KEY_TAIL_CHARS = 2048
+
+
+def _error_cache_key(command: str, exit_code: int, stderr: str, context: Dict[str, str]) -> str:
+    """Stable key for a (command, exit code, stderr) failure in this os/shell."""
+    norm = _ERR_TIMESTAMP_RE.sub("<ts>", stderr)
+    cwd = context.get("cwd", "")
+    if cwd:
+        norm = norm.replace(cwd, ".")
+    norm = norm.strip()[-_ERR_KEY_TAIL_CHARS:]
+    raw = "\x1f".join(
+        (command.strip(), str(exit_code), norm, context.get("os", ""), context.get("shell", ""))
+    )
+    return hashlib.blake2b(raw.encode("utf-8", "replace"), digest_size=16).hexdigest()
+
+
+# Anything the shell would interpret (quoting, expansion, redirection,
+# globbing, control flow); commands containing these always go through it.
+_SHELL_META_RE = re.compile(r"[|&;<>$`*?{}\[\]()\\\"'~#!\n\r]")
+# Reserved words and builtins of /bin/sh, plus commands whose sh builtin
+# behaves differently from the /usr/bin binary of the same name.
+_SHELL_WORDS = frozenset({
+    ".", ":", "alias", "bg", "break", "case", "cd", "command", "continue",
+    "do", "done", "echo", "elif", "else", "esac", "eval", "exec", "exit",
+    "export", "fc", "fg", "fi", "for", "function", "getopts", "hash", "if",
+    "in", "jobs", "kill", "local", "printf", "pwd", "read", "readonly",
+    "return", "set", "shift", "source", "test", "then", "time", "times",
+    "trap", "type", "ulimit", "umask", "unalias", "unset", "until", "wait",
+    "while",
+})
+
+
+def _direct_argv(command: str, env: Optional[Dict[str, str]]) -> Optional[List[str]]:
+    """Return ``[executable, *argv]`` to run *command* without ``/bin/sh -c``, or None.
+
+    Only plain ``program arg ...`` commands qualify: no shell syntax at all,
+    not a builtin, no ``VAR=value`` prefix, and the program is a bare name
+    that resolves on PATH.  Paths like ``./build.sh`` go through the shell,
+    which also runs shebang-less scripts; an unknown name does too, so its
+    usual "not found" error is what the user and the error translator see.
+    """
+    if os.name == "nt" or _SHELL_META_RE.search(command):
+        return None
+    argv = command.split()
+    if not argv or argv[0] in _SHELL_WORDS or "=" in argv[0] or "/" in argv[0]:
+        return None
+    exe = shutil.which(argv[0], path=(env or os.environ).get("PATH"))
+    if exe is None:
+        return None
+    # argv[0] stays as typed, as the shell would leave it.
+    return [exe, *argv]
+
+
+def _launch_posix(launch: Callable, command: str, env: Dict[str, str], **kwargs):
+    """Start *command* with *launch* (``subprocess.run`` or ``Popen``).
+
+    Plain commands skip the intermediate ``/bin/sh`` fork + exec.  The shell
+    would set ``$PWD`` to the current directory (Cliara's ``cd`` only calls
+    ``os.chdir``), so the direct child gets it explicitly; a program ``execve``
+    refuses as ENOEXEC (a script without a shebang) is retried through the
+    shell, which runs it as a script.
+    """
+    direct = _direct_argv(command, env)
+    if direct is not None:
+        try:
+            return launch(
+                direct[1:],
+                executable=direct[0],
+                env={**env, "PWD": os.getcwd()},
+                **kwargs,
+            )
+        except OSError as e:
+            if e.errno != errno.ENOEXEC:
+                raise
+    return launch(command, shell=True, env=env, **kwargs)
+
+
+def _decode_output(data) -> str:
+    """Decode captured child output the way text-mode pipes would."""
+    return data.decode("utf-8", "replace").replace("\r\n", "\n")
+
+
+def _wait_process(proc: subprocess.Popen, timeout: Optional[float]) -> int:
+    """``proc.wait(timeout)`` without its sleep-and-poll loop where possible.
+
+    With a timeout, ``Popen.wait`` polls ``waitpid`` with sleeps of up to
+    50 ms.  On Linux a pidfd becomes readable the moment the child exits, so
+    block on that instead and only reap afterwards.
+    """
+    if timeout is not None and hasattr(os, "pidfd_open"):
+        try:
+            pidfd = os.pidfd_open(proc.pid)
+        except OSError:
+            pidfd = None
+        if pidfd is not None:
+            try:
+                with selectors.DefaultSelector() as sel:
+                    sel.register(pidfd, selectors.EVENT_READ)
+                    if not sel.select(timeout):
+                        raise subprocess.TimeoutExpired(proc.args, timeout)
+            finally:
+                os.close(pidfd)
+            return proc.wait()
+    return proc.wait(timeout=timeout)
+
+
+# After the child exits, keep reading for this long in case a background
+# grandchild still holds the pipes open (``server &``), then give up.
+_PIPE_DRAIN_GRACE_S = 5.0
+_PIPE_READ_SIZE = 64 * 1024
+
+
+def _pump_process_output(
+    proc: subprocess.Popen,
+    timeout: Optional[float],
+    on_stdout: Callable[[bytes], None],
+    on_stderr: Callable[[bytes], None],
+) -> int:
+    """Forward the child's stdout/stderr chunks to the callbacks until it exits.
+
+    On POSIX a single selector loop reads both pipes with non-blocking
+    ``os.read`` (and watches a pidfd for exit where available), so no reader
+    threads are needed.  Windows pipes can't be selected on, so there each
+    pipe gets a reader thread.  Raises ``subprocess.TimeoutExpired``.
+    """
+    pipes = ((proc.stdout, on_stdout), (proc.stderr, on_stderr))
+    if os.name == "nt":
+        readers = []
+        for pipe, callback in pipes:
+            if pipe is None:
+                continue
+
+            def _drain(pipe=pipe, callback=callback):
+                try:
+                    for chunk in iter(lambda: pipe.read1(_PIPE_READ_SIZE), b""):
+                        callback(chunk)
+                except Exception:
+                    pass
+
+            t = threading.Thread(target=_drain, daemon=True)
+            t.start()
+            readers.append(t)
+        returncode = _wait_process(proc, timeout)
+        for t in readers:
+            t.join(timeout=_PIPE_DRAIN_GRACE_S)
+        return returncode
+
+    deadline = None if timeout is None else time.monotonic() + timeout
+    sel = selectors.DefaultSelector()
+    pidfd = None
+    try:
+        for pipe, callback in pipes:
+            if pipe is not None:
+                os.set_blocking(pipe.fileno(), False)
+                sel.register(pipe.fileno(), selectors.EVENT_READ, callback)
+        if hasattr(os, "pidfd_open"):
+            try:
+                pidfd = os.pidfd_open(proc.pid)
+                sel.register(pidfd, selectors.EVENT_READ, None)
+            except OSError:
+                pidfd = None
+
+        exited_at: Optional[float] = None
+        while any(key.data is not None for key in sel.get_map().values()):
+            now = time.monotonic()
+            if pidfd is None and exited_at is None and proc.poll() is not None:
+                exited_at = now
+            limits = []
+            if exited_at is not None:
+                limits.append(exited_at + _PIPE_DRAIN_GRACE_S - now)
+            elif deadline is not None:
+                limits.append(deadline - now)
+            if pidfd is None and exited_at is None:
+                limits.append(0.1)  # no exit notification: poll for it
+            wait = min(limits) if limits else None
+            if wait is not None and wait <= 0:
+                if exited_at is not None:
+                    break
+                raise subprocess.TimeoutExpired(proc.args, timeout)
+
+            for key, _ in sel.select(wait):
+                if key.data is None:  # pidfd: the child has exited
+                    sel.unregister(key.fd)
+                    exited_at = time.monotonic()
+                    continue
+                try:
+                    chunk = os.read(key.fd, _PIPE_READ_SIZE)
+                except BlockingIOError:
+                    continue
+                except OSError:
+                    chunk = b""
+                if not chunk:
+                    sel.unregister(key.fd)
+                    continue
+                key.data(chunk)
+    finally:
+        sel.close()
+        if pidfd is not None:
+            os.close(pidfd)
+
+    remaining = None if deadline is None else max(0.0, deadline - time.monotonic())
+    return _wait_process(proc, remaining)
+
+
+# Sent once to the persistent PowerShell used for Windows notifications.
+# Each statement is a single line: `-Command -` runs stdin line by line.
+_PS_TOAST_PRELUDE = (
+    "Add-Type -AssemblyName System.Windows.Forms\n"
+    "$cliaraToast = New-Object System.Windows.Forms.NotifyIcon\n"
+    "$cliaraToast.Icon = [System.Drawing.SystemIcons]::Information\n"
+    "$cliaraToast.Visible = $true\n"
+    "function Show-CliaraToast($t, $b) { "
+    "$cliaraToast.ShowBalloonTip(5000, $t, $b, [System.Windows.Forms.ToolTipIcon]::Info) }\n"
+)
+
+
+def _ps_quote(text: str) -> str:
+    """Quote *text* as a literal PowerShell string (no variable expansion)."""
+    return "'" + text.replace("'", "''").replace("\n", " ") + "'"
+
+
+def _close_toast_ps(ps: subprocess.Popen) -> None:
+    """Remove the tray icon and let the notification PowerShell exit."""
+    try:
+        if ps.poll() is None:
+            ps.stdin.write("$cliaraToast.Dispose()\n")
+            ps.stdin.close()
+    except Exception:
+        pass
+
 
 class ExecutionEngineMixin:
     """Command execution, translation, and failure analysis helpers."""
 
-    def _subprocess_timeout(self) -> Optional[float]:
-        """Return the configured subprocess timeout, or None to disable."""
+    def _refresh_hot_config(self) -> None:
+        """Cache config knobs read on every command; call after config changes."""
+        try:
+            self._spinner_delay = float(self.config.get("spinner_delay_seconds", 3) or 0)
+        except (TypeError, ValueError):
+            self._spinner_delay = 3.0
+        try:
+            self._notify_after = float(self.config.get("notify_after_seconds", 30) or 0)
+        except (TypeError, ValueError):
+            self._notify_after = 30.0
         try:
-            raw = self.config.get("subprocess_timeout_seconds", 1800)
-            v = float(raw)
-            return v if v > 0 else None
+            v = float(self.config.get("subprocess_timeout_seconds", 1800))
+            self._subprocess_timeout_s: Optional[float] = v if v > 0 else None
         except Exception:
-            return 1800.0
+            self._subprocess_timeout_s = 1800.0
+
+    def _refresh_child_env(self) -> dict:
+        """Re-snapshot ``os.environ`` for child processes and return the copy.
+
+        Call after Cliara itself mutates the process environment (e.g. ``key set``).
+        """
+        self._child_env = dict(os.environ)
+        self._shell_env_default = self._child_env.get("SHELL", "bash")
+        return self._child_env
+
+    def _build_nl_context(self, cwd) -> Dict[str, str]:
+        """Base context dict (cwd, OS, shell) passed to NL handler calls."""
+        return {
+            "cwd": str(cwd),
+            "os": self._os_name,
+            "shell": self.shell_path or self._shell_env_default,
+        }
+
+    def _subprocess_timeout(self) -> Optional[float]:
+        """Return the configured subprocess timeout, or None to disable."""
+        return self._subprocess_timeout_s
 
     # ------------------------------------------------------------------
     # Cross-platform command translation
@@ -65,7 +348,7 @@ class ExecutionEngineMixin:
         if command_exists(base_cmd):
             return
 
-        os_name = platform.system()
+        os_name = self._os_name
         shell = self.shell_path or ""
 
         # Try to translate the full pipeline.
@@ -93,25 +376,26 @@ class ExecutionEngineMixin:
         powershell/pwsh directly.
         """
         self.history.add(command)
-        self.history.set_last_execution([command])
 
-        if platform.system() == "Windows" and is_powershell(self.shell_path or ""):
+        if self._os_name == "Windows" and is_powershell(self.shell_path or ""):
+            # execute_shell_command records the last execution itself.
+            self.history.set_last_execution([command])
             try:
                 ps_exe = "pwsh" if "pwsh" in (self.shell_path or "").lower() else "powershell"
                 result = subprocess.run(
                     [ps_exe, "-NoProfile", "-Command", command],
                     timeout=self._subprocess_timeout(),
                 )
-                self._enqueue_semantic_add(command, str(Path.cwd()), result.returncode)
+                self._enqueue_semantic_add(command, os.getcwd(), result.returncode)
                 return result.returncode == 0
             except subprocess.TimeoutExpired:
                 limit = self.config.get("subprocess_timeout_seconds", 1800)
                 print_error(f"[Error] Command timed out ({limit}s). Raise subprocess_timeout_seconds in config to extend.")
-                self._enqueue_semantic_add(command, str(Path.cwd()), -1)
+                self._enqueue_semantic_add(command, os.getcwd(), -1)
                 return False
             except Exception as e:
                 print_error(f"[Error] {e}")
-                self._enqueue_semantic_add(command, str(Path.cwd()), -1)
+                self._enqueue_semantic_add(command, os.getcwd(), -1)
                 return False
 
         return self.execute_shell_command(command, capture=False)
@@ -134,13 +418,9 @@ class ExecutionEngineMixin:
         if base_cmd and not command_exists(base_cmd):
             return
 
-        context = {
-            "cwd": str(Path.cwd()),
-            "os": platform.system(),
-            "shell": self.shell_path or os.environ.get("SHELL", "bash"),
-        }
+        context = self._build_nl_context(os.getcwd())
 
-        result = self.nl_handler.translate_error(
+        result = self._translate_error_cached(
             self.last_command,
             self.last_exit_code,
             stderr,
@@ -168,6 +448,32 @@ class ExecutionEngineMixin:
             if short:
                 print_dim(f"  hint: {short}")
 
+    def _translate_error_cached(
+        self, command: str, exit_code: int, stderr: str, context: Dict[str, str]
+    ) -> Dict:
+        """``nl_handler.translate_error`` with an exact-match cache for LLM answers.
+
+        Only successful LLM translations are remembered; the offline stub is
+        cheap and failures should be retried.
+        """
+        if not self.nl_handler.llm_enabled:
+            return self.nl_handler.translate_error(command, exit_code, stderr, context)
+
+        key = _error_cache_key(command, exit_code, stderr, context)
+        cached = self._err_cache.get(key)
+        if cached is not None:
+            return dict(cached)
+
+        result = self.nl_handler.translate_error(
+            command, exit_code, stderr, context, stream_callback=None
+        )
+        explanation = str(result.get("explanation") or "")
+        if (explanation or result.get("fix_commands")) and not explanation.startswith(
+            "Could not analyze error"
+        ):
+            self._err_cache.put(key, result)
+        return result
+
     def _maybe_translate_error(self, command: str):
         """
         After a failed command, decide whether to invoke the Error
@@ -190,19 +496,14 @@ class ExecutionEngineMixin:
         """Translate stderr into plain English and optionally run fixes."""
         print()
 
-        context = {
-            "cwd": str(Path.cwd()),
-            "os": platform.system(),
-            "shell": self.shell_path or os.environ.get("SHELL", "bash"),
-        }
+        context = self._build_nl_context(os.getcwd())
 
         print_dim(f"  {pick_thinking_word()}...")
-        result = self.nl_handler.translate_error(
+        result = self._translate_error_cached(
             command,
             self.last_exit_code,
             stderr,
             context,
-            stream_callback=None,
         )
 
         explanation = result.get("explanation", "")
@@ -254,7 +555,7 @@ class ExecutionEngineMixin:
     # ------------------------------------------------------------------
     def _notify_completion(self, command: str, elapsed: float, success: bool):
         """Notify when a command exceeds the configured duration threshold."""
-        threshold = self.config.get("notify_after_seconds", 30)
+        threshold = self._notify_after
         if threshold <= 0 or elapsed < threshold:
             return
 
@@ -267,33 +568,19 @@ class ExecutionEngineMixin:
         else:
             print_error(f"\n[Cliara] {short_cmd} {status} ({elapsed_str})")
 
-        sys.stdout.write("\a")
-        sys.stdout.flush()
+        try:
+            os.write(_STDOUT_FD, _BEL)
+        except OSError:
+            pass
 
-        if platform.system() == "Windows":
+        if self._os_name == "Windows":
             try:
-                title = "Cliara"
-                body = f"{short_cmd} {status} ({elapsed_str})"
-                ps_cmd = (
-                    f'[System.Reflection.Assembly]::LoadWithPartialName("System.Windows.Forms") | Out-Null; '
-                    f'$n = New-Object System.Windows.Forms.NotifyIcon; '
-                    f'$n.Icon = [System.Drawing.SystemIcons]::Information; '
-                    f'$n.Visible = $true; '
-                    f'$n.ShowBalloonTip(5000, "{title}", "{body}", '
-                    f'[System.Windows.Forms.ToolTipIcon]::Info); '
-                    f'Start-Sleep -Seconds 6; $n.Dispose()'
-                )
-                subprocess.Popen(
-                    ["powershell", "-NoProfile", "-Command", ps_cmd],
-                    stdout=subprocess.DEVNULL,
-                    stderr=subprocess.DEVNULL,
-                    creationflags=0x08000000,
-                )
+                self._windows_toast("Cliara", f"{short_cmd} {status} ({elapsed_str})")
             except Exception:
                 pass
         else:
             try:
-                if platform.system() == "Darwin":
+                if self._os_name == "Darwin":
                     subprocess.Popen(
                         [
                             "osascript",
@@ -314,6 +601,28 @@ class ExecutionEngineMixin:
 
         print_dim("  [Desktop notification sent]")
 
+    def _windows_toast(self, title: str, body: str) -> None:
+        """Show a tray balloon through one long-lived PowerShell process.
+
+        PowerShell takes hundreds of milliseconds to start, so it is launched
+        on the first notification and then fed one line per toast on stdin.
+        """
+        ps = getattr(self, "_toast_ps", None)
+        if ps is None or ps.poll() is not None:
+            ps = subprocess.Popen(
+                ["powershell", "-NoProfile", "-NoLogo", "-Command", "-"],
+                stdin=subprocess.PIPE,
+                stdout=subprocess.DEVNULL,
+                stderr=subprocess.DEVNULL,
+                creationflags=0x08000000,
+                text=True,
+            )
+            ps.stdin.write(_PS_TOAST_PRELUDE)
+            self._toast_ps = ps
+            atexit.register(_close_toast_ps, ps)
+        ps.stdin.write(f"Show-CliaraToast {_ps_quote(title)} {_ps_quote(body)}\n")
+        ps.stdin.flush()
+
     def execute_shell_command(self, command: str, capture: bool = False) -> bool:
         """Execute a command in the underlying shell."""
         self.last_stderr = ""
@@ -328,7 +637,7 @@ class ExecutionEngineMixin:
         graph_project_root: Optional[str] = None
         graph_git_before = {}
         graph_git_after = {}
-        graph_env_before = dict(os.environ)
+        graph_env_before = self._child_env
         graph_env_after: Optional[dict] = None
         graph_started_ts = time.time()
         graph_proc_pid: Optional[int] = None
@@ -338,7 +647,7 @@ class ExecutionEngineMixin:
         graph_monitor_thread = None
 
         start_time = time.time()
-        spinner_delay = self.config.get("spinner_delay_seconds", 3)
+        spinner_delay = self._spinner_delay
         timer = None
 
         try:
@@ -349,12 +658,12 @@ class ExecutionEngineMixin:
             print_dim("  (Ctrl+C to cancel)")
 
             try:
-                graph_project_root = _get_project_root(Path.cwd()) or str(Path.cwd())
+                graph_project_root = _get_project_root(Path.cwd()) or os.getcwd()
                 from cliara.causal_graph import git_status_map
 
                 graph_git_before = git_status_map(graph_project_root)
             except Exception:
-                graph_project_root = graph_project_root or str(Path.cwd())
+                graph_project_root = graph_project_root or os.getcwd()
                 graph_git_before = {}
 
             if capture:
@@ -364,7 +673,7 @@ class ExecutionEngineMixin:
                     timer = _NullTimer()
                 timer.start()
                 try:
-                    if platform.system() == "Windows" and is_powershell(self.shell_path or ""):
+                    if self._os_name == "Windows" and is_powershell(self.shell_path or ""):
                         ps_exe = "pwsh" if "pwsh" in (self.shell_path or "").lower() else "powershell"
                         result = subprocess.run(
                             [ps_exe, "-NoProfile", "-Command", command],
@@ -377,11 +686,13 @@ class ExecutionEngineMixin:
                             encoding="utf-8",
                             errors="replace",
                             timeout=self._subprocess_timeout(),
+                            env=self._child_env,
                         )
                     else:
-                        result = subprocess.run(
+                        result = _launch_posix(
+                            subprocess.run,
                             command,
-                            shell=True,
+                            self._child_env,
                             capture_output=True,
                             text=True,
                             encoding="utf-8",
@@ -412,24 +723,22 @@ class ExecutionEngineMixin:
             else:
                 timer = _NullTimer()
 
-            if platform.system() == "Windows" and is_powershell(self.shell_path or ""):
+            if self._os_name == "Windows" and is_powershell(self.shell_path or ""):
                 ps_exe = "pwsh" if "pwsh" in (self.shell_path or "").lower() else "powershell"
                 popen_cmd = [ps_exe, "-NoProfile", "-Command", command]
                 popen_kwargs = {
                     "stdout": subprocess.PIPE,
                     "stderr": subprocess.PIPE,
-                    "encoding": "utf-8",
-                    "errors": "replace",
+                    "env": self._child_env,
                 }
                 proc = subprocess.Popen(popen_cmd, **popen_kwargs)
             else:
-                proc = subprocess.Popen(
+                proc = _launch_posix(
+                    subprocess.Popen,
                     command,
-                    shell=True,
+                    self._child_env,
                     stdout=subprocess.PIPE,
                     stderr=subprocess.PIPE,
-                    encoding="utf-8",
-                    errors="replace",
                 )
 
             # Optional background sampling of process tree + listening ports.
@@ -458,40 +767,31 @@ class ExecutionEngineMixin:
                 graph_monitor_stop = None
                 graph_monitor_thread = None
 
-            stderr_lines: List[str] = []
-            stdout_lines: List[str] = []
-
-            def _drain_stdout():
-                try:
-                    assert proc.stdout is not None
-                    for line in proc.stdout:
-                        stdout_lines.append(line)
-                        with timer.output_lock():
-                            sys.stdout.write(line)
-                            sys.stdout.flush()
-                except Exception:
-                    pass
-
-            def _drain_stderr():
-                try:
-                    assert proc.stderr is not None
-                    for line in proc.stderr:
-                        stderr_lines.append(line)
-                        with timer.output_lock():
-                            sys.stderr.write(line)
-                            sys.stderr.flush()
-                except Exception:
-                    pass
+            stderr_buf = bytearray()
+            stdout_buf = bytearray()
+            out_decoder = codecs.getincrementaldecoder("utf-8")("replace")
+            err_decoder = codecs.getincrementaldecoder("utf-8")("replace")
+
+            def _on_stdout(chunk: bytes) -> None:
+                stdout_buf.extend(chunk)
+                with timer.output_lock():
+                    sys.stdout.write(out_decoder.decode(chunk))
+                    sys.stdout.flush()
+
+            def _on_stderr(chunk: bytes) -> None:
+                stderr_buf.extend(chunk)
+                # Trim lazily (at 2x the cap) so the front-delete is amortized.
+                if len(stderr_buf) > 2 * _STDERR_MAX_BYTES:
+                    del stderr_buf[: len(stderr_buf) - _STDERR_MAX_BYTES]
+                with timer.output_lock():
+                    sys.stderr.write(err_decoder.decode(chunk))
+                    sys.stderr.flush()
 
-            stdout_reader = threading.Thread(target=_drain_stdout, daemon=True)
-            stderr_reader = threading.Thread(target=_drain_stderr, daemon=True)
-            stdout_reader.start()
-            stderr_reader.start()
             timer.start()
 
             timed_out = False
             try:
-                proc.wait(timeout=self._subprocess_timeout())
+                _pump_process_output(proc, self._subprocess_timeout(), _on_stdout, _on_stderr)
             except subprocess.TimeoutExpired:
                 proc.kill()
                 proc.wait()
@@ -506,8 +806,6 @@ class ExecutionEngineMixin:
                 pass
 
             timer.stop()
-            stdout_reader.join(timeout=5)
-            stderr_reader.join(timeout=5)
 
             if timed_out:
                 print_error("[Error] Command timed out (5 minutes)")
@@ -519,8 +817,10 @@ class ExecutionEngineMixin:
                 self.history.set_last_exit_ts(self.last_exit_code, start_time)
                 return False
 
-            self.last_stderr = "".join(stderr_lines)
-            self.last_stdout = "".join(stdout_lines)
+            if len(stderr_buf) > _STDERR_MAX_BYTES:
+                del stderr_buf[: len(stderr_buf) - _STDERR_MAX_BYTES]
+            self.last_stderr = _decode_output(stderr_buf)
+            self.last_stdout = _decode_output(stdout_buf)
             self.last_exit_code = proc.returncode
             success = proc.returncode == 0
             elapsed = time.time() - start_time
@@ -549,7 +849,7 @@ class ExecutionEngineMixin:
             # A1: causal command graph persist (silent, best-effort)
             try:
                 if graph_project_root is None:
-                    graph_project_root = _get_project_root(Path.cwd()) or str(Path.cwd())
+                    graph_project_root = _get_project_root(Path.cwd()) or os.getcwd()
                 from cliara.causal_graph import (
                     GraphNode,
                     append_node,
@@ -559,7 +859,9 @@ class ExecutionEngineMixin:
                 )
 
                 graph_git_after = git_status_map(graph_project_root)
-                graph_env_after = dict(os.environ)
+                # Refreshing doubles as the after-snapshot, so each command
+                # copies the environment once instead of twice.
+                graph_env_after = self._refresh_child_env()
                 node_id = (graph_cmd_id or "").strip() or str(uuid.uuid4())
                 touched = touched_files_from_status(graph_git_before or {}, graph_git_after or {})
                 env_changed = env_vars_changed(graph_env_before or {}, graph_env_after or {})
@@ -576,7 +878,7 @@ class ExecutionEngineMixin:
                 node = GraphNode(
                     id=node_id,
                     command=str(command or ""),
-                    cwd=str(Path.cwd()),
+                    cwd=os.getcwd(),
                     started_ts=float(graph_started_ts),
                     ended_ts=float(time.time()),
                     exit_code=int(self.last_exit_code),
@@ -625,7 +927,7 @@ class ExecutionEngineMixin:
             except Exception:
                 pass
 
-            self._enqueue_semantic_add(command, str(Path.cwd()), self.last_exit_code)
+            self._enqueue_semantic_add(command, os.getcwd(), self.last_exit_code)
 
             # Output Time-Machine: persist a scrubbed digest of what this
             # command printed (opt-in via output_archive_enabled; silent).
@@ -665,12 +967,12 @@ class ExecutionEngineMixin:
                     if elapsed is None:
                         elapsed = max(0.0, time.time() - start_time)
 
-                    shell_label = self.shell_path or os.environ.get("SHELL", "bash")
+                    shell_label = self.shell_path or self._shell_env_default
                     block = LastRunBlock(
                         command=self.last_command or command,
-                        cwd=str(Path.cwd()),
+                        cwd=os.getcwd(),
                         shell=str(shell_label),
-                        os_name=platform.system(),
+                        os_name=self._os_name,
                         exit_code=int(self.last_exit_code),
                         started_ts=float(start_time),
                         elapsed_s=float(elapsed),
@@ -689,9 +991,8 @@ class ExecutionEngineMixin:
         if not self.current_session:
             return None
 
-        cwd = str(Path.cwd())
-        root = _get_project_root(Path(cwd))
-        branch = _get_branch(Path(cwd))
+        cwd = os.getcwd()
+        root, branch = _cached_root_and_branch(cwd)
         parent_id = self._next_command_parent_id
         self._next_command_parent_id = None
         stderr_preview = None
@@ -711,22 +1012,108 @@ class ExecutionEngineMixin:
             if lo.strip():
                 stdout_preview = truncate_text(lo, omax)
 
-        entry_id = self.session_store.add_command(
-            self.current_session.id,
-            command=command,
-            cwd=cwd,
-            exit_code=0 if success else (self.last_exit_code if self.last_exit_code != 0 else 1),
-            branch=branch,
-            project_root=root,
-            parent_id=parent_id,
-            stderr_preview=stderr_preview,
-            stdout_preview=stdout_preview,
+        exit_code = 0 if success else (self.last_exit_code if self.last_exit_code != 0 else 1)
+        entry_id = str(uuid.uuid4())
+        now = datetime.now(timezone.utc).isoformat()
+
+        # Mirror SessionStore.add_command in memory; the disk write happens
+        # on the session writer thread so the prompt is not held up by it.
+        session = self.current_session
+        session.commands.append(
+            CommandEntry(
+                command=command,
+                cwd=cwd,
+                exit_code=exit_code,
+                timestamp=now,
+                id=entry_id,
+                parent_id=parent_id,
+                stderr_preview=stderr_preview,
+                stdout_preview=stdout_preview,
+            )
         )
-        updated = self.session_store.get_by_id(self.current_session.id)
-        if updated:
-            self.current_session = updated
+        if cwd and cwd not in session.cwds:
+            session.cwds.append(cwd)
+        if branch is not None:
+            session.branch = branch
+        if root is not None:
+            session.project_root = root
+        session.updated = now
+
+        row = {
+            "session_id": session.id,
+            "command": command,
+            "cwd": cwd,
+            "exit_code": exit_code,
+            "branch": branch,
+            "project_root": root,
+            "parent_id": parent_id,
+            "stderr_preview": stderr_preview,
+            "stdout_preview": stdout_preview,
+            "entry_id": entry_id,
+            "timestamp": now,
+        }
+        q = getattr(self, "_session_write_queue", None)
+        if q is None:
+            self.session_store.add_commands([row])
+        else:
+            q.put(row)
+            err, self._session_write_error = self._session_write_error, None
+            if err is not None:
+                print_warning(f"[Cliara] Could not save session commands (will retry): {err}")
         return entry_id
 
+    def _session_writer_worker(self):
+        """Background worker: persist queued session commands, batching bursts."""
+        q = self._session_write_queue
+        while True:
+            batch = [q.get()]
+            while len(batch) < 32:
+                try:
+                    batch.append(q.get_nowait())
+                except queue.Empty:
+                    break
+            queued = len(batch)
+            # Rows an earlier write failed on go first, keeping session order.
+            failed = self._session_failed_writes
+            if failed:
+                batch = [failed.popleft() for _ in range(len(failed))] + batch
+            try:
+                self.session_store.add_commands(batch)
+            except Exception as e:
+                # Keep the rows for the next write; the main thread reports
+                # the error (printing here would garble the prompt).
+                failed.extend(batch)
+                self._session_write_error = e
+            finally:
+                for _ in range(queued):
+                    q.task_done()
+
+    def _retry_failed_session_writes(self) -> None:
+        """Synchronously write rows the background writer failed to save.
+
+        On another failure the rows are kept for the next retry and the
+        error is shown, as the synchronous write used to surface it.
+        """
+        failed = getattr(self, "_session_failed_writes", None)
+        if not failed:
+            return
+        self._session_write_error = None
+        rows = []
+        while failed:
+            rows.append(failed.popleft())
+        try:
+            self.session_store.add_commands(rows)
+        except Exception as e:
+            failed.extendleft(reversed(rows))
+            print_warning(f"[Cliara] Could not save {len(rows)} session command(s): {e}")
+
+    def _flush_session_writes(self) -> None:
+        """Block until every queued session command has been written to disk."""
+        q = getattr(self, "_session_write_queue", None)
+        if q is not None:
+            q.join()
+            self._retry_failed_session_writes()
+
     def _regression_workflow_key(self, command: str) -> Optional[str]:
         """Compute workflow key for regression snapshot."""
         cwd = Path.cwd()
@@ -14,7 +14,6 @@ Mixed into :class:`cliara.shell_app.orchestrator.CliaraShell`.
 """
 
 import random
-import time
 from pathlib import Path
 from typing import List, Optional
 
@@ -1,11 +1,11 @@
 """Input routing mixin for Cliara shell."""
 
 import os
-import platform
 
 from cliara.copilot_gate import InputSource
 from cliara.safety import DangerLevel
 from cliara.shell_app.runtime import (
+    _IS_WINDOWS,
     _is_explain_last_rest,
     _looks_like_fix,
     print_dim,
@@ -33,6 +33,25 @@ class InputRoutingMixin:
         "stash": "git stash apply",
     }
 
+    # "<verb> [args]" built-ins: lowercased first word -> handler taking the
+    # (stripped, original-case) remainder.  Checked before NL / macros / shell.
+    _VERB_ROUTES = {
+        "pulse": "_handle_pulse",
+        "chat": "_handle_chat_command",
+        "history": "handle_history",
+        "lint": "_route_lint",
+        "push": "handle_push",
+        "review": "handle_code_review",
+        "undo": "_handle_undo",
+        "index": "handle_codebase_index",
+        "reindex": "_route_reindex",
+        "ask": "_route_ask",
+        "outputs": "handle_output_archive",
+        "ghost": "handle_ghost",
+        "session": "handle_session",
+        "deploy": "handle_deploy",
+    }
+
     def run_single_command(self, command: str) -> int:
         """
         Run a single command through the risk gate then exit.
@@ -69,6 +88,7 @@ class InputRoutingMixin:
             return 0 if success else self.last_exit_code or 1
         finally:
             self._flush_semantic_history()
+            self._flush_session_writes()
 
     @staticmethod
     def _danger_level_from_name(name: str):
@@ -103,7 +123,6 @@ class InputRoutingMixin:
         Returns process-style exit code (0 success).
         """
         import sys
-        from pathlib import Path
         from cliara.shell_app.runtime import _print_safety_panel
         from cliara.safety import DangerLevel
 
@@ -117,11 +136,7 @@ class InputRoutingMixin:
                 print_error("[Error] Missing query. Usage: cliara do \"...\"")
                 return 2
 
-            context = {
-                "cwd": str(Path.cwd()),
-                "os": platform.system(),
-                "shell": getattr(self, "shell_path", None) or os.environ.get("SHELL", "bash"),
-            }
+            context = self._build_nl_context(os.getcwd())
 
             commands, explanation, _overall_level = self.nl_handler.process_query(
                 q,
@@ -197,6 +212,7 @@ class InputRoutingMixin:
             return 0
         finally:
             self._flush_semantic_history()
+            self._flush_session_writes()
 
     def handle_input(self, user_input: str):
         """Route one line of user input to the appropriate handler."""
@@ -210,13 +226,11 @@ class InputRoutingMixin:
             self._inline_skip_once = False
 
         if user_input.strip():
-            s = user_input.strip()
-            low = s.lower()
             nl_p = (self.config.get("nl_prefix", "?") or "?").strip().lower()
-            rest_after_nl = low[len(nl_p) :].lstrip() if low.startswith(nl_p) else ""
-            _skip_hist = low in ("history clear", "clear-history") or rest_after_nl == "history clear"
+            rest_after_nl = _ulow[len(nl_p) :].lstrip() if _ulow.startswith(nl_p) else ""
+            _skip_hist = _ulow in ("history clear", "clear-history") or rest_after_nl == "history clear"
             if not _skip_hist:
-                self.history.add(s)
+                self.history.add(user_input.strip())
 
         if user_input.startswith("@run "):
             user_input = user_input[5:].strip()
@@ -254,10 +268,6 @@ class InputRoutingMixin:
             print_info(f"Cliara {__version__}")
             return
 
-        if _ulow == "pulse" or _ulow.startswith("pulse "):
-            rest = user_input.strip()[5:].strip() if len(user_input.strip()) > 5 else ""
-            self._handle_pulse(rest)
-            return
         if _ulow == "last" or _ulow == "retry":
             if not self.last_command:
                 print_error("[Cliara] No previous command to repeat.")
@@ -267,121 +277,58 @@ class InputRoutingMixin:
             self.handle_input(self.last_command)
             return
 
-        if user_input.lower() == "chat" or user_input.lower().startswith("chat "):
-            rest = user_input[4:].strip() if len(user_input) > 4 else ""
-            self._handle_chat_command(rest)
+        # Lowercased once for the fixed built-ins below; the verb table
+        # handles "<verb> [args]" commands with a single dict lookup.
+        _stripped = user_input.strip()
+        _low = _stripped.lower()
+        _head, _, _tail = _stripped.partition(" ")
+        _head_low = _head.lower()
+        _route = self._VERB_ROUTES.get(_head_low)
+        if _route is not None:
+            getattr(self, _route)(_tail.strip())
             return
 
-        if user_input.strip().lower() == "doctor":
+        if _low == "doctor":
             self._handle_doctor()
             return
 
-        if user_input.strip().lower() == "clear-history":
+        if _low == "clear-history":
             self._handle_clear_command_history()
             return
 
-        if user_input.strip().lower() in ("tips", "quick-tips", "quicktips"):
+        if _low in ("tips", "quick-tips", "quicktips"):
             self._print_full_banner()
             return
 
-        if user_input.strip().lower() in ("tips off", "tips disable"):
+        if _low in ("tips off", "tips disable"):
             self.config.settings["show_tips"] = False
             self.config.save()
             print_info("[Tips disabled. Use 'tips on' to re-enable.]")
             return
 
-        if user_input.strip().lower() in ("tips on", "tips enable"):
+        if _low in ("tips on", "tips enable"):
             self.config.settings["show_tips"] = True
             self.config.save()
             print_info("[Tips enabled.]")
             return
 
-        if user_input.lower() == "history" or user_input.lower().startswith("history "):
-            self.handle_history(user_input[7:].strip() if len(user_input) > 7 else "")
-            return
-
-        if user_input.lower().startswith("explain "):
-            rest = user_input[8:].strip()
+        if _low.startswith("explain "):
+            rest = _stripped[8:].strip()
             if _is_explain_last_rest(rest):
                 self.handle_explain_last()
             else:
                 self.handle_explain(rest)
             return
 
-        if user_input.strip().lower() == "lint" or user_input.lower().startswith("lint "):
-            cmd = user_input[5:].strip() if len(user_input) > 5 else ""
-            if not cmd:
-                print_error("[Error] Usage: lint <command>")
-                print_dim("Example: lint find . -name '*.py' -exec rm {} \\;")
-                return
-            self._handle_lint(cmd)
-            return
-
-        if _ulow == "push" or _ulow.startswith("push "):
-            rest = user_input.strip()[5:].strip() if len(user_input.strip()) > 5 else ""
-            self.handle_push(rest)
-            return
-
-        if _ulow == "review" or _ulow.startswith("review "):
-            rest = user_input.strip()[6:].strip() if len(user_input.strip()) > 6 else ""
-            self.handle_code_review(rest)
-            return
-
-        if _ulow == "undo" or _ulow.startswith("undo "):
-            rest = user_input.strip()[4:].strip() if len(user_input.strip()) > 4 else ""
-            self._handle_undo(rest)
-            return
-
-        if user_input.strip().lower() == "prune branches":
+        if _low == "prune branches":
             self.handle_prune_branches()
             return
 
-        # Codebase RAG: build/refresh the index, and ask questions about the code.
-        if _ulow == "index" or _ulow == "reindex" or _ulow.startswith(("index ", "reindex ")):
-            if _ulow.startswith("reindex"):
-                rest = user_input.strip()[7:].strip()
-                self.handle_codebase_index(rest or "rebuild")
-            else:
-                rest = user_input.strip()[5:].strip() if len(user_input.strip()) > 5 else ""
-                self.handle_codebase_index(rest)
-            return
-
-        if _ulow == "ask" or _ulow.startswith("ask "):
-            rest = user_input.strip()[3:].strip() if len(user_input.strip()) > 3 else ""
-            if not rest:
-                print_error("[Error] Usage: ask <question about the code>")
-                print_dim("Example: ask how does auth work")
-                return
-            self.handle_codebase_question(rest)
-            return
-
-        # Output Time-Machine: archive of what past commands printed.
-        if _ulow == "outputs" or _ulow.startswith("outputs "):
-            rest = user_input.strip()[7:].strip() if len(user_input.strip()) > 7 else ""
-            self.handle_output_archive(rest)
-            return
-
-        # Ghost Run: execute a destructive command in a parallel sandbox first.
-        if _ulow == "ghost" or _ulow.startswith("ghost "):
-            rest = user_input.strip()[5:].strip() if len(user_input.strip()) > 5 else ""
-            self.handle_ghost(rest)
-            return
-
         _sess_expanded = self._expand_session_shortcut(user_input)
         if _sess_expanded is not None:
             self.handle_session(_sess_expanded)
             return
 
-        if user_input.lower() == "session" or user_input.lower().startswith("session "):
-            subcommand = user_input[7:].strip() if len(user_input) > 7 else ""
-            self.handle_session(subcommand)
-            return
-
-        if user_input.lower() == "deploy" or user_input.lower().startswith("deploy "):
-            subcommand = user_input[6:].strip() if len(user_input) > 6 else ""
-            self.handle_deploy(subcommand)
-            return
-
         nl_prefix = self.config.get("nl_prefix", "?")
         if user_input.startswith(nl_prefix):
             query_rest = user_input[len(nl_prefix):].strip()
@@ -400,46 +347,45 @@ class InputRoutingMixin:
             self.handle_macro_command(user_input[6:].strip())
             return
 
-        _parts = user_input.strip().split(maxsplit=1)
-        if _parts and _parts[0].lower() in ("theme", "themes"):
-            self._handle_theme_command(_parts[1] if len(_parts) > 1 else "")
+        if _head_low in ("theme", "themes"):
+            self._handle_theme_command(_tail.strip())
             return
 
-        if user_input.strip() == "config" or user_input.lower().startswith("config "):
-            self._handle_config_command(user_input[6:].strip() if len(user_input) > 6 else "")
+        if _head_low == "config":
+            self._handle_config_command(_tail.strip())
             return
 
-        if user_input.lower().strip() == "setup-ollama":
+        if _low == "setup-ollama":
             self._handle_setup_ollama()
             return
 
-        if user_input.lower().strip() == "setup-llm":
+        if _low == "setup-llm":
             self._handle_setup_llm()
             return
 
-        if user_input.lower().strip() in ("cliara-login", "cliara login"):
+        if _low in ("cliara-login", "cliara login"):
             self._handle_cliara_login()
             return
 
-        if user_input.lower().strip() in ("cliara-logout", "cliara logout"):
+        if _low in ("cliara-logout", "cliara logout"):
             self._handle_cliara_logout()
             return
 
-        if user_input.lower().strip() == "status":
+        if _low == "status":
             self._handle_status()
             return
 
-        if user_input.lower().strip() == "readme":
+        if _low == "readme":
             self._handle_readme()
             return
 
-        if user_input.lower().strip() == "use" or user_input.lower().startswith("use "):
+        if _low == "use" or _low.startswith("use "):
             self._handle_use_provider(user_input[3:].strip())
             return
 
         # API-key management — `key`, `key show`, `key set <provider> <key>`,
         # `key remove <provider>`, `key test [provider]`, `key path`.
-        _kw = user_input.lower().strip()
+        _kw = _low
         if _kw == "key" or _kw.startswith("key "):
             self._handle_key_command(user_input[3:].strip() if len(user_input) > 3 else "")
             return
@@ -473,13 +419,12 @@ class InputRoutingMixin:
             self._handle_cd(user_input)
             return
 
-        if user_input.lower() == "jump" or user_input.lower().startswith("jump "):
-            query = user_input[4:].strip() if len(user_input) > 4 else ""
-            self.handle_jump(query)
+        if _head_low == "jump":
+            self.handle_jump(_tail.strip())
             return
 
-        if user_input.lower() in ("clear", "cls"):
-            os.system("cls" if platform.system() == "Windows" else "clear")
+        if _low in ("clear", "cls"):
+            os.system("cls" if _IS_WINDOWS else "clear")
             if self.config.get("clear_show_header", True):
                 self._print_clear_status_line()
             return
@@ -499,6 +444,26 @@ class InputRoutingMixin:
             self._auto_suggest_fix()
             self._regression_check_failure(user_input)
 
+    def _route_lint(self, cmd: str) -> None:
+        """``lint <command>``."""
+        if not cmd:
+            print_error("[Error] Usage: lint <command>")
+            print_dim("Example: lint find . -name '*.py' -exec rm {} \\;")
+            return
+        self._handle_lint(cmd)
+
+    def _route_reindex(self, rest: str) -> None:
+        """``reindex [sub]``  -  ``index rebuild`` unless a subcommand is given."""
+        self.handle_codebase_index(rest or "rebuild")
+
+    def _route_ask(self, question: str) -> None:
+        """``ask <question>``  -  codebase Q&A."""
+        if not question:
+            print_error("[Error] Usage: ask <question about the code>")
+            print_dim("Example: ask how does auth work")
+            return
+        self.handle_codebase_question(question)
+
     def _execute_nl_generated_command(self, cmd: str) -> bool:
         """Execute one NL-generated command, honoring Cliara built-ins first."""
         raw = (cmd or "").strip()
@@ -1,15 +1,20 @@
 """Macro command mixin for Cliara shell."""
 
+import functools
 import os
-import platform
 import re
 import shlex
+import time
+from concurrent.futures import ThreadPoolExecutor, as_completed
 from pathlib import Path
-from typing import Dict, List, Optional
+from typing import Dict, FrozenSet, List, Optional
 
 from cliara import icons
+from cliara.nl.service import _is_llm_refusal
+from cliara.prompt_cache import PromptCache, context_hash
 from cliara.safety import DangerLevel
-from cliara.translation.core import command_exists
+from cliara.storage import MacroTable
+from cliara.translation.core import _WHICH_TTL_S, command_exists
 from cliara.shell_app.runtime import (
     _cliara_console,
     _print_safety_panel,
@@ -26,9 +31,54 @@ from cliara.shell_app.runtime import (
 )
 
 
+@functools.lru_cache(maxsize=1)
+def _scan_path_executables(path: str, pathext: str, windows: bool, bucket: int) -> FrozenSet[str]:
+    """Names of every file in the *path* directories.
+
+    On Windows names are lowercased with their PATHEXT extension stripped.
+    *bucket* only keys the cache, so a new bucket forces a rescan.
+    """
+    exts = tuple(e.lower() for e in pathext.split(os.pathsep) if e)
+    names = set()
+    for directory in path.split(os.pathsep):
+        if not directory:
+            continue
+        try:
+            with os.scandir(directory) as it:
+                for entry in it:
+                    if not windows:
+                        names.add(entry.name)
+                        continue
+                    lower = entry.name.lower()
+                    stem, ext = os.path.splitext(lower)
+                    names.add(lower)
+                    if ext in exts:
+                        names.add(stem)
+        except OSError:
+            continue
+    return frozenset(names)
+
+
 class MacroCommandMixin:
     """Macro command handlers and helpers mixed into CliaraShell."""
 
+    # Short alias -> ``macro`` subcommand it expands to (``m`` passes through).
+    _MACRO_ALIASES = {
+        "mch": "chain",
+        "msh": "show",
+        "msr": "search",
+        "mrn": "rename",
+        "mst": "stats",
+        "ms": "save last as",
+        "mr": "run",
+        "mc": "create",
+        "ml": "list",
+        "ma": "add",
+        "me": "edit",
+        "md": "delete",
+        "mh": "help",
+    }
+
     @staticmethod
     def _expand_macro_alias(user_input: str) -> Optional[str]:
         """
@@ -44,36 +94,12 @@ class MacroCommandMixin:
         rest = parts[1] if len(parts) > 1 else ""
         cmd = head.lower()
 
-        # Longer / specific tokens before short prefixes (e.g. mst before ms)
-        if cmd == "mch":
-            return f"chain {rest}".strip() if rest else "chain"
-        if cmd == "msh":
-            return f"show {rest}".strip() if rest else "show"
-        if cmd == "msr":
-            return f"search {rest}".strip() if rest else "search"
-        if cmd == "mrn":
-            return f"rename {rest}".strip() if rest else "rename"
-        if cmd == "mst":
-            return f"stats {rest}".strip() if rest else "stats"
-        if cmd == "ms":
-            return f"save last as {rest}".strip() if rest else "save last as"
-        if cmd == "mr":
-            return f"run {rest}".strip() if rest else "run"
-        if cmd == "mc":
-            return f"create {rest}".strip() if rest else "create"
-        if cmd == "ml":
-            return f"list {rest}".strip() if rest else "list"
-        if cmd == "ma":
-            return f"add {rest}".strip() if rest else "add"
-        if cmd == "me":
-            return f"edit {rest}".strip() if rest else "edit"
-        if cmd == "md":
-            return f"delete {rest}".strip() if rest else "delete"
-        if cmd == "mh":
-            return f"help {rest}".strip() if rest else "help"
         if cmd == "m":
             return rest.strip()
-        return None
+        sub = MacroCommandMixin._MACRO_ALIASES.get(cmd)
+        if sub is None:
+            return None
+        return f"{sub} {rest}".strip() if rest else sub
 
     # ------------------------------------------------------------------
     # Parameterized-macro helpers
@@ -87,7 +113,7 @@ class MacroCommandMixin:
         seen: set = set()
         result: List[str] = []
         for cmd in commands:
-            for m in re.finditer(r'\{(\w+)\}', cmd):
+            for m in MacroCommandMixin._PARAM_PATTERN.finditer(cmd):
                 p = m.group(1)
                 if p not in seen:
                     seen.add(p)
@@ -109,10 +135,24 @@ class MacroCommandMixin:
 
     @staticmethod
     def _substitute_params(cmd: str, values: Dict[str, str]) -> str:
-        """Replace {param} placeholders in *cmd* with values from *values*."""
-        for param, value in values.items():
-            cmd = cmd.replace(f'{{{param}}}', value)
-        return cmd
+        """Replace {param} placeholders in *cmd* with values from *values*.
+
+        One left-to-right pass over the braces, so a value that itself
+        contains "{other}" is inserted literally rather than substituted again.
+        """
+        if '{' not in cmd or not values:
+            return cmd
+        head, *parts = cmd.split('{')
+        out = [head]
+        for part in parts:
+            name, closed, rest = part.partition('}')
+            if closed and name in values:
+                out.append(values[name])
+                out.append(rest)
+            else:
+                out.append('{')
+                out.append(part)
+        return ''.join(out)
 
     # ------------------------------------------------------------------
     # Macro composition: a macro can `mr <other-macro>` inside its command list.
@@ -294,6 +334,8 @@ class MacroCommandMixin:
             self.macro_save_last(args_rest)
         elif cmd == 'create':
             self.macro_create(args_rest)
+        elif cmd == 'import':
+            self.macro_import(args_rest)
         elif cmd == 'help':
             self.macro_help()
         else:
@@ -471,11 +513,7 @@ class MacroCommandMixin:
 
     def _macro_from_nl_auto(self, nl_description: str) -> None:
         """LLM proposes macro name + commands + description; user confirms then saves."""
-        context = {
-            "cwd": str(Path.cwd()),
-            "os": platform.system(),
-            "shell": self.shell_path or os.environ.get("SHELL", "bash"),
-        }
+        context = self._build_nl_context(os.getcwd())
         from rich.status import Status
 
         with Status("[dim]Designing macro...[/dim]", spinner="dots", console=_cliara_console()):
@@ -524,8 +562,11 @@ class MacroCommandMixin:
         nl_source: str,
         *,
         commands_already_listed: bool = False,
-    ) -> None:
-        """Optional command edit, safety check, description prompt, save."""
+    ) -> Optional[List[str]]:
+        """Optional command edit, safety check, description prompt, save.
+
+        Returns the commands as saved (after any edits), or None if cancelled.
+        """
         if not commands_already_listed:
             self._render_macro_commands_panel("Commands to Save", commands)
         try:
@@ -547,7 +588,7 @@ class MacroCommandMixin:
         except (EOFError, KeyboardInterrupt):
             print()
             print_warning("[Cancelled]")
-            return
+            return None
 
         level, dangerous = self.safety.check_commands(commands)
         if level in (DangerLevel.DANGEROUS, DangerLevel.CRITICAL):
@@ -555,7 +596,7 @@ class MacroCommandMixin:
             confirm = (safe_input("\nSave anyway? (yes/no): ") or "").lower()
             if confirm not in ("yes", "y"):
                 print_warning("[Cancelled]")
-                return
+                return None
 
         default_desc = (suggested_description or "").strip() or nl_source
         try:
@@ -564,14 +605,15 @@ class MacroCommandMixin:
         except (EOFError, KeyboardInterrupt):
             print()
             print_warning("[Cancelled]")
-            return
+            return None
         description = desc_in or default_desc
 
         if not self._check_macro_name_conflict(name):
             print_warning("[Cancelled]")
-            return
+            return None
         self.macros.add(name, commands, description)
         print_success(f"\n[{icons.OK}] Macro '{name}' saved with {len(commands)} command(s)")
+        return commands
 
     def macro_add_nl(self, name: Optional[str] = None):
         """Create a macro using natural language.
@@ -599,29 +641,163 @@ class MacroCommandMixin:
             print_error("[Error] Description required")
             return
 
-        print_info("\n[Generating commands...]")
-        context = {
-            "cwd": str(Path.cwd()),
-            "os": platform.system(),
-            "shell": self.shell_path or os.environ.get("SHELL", "bash"),
-        }
-        commands = self.nl_handler.generate_commands_from_nl(
-            nl_description, context, include_git_snapshot=True
-        )
+        context = self._build_nl_context(os.getcwd())
+        cache = self._macro_prompt_cache()
+        ctx_hash = context_hash(context)
+        commands = cache.lookup(nl_description, ctx_hash)
+        if commands:
+            print_dim("\n[Reusing commands saved for this description]")
+        else:
+            print_info("\n[Generating commands...]")
+            commands = self.nl_handler.generate_commands_from_nl(
+                nl_description, context, include_git_snapshot=True
+            )
+
+            if _is_llm_refusal(commands):
+                print_error(f"[Error] Could not generate commands: {commands[0] if commands else 'Unknown error'}")
+                return
+
+        saved = self._macro_nl_finalize(name, commands, "", nl_description)
+        # Only commands the user kept (edits included) are worth reusing.
+        if saved:
+            cache.add(
+                nl_description,
+                ctx_hash,
+                saved,
+                macro_name=name,
+            )
+
+    def macro_import(self, path_arg: str):
+        """Create many macros from a file of ``name: description`` lines.
+
+        Commands for all descriptions are generated concurrently (up to
+        ``nl_max_concurrency`` LLM requests in flight), then listed for a
+        single confirmation. Existing names and dangerous results are skipped.
+        """
+        path_arg = path_arg.strip().strip('"').strip("'")
+        if not path_arg:
+            print_dim("Usage: macro import <file>   (one 'name: description' per line)")
+            return
+        if not self.nl_handler.llm_enabled:
+            print_error("[Error] LLM not configured. Run 'setup-llm' to configure a free AI provider.")
+            return
 
-        if not commands or (len(commands) == 1 and commands[0].startswith("#")):
-            print_error(f"[Error] Could not generate commands: {commands[0] if commands else 'Unknown error'}")
+        path = Path(path_arg).expanduser()
+        try:
+            lines = path.read_text(encoding="utf-8").splitlines()
+        except OSError as exc:
+            print_error(f"[Error] Could not read {path}: {exc}")
             return
 
-        self._macro_nl_finalize(name, commands, "", nl_description)
+        wanted: Dict[str, str] = {}
+        seen: set = set()
+        for lineno, line in enumerate(lines, 1):
+            line = line.strip()
+            if not line or line.startswith("#"):
+                continue
+            name, sep, description = line.partition(":")
+            name, description = name.strip(), description.strip()
+            if not sep or not name or not description:
+                print_warning(f"  line {lineno}: expected 'name: description'  -  skipped")
+                continue
+            if name in seen:
+                print_warning(f"  line {lineno}: '{name}' is listed more than once  -  skipped")
+                continue
+            seen.add(name)
+            if self.macros.exists(name):
+                print_warning(f"  '{name}' already exists  -  skipped")
+                continue
+            wanted[name] = description
+        if not wanted:
+            print_dim("Nothing to import.")
+            return
+
+        context = self._build_nl_context(os.getcwd())
+        cache = self._macro_prompt_cache()
+        ctx_hash = context_hash(context)
+        results: Dict[str, List[str]] = {}
+        todo: List[str] = []
+        for name, description in wanted.items():
+            cached = cache.lookup(description, ctx_hash)
+            if cached:
+                results[name] = cached
+            else:
+                todo.append(name)
+
+        if todo:
+            try:
+                workers = int(self.config.get("nl_max_concurrency", 4) or 1)
+            except (TypeError, ValueError):
+                workers = 4
+            workers = max(1, min(workers, len(todo)))
+            print_info(f"\n[Generating commands for {len(todo)} macro(s), {workers} at a time...]")
+            with ThreadPoolExecutor(max_workers=workers) as pool:
+                futures = {
+                    pool.submit(
+                        self.nl_handler.generate_commands_from_nl,
+                        wanted[name],
+                        context,
+                        include_git_snapshot=True,
+                    ): name
+                    for name in todo
+                }
+                for done, future in enumerate(as_completed(futures), 1):
+                    name = futures[future]
+                    try:
+                        commands = future.result()
+                    except Exception as exc:
+                        commands = [f"# Error generating commands: {exc}"]
+                    print_dim(f"  [{done}/{len(todo)}] {name}")
+                    if _is_llm_refusal(commands):
+                        print_warning(f"  '{name}': {commands[0] if commands else 'no commands'}  -  skipped")
+                        continue
+                    results[name] = commands
+
+        to_save: Dict[str, List[str]] = {}
+        for name in wanted:
+            commands = results.get(name)
+            if not commands:
+                continue
+            level, _dangerous = self.safety.check_commands(commands)
+            if level in (DangerLevel.DANGEROUS, DangerLevel.CRITICAL):
+                print_warning(f"  '{name}' generated {level.value} commands  -  skipped (use ma {name} --nl to review)")
+                continue
+            to_save[name] = commands
+        if not to_save:
+            print_dim("Nothing to import.")
+            return
+
+        for name, commands in to_save.items():
+            self._render_macro_commands_panel(name, commands)
+        confirm = (safe_input(f"\nSave {len(to_save)} macro(s)? (y/n): ") or "").lower()
+        if confirm not in ("y", "yes"):
+            print_warning("[Cancelled]")
+            return
+        with self.macros.transaction():
+            for name, commands in to_save.items():
+                self.macros.add(name, commands, wanted[name])
+        # Only confirmed results are worth reusing for later `ma --nl` calls.
+        for name in todo:
+            if name in to_save:
+                cache.add(wanted[name], ctx_hash, to_save[name], macro_name=name)
+        print_success(f"[{icons.OK}] Imported {len(to_save)} macro(s)")
+
+    def _macro_prompt_cache(self) -> PromptCache:
+        """Return the NL macro prompt cache, loading it from disk on first use."""
+        if self._macro_nl_cache is None:
+            self._macro_nl_cache = PromptCache(
+                self.config.config_dir / "nl_macro_cache.json"
+            )
+        return self._macro_nl_cache
     
-    def _macro_table(self, macros_iter, title: str):
+    def _macro_table(self, macros: MacroTable, title: str):
         """Render a Rich table for a collection of macros.
 
         Args:
-            macros_iter: iterable of ``(name, Macro)`` pairs, already sorted.
-            title:       header line printed above the table.
+            macros: column table of the macros to show, already sorted.
+            title:  header line printed above the table.
         """
+        from rich.console import Group
         from rich.table import Table
         from rich import box
         from rich.text import Text
@@ -642,36 +818,36 @@ class MacroCommandMixin:
         table.add_column("Description", style="dim")
 
         rows = 0
-        for name, macro in macros_iter:
+        for i, name in enumerate(macros.names):
+            commands = macros.commands[i]
+            run_count = macros.run_counts[i]
             # Effective params: declared ^ auto-detected {var} patterns
-            eff_params = list(macro.params) if macro.params else []
-            for p in self._extract_param_names(macro.commands):
+            eff_params = list(macros.params[i])
+            for p in self._extract_param_names(commands):
                 if p not in eff_params:
                     eff_params.append(p)
             param_str = "  ".join(f"{{{p}}}" for p in eff_params) if eff_params else ""
 
             run_text = Text()
-            if macro.run_count == 0:
+            if run_count == 0:
                 run_text.append(" - ", style="dim")
-            elif macro.run_count >= 10:
-                run_text.append(str(macro.run_count), style="bold green")
+            elif run_count >= 10:
+                run_text.append(str(run_count), style="bold green")
             else:
-                run_text.append(str(macro.run_count), style=_ui_accent_style())
+                run_text.append(str(run_count), style=_ui_accent_style())
 
             table.add_row(
                 name,
                 param_str,
-                str(len(macro.commands)),
+                str(len(commands)),
                 run_text,
-                macro.description or "",
+                macros.descriptions[i],
             )
             rows += 1
 
-        console.print()
-        console.print(f"  {title}")
-        console.print()
-        console.print(table)
-        console.print()
+        # One print (one terminal write) for the whole listing; separate
+        # prints per line are noticeably slow on the Windows console.
+        console.print(Group("", f"  {title}", "", table, ""))
 
     def macro_list(self, args: str = ""):
         """List all macros, optionally filtered by tag (--tag <value>)."""
@@ -684,7 +860,7 @@ class MacroCommandMixin:
                 return
             tag = parts[idx + 1].lower()
 
-        macros = self.macros.list_all()
+        macros = self.macros.list_table()
 
         if not macros:
             print_dim("\nNo macros yet.")
@@ -692,7 +868,10 @@ class MacroCommandMixin:
             return
 
         if tag:
-            macros = {n: m for n, m in macros.items() if tag in [t.lower() for t in m.tags]}
+            macros = macros.select(
+                i for i, tags in enumerate(macros.tags)
+                if tag in [t.lower() for t in tags]
+            )
             if not macros:
                 print_dim(f"\nNo macros tagged '{tag}'.")
                 return
@@ -700,7 +879,7 @@ class MacroCommandMixin:
         else:
             title = f"[cyan][Macros][/cyan]  [bold]{len(macros)}[/bold] total"
 
-        self._macro_table(sorted(macros.items()), title)
+        self._macro_table(macros, title)
     
     def macro_stats(self):
         """Show macro statistics (total, most used, last used, total commands)."""
@@ -735,7 +914,7 @@ class MacroCommandMixin:
         
         kw = keyword.strip()
         self._macro_table(
-            [(m.name, m) for m in sorted(results, key=lambda m: m.name)],
+            MacroTable.from_macros(results),
             f"[cyan][Search: '{kw}'][/cyan]  [bold]{len(results)}[/bold] result{'s' if len(results) != 1 else ''}",
         )
     
@@ -854,6 +1033,7 @@ class MacroCommandMixin:
         confirm = (safe_input(f"Delete macro '{name}'? (y/n): ") or "").lower()
         if confirm in ['y', 'yes']:
             self.macros.delete(name)
+            self._macro_prompt_cache().forget_macro(name)
             print_success(f"[{icons.OK}] Macro '{name}' deleted")
         else:
             print_warning("[Cancelled]")
@@ -881,8 +1061,9 @@ class MacroCommandMixin:
             return
 
         # Re-create under new name preserving all fields, then delete old
-        self.macros.add(new_name, macro.commands, macro.description, tags=macro.tags, params=macro.params)
-        self.macros.delete(old_name)
+        with self.macros.transaction():
+            self.macros.add(new_name, macro.commands, macro.description, tags=macro.tags, params=macro.params)
+            self.macros.delete(old_name)
         print_success(f"[{icons.OK}] Macro '{old_name}' renamed to '{new_name}'")
 
     def macro_save_last(self, args: str):
@@ -957,6 +1138,7 @@ class MacroCommandMixin:
         print_help_cmd("ma <name> --params <p1,p2>", "Declare {p1} placeholders")
         print_help_cmd("ma <name> --nl",        "Generate commands from English (keep name)")
         print_help_cmd("ms <name>",             "Save last executed commands as a macro")
+        print_help_cmd("macro import <file>",   "Generate many macros from 'name: description' lines")
 
         # ── Discover ────────────────────────────────────────────────
         _section("Discover")
@@ -1134,8 +1316,7 @@ class MacroCommandMixin:
             print_header("="*60)
             print_success(f"[{icons.OK}] Macro '{name}' completed successfully")
             print_header("="*60 + "\n")
-            macro.mark_run()
-            self.macros.storage.add(macro, user_id=self.macros.user_id)
+            self.macros.record_run(macro)
 
         # Save to history for "save last" (store template commands, not resolved)
         self.history.set_last_execution(macro.commands)
@@ -1299,8 +1480,7 @@ class MacroCommandMixin:
             if step_failed:
                 return
 
-            macro.mark_run()
-            self.macros.storage.add(macro, user_id=self.macros.user_id)
+            self.macros.record_run(macro)
             print_success(f"[{icons.OK}] {macro.name} completed")
             print()
 
@@ -1324,17 +1504,39 @@ class MacroCommandMixin:
         "m", "mc", "ml", "mr", "ma", "me", "md", "ms", "mst", "msh", "msr", "mch", "mrn", "mh",
     })
 
+    def _path_executables(self) -> FrozenSet[str]:
+        """Names of every file in a PATH directory.
+
+        Used as a cheap negative filter: a name missing here cannot be a
+        system command, so ``command_exists`` only runs on a hit. The scan
+        is redone when PATH changes or after the same TTL as
+        ``command_exists``, so tools installed mid-session are seen.
+        """
+        return _scan_path_executables(
+            os.environ.get("PATH", ""),
+            os.environ.get("PATHEXT", ".COM;.EXE;.BAT;.CMD"),
+            self._os_name == "Windows",
+            int(time.monotonic() // _WHICH_TTL_S),
+        )
+
     def _check_macro_name_conflict(self, name: str) -> bool:
         """
         Warn if a macro name would shadow a system command or Cliara
         built-in.  Returns True if it's OK to proceed, False if the
         user declined.
         """
+        if not name:
+            return True
+
         reason = None
+        lname = name.lower()
 
-        if name.lower() in self._BUILTIN_NAMES:
+        if lname in self._BUILTIN_NAMES:
             reason = f"'{name}' is a Cliara built-in command"
-        elif command_exists(name):
+        elif (
+            (lname if self._os_name == "Windows" else name) in self._path_executables()
+            and command_exists(name)
+        ):
             reason = f"'{name}' is a system command on this machine"
 
         if reason is None:
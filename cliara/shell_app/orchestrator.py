@@ -4,7 +4,7 @@ Handles command pass-through, NL routing, and macro execution.
 """
 
 import collections
-import shutil
+import hashlib
 import subprocess
 import sys
 import os
@@ -12,12 +12,11 @@ import platform
 import queue
 import random
 import re
-import shlex
 import threading
 import time
-from contextlib import contextmanager
+from concurrent.futures import Future, ThreadPoolExecutor
 from datetime import datetime, timedelta
-from typing import Any, Dict, Optional, List, Tuple, Union
+from typing import Any, Dict, Optional, List, Tuple
 from pathlib import Path
 
 from cliara.config import Config
@@ -26,10 +25,12 @@ from cliara.safety import SafetyChecker, DangerLevel
 from cliara.nl.service import NLHandler
 from cliara.diff_preview import DiffPreview
 from cliara.deploy_store import DeployStore
+from cliara.result_cache import ResultCache
 from cliara.semantic_history import SemanticHistoryStore
 from cliara.session_store import (
     SessionStore,
     TaskSession,
+    _cached_root_and_branch,
     _get_project_root,
     _get_branch,
     CLOSEOUT_KEYS,
@@ -92,6 +93,7 @@ from cliara.shell_app.runtime import (
     _nl_query_plain_history_arg,
     _print_safety_panel,
     StreamingThinkingAnimation,
+    buffered_output,
     pick_thinking_word,
     thinking_status,
     print_dim,
@@ -100,6 +102,7 @@ from cliara.shell_app.runtime import (
     print_help_cmd,
     print_help_example,
     print_info,
+    print_plain,
     print_success,
     print_warning,
     safe_input,
@@ -116,6 +119,25 @@ def _git_run(args: List[str]) -> subprocess.CompletedProcess:
     )
 
 
+# Commit-message generation only looks at the start of the staged diff, so
+# stop reading (and stop git) past this many bytes.
+_PUSH_DIFF_MAX_BYTES = 256 * 1024
+
+
+def _git_read_capped(args: List[str], limit: int) -> Tuple[str, bool]:
+    """Return (stdout of *args* up to *limit* bytes, whether it was cut off)."""
+    proc = subprocess.Popen(args, stdout=subprocess.PIPE, stderr=subprocess.DEVNULL)
+    try:
+        data = proc.stdout.read(limit + 1)
+        truncated = len(data) > limit
+        if truncated:
+            proc.kill()
+    finally:
+        proc.stdout.close()
+        proc.wait()
+    return data[:limit].decode("utf-8", "replace"), truncated
+
+
 def _git_ok(args: List[str]) -> bool:
     return subprocess.run(
         args,
@@ -123,6 +145,34 @@ def _git_ok(args: List[str]) -> bool:
         stderr=subprocess.DEVNULL,
     ).returncode == 0
 
+
+def _git_probe_remote_branch(branch: str) -> Optional[bool]:
+    """Non-interactive ``ls-remote`` for *branch* on origin.
+
+    Safe to run in the background: git and ssh are told never to prompt, so
+    a remote that needs credentials just fails. Returns whether the branch
+    exists, or None when the remote could not be asked.
+    """
+    env = dict(os.environ, GIT_TERMINAL_PROMPT="0", GCM_INTERACTIVE="never")
+    env.setdefault("GIT_SSH_COMMAND", "ssh -o BatchMode=yes")
+    try:
+        r = subprocess.run(
+            ["git", "ls-remote", "--heads", "origin", branch],
+            stdin=subprocess.DEVNULL,
+            capture_output=True,
+            text=True,
+            encoding="utf-8",
+            errors="replace",
+            env=env,
+            timeout=30,
+        )
+    except (OSError, subprocess.TimeoutExpired):
+        return None
+    if r.returncode != 0:
+        return None
+    return bool((r.stdout or "").strip())
+
+
 class CliaraShell(
     InputRoutingMixin,
     SessionCommandMixin,
@@ -158,6 +208,9 @@ class CliaraShell(
         progress.step("Loading config...")
         self.config = _cfg
         self._config_undo_stack: collections.deque = collections.deque(maxlen=20)
+        self._refresh_hot_config()
+        self._os_name = platform.system()
+        self._refresh_child_env()
         from cliara.console import set_ui_theme
 
         set_ui_theme(self.config.get("theme"))
@@ -172,6 +225,8 @@ class CliaraShell(
             "connection_string": self.config.get("connection_string"),
         }
         self.macros = MacroManager(config=config_dict)
+        # NL macro description -> commands cache; opened on first `ma <name> --nl`.
+        self._macro_nl_cache = None
 
         progress.step("Loading safety checker...")
         self.safety = SafetyChecker()
@@ -213,10 +268,44 @@ class CliaraShell(
 
         # Deploy store  -  persisted per-project deploy configs
         self.deploy_store = DeployStore()
+        # cwd -> (monotonic ts, (dirty, branch) or None); see _deploy_git_state
+        self._git_state_cache: Dict[str, Tuple[float, Optional[Tuple[bool, str]]]] = {}
+        self._help_text_cache: Dict[Tuple[str, bool, str, int], str] = {}
+        # Persistent PowerShell for Windows completion toasts (started on first use).
+        self._toast_ps: Optional[subprocess.Popen] = None
+        # (repo root, branch) pairs known to exist on origin; saves the
+        # network round-trip of `git ls-remote` on every later push.
+        self._remote_branches: set = set()
+        # NL query -> [commands, explanation]; error -> translate_error() result.
+        # nl_cache.json (older releases) keyed entries by the raw query text.
+        try:
+            (self.config.config_dir / "nl_cache.json").unlink(missing_ok=True)
+        except OSError:
+            pass
+        self._nl_cache = ResultCache(
+            self.config.config_dir / "nl_query_cache.json",
+            self.config.get("nl_cache_size", 256),
+            validate=lambda v: isinstance(v, list) and len(v) == 2 and bool(v[0]),
+        )
+        self._err_cache = ResultCache(
+            self.config.config_dir / "err_cache.json",
+            self.config.get("error_cache_size", 256),
+            validate=lambda v: isinstance(v, dict),
+        )
 
         # Task sessions  -  named, resumable workflow context
         sessions_path = self.config.config_dir / "sessions.json"
         self.session_store = SessionStore(store_path=sessions_path)
+        # Write-behind for per-command session records (see _session_record_command)
+        self._session_write_queue: queue.Queue = queue.Queue()
+        # Rows the writer thread failed to save, retried from the main thread.
+        self._session_failed_writes: collections.deque = collections.deque()
+        self._session_write_error: Optional[Exception] = None
+        self._session_writer_thread = threading.Thread(
+            target=self._session_writer_worker,
+            daemon=True,
+        )
+        self._session_writer_thread.start()
 
         # Ambient pulse glyph (prompt-only; details via `cliara pulse`).
         try:
@@ -451,6 +540,15 @@ class CliaraShell(
 
     _git_ctx_cache: Tuple[float, Dict[str, str]] = (0.0, {})
 
+    def _current_project_root(self) -> Tuple[Path, Optional[str]]:
+        """Return (cwd, project_root) with one getcwd and a cached git lookup.
+
+        The root cache is keyed by cwd and validated against .git/HEAD, so it
+        needs no explicit invalidation on ``cd``.
+        """
+        raw = os.getcwd()
+        return Path(raw), _cached_root_and_branch(raw)[0]
+
     def _get_quick_git_context(self) -> Dict[str, str]:
         """Return {git_branch, git_repo} with a 15 s TTL to avoid subprocess overhead.
 
@@ -467,7 +565,7 @@ class CliaraShell(
             r = subprocess.run(
                 ["git", "rev-parse", "--show-toplevel", "--abbrev-ref", "HEAD"],
                 capture_output=True, text=True, encoding="utf-8", errors="replace", timeout=1.5,
-                cwd=str(Path.cwd()),
+                cwd=os.getcwd(),
             )
             if r.returncode == 0:
                 lines = r.stdout.strip().splitlines()
@@ -495,11 +593,7 @@ class CliaraShell(
                 if summary_override:
                     summary = summary_override
                 else:
-                    context = {
-                        "cwd": cwd or str(Path.cwd()),
-                        "os": platform.system(),
-                        "shell": self.shell_path or os.environ.get("SHELL", "bash"),
-                    }
+                    context = self._build_nl_context(cwd or os.getcwd())
                     summary = self.nl_handler.summarize_command_for_history(command, context) or ""
 
                 # Generate embedding when the feature is enabled
@@ -736,7 +830,7 @@ class CliaraShell(
                 parts.append(f" {self.nl_handler.provider} (ready)")
         else:
             parts.append(" LLM not configured")
-        n_macros = len(self.macros.list_all()) if hasattr(self.macros, "list_all") else 0
+        n_macros = self.macros.count() if hasattr(self.macros, "count") else 0
         if n_macros > 0:
             parts.append(f" · {n_macros} macros")
         if self.current_session:
@@ -918,12 +1012,12 @@ class CliaraShell(
         try:
             from prompt_toolkit import PromptSession
             from prompt_toolkit.auto_suggest import AutoSuggestFromHistory
-            from prompt_toolkit.history import InMemoryHistory
             from prompt_toolkit.key_binding import KeyBindings
             from prompt_toolkit.lexers import PygmentsLexer
             from prompt_toolkit.styles import merge_styles, Style as PTStyle
             from prompt_toolkit.styles.pygments import style_from_pygments_cls
             from cliara.highlighting import ShellLexer, get_style_for_theme, list_themes
+            from cliara.shell_app.prompt_history import CommandHistoryView
 
             # "?"? Theme: always use a valid one (user's choice or default dracula) "?"?
             theme_name = (self.config.get("theme") or "dracula").strip().lower()
@@ -987,11 +1081,9 @@ class CliaraShell(
                 except Exception:
                     pass
 
-            # Seed prompt history from existing command history so
-            # arrow-up recalls previous sessions' commands.
-            pt_history = InMemoryHistory()
-            for cmd in self.history.history:
-                pt_history.store_string(cmd)
+            # Read prompt history straight from the command history so
+            # arrow-up recalls previous sessions' commands without a copy.
+            pt_history = CommandHistoryView(self.history)
 
             style_cls, prompt_style = get_style_for_theme(theme_name)
             style = merge_styles([
@@ -1032,7 +1124,7 @@ class CliaraShell(
                 if self._inline_fix_offer_active and self._inline_fix_offer:
                     self._handle_inline_fix_offer()
 
-                raw_cwd = str(Path.cwd())
+                raw_cwd = os.getcwd()
                 cwd = _fmt_path(raw_cwd)
 
                 # Compute pulse once per prompt (avoid work per keystroke).
@@ -1230,11 +1322,17 @@ class CliaraShell(
             self.handle_codebase_question(query)
             return
 
+        # --no-cache: skip (and refresh) the remembered result for this query.
+        # Only a standalone trailing flag counts, so a question that mentions
+        # it ("how do I pass --no-cache to docker build") is left alone.
+        query, no_cache = self._pop_trailing_flag(query, "--no-cache")
+
         # Check for --save-as <name> flag
         save_as_name = None
         if '--save-as' in query:
             parts = query.split('--save-as', 1)
-            query = parts[0].strip()
+            query, no_cache_before = self._pop_trailing_flag(parts[0].strip(), "--no-cache")
+            no_cache = no_cache or no_cache_before
             save_as_name = parts[1].strip()
             if not save_as_name:
                 print_error("[Error] Macro name required after --save-as")
@@ -1244,86 +1342,27 @@ class CliaraShell(
                 return
         
         # Build context
-        context = {
-            "cwd": str(Path.cwd()),
-            "os": platform.system(),
-            "shell": self.shell_path or os.environ.get("SHELL", "bash")
-        }
-
-        route = "commands"
-        if self.nl_handler.llm_enabled:
-            with thinking_status(query):
-                route = self.nl_handler.route_query_mode(query, context)
-
-        # Informational intent: answer directly, don't force command execution.
-        if route == "answer":
-            if save_as_name:
-                print_warning("[Cancelled] --save-as is only valid for executable command generation.")
+        context = self._build_nl_context(os.getcwd())
+
+        cache_key = self._nl_cache_key(query, context)
+        cached = None if no_cache else self._nl_cache.get(cache_key)
+        if cached is not None:
+            commands, explanation = [str(c) for c in cached[0]], str(cached[1] or "")
+            danger_level, _ = self.safety.check_commands(commands)
+            print_dim("  (cached  -  add --no-cache to regenerate)")
+        else:
+            commands, explanation, danger_level = self._nl_generate(query, context, save_as_name)
+            if commands is None:
                 return
-
-            stream_cb = None
-            ql = query if len(query) <= 48 else (query[:45] + "...")
-            with thinking_status(ql) as status:
-                answer_chars = 0
-
-                if self.config.get("stream_llm", True):
-                    def _answer_stream_cb(chunk: str) -> None:
-                        nonlocal answer_chars
-                        answer_chars += len(chunk or "")
-                        if answer_chars and answer_chars % 120 == 0:
-                            status.update(f"[dim]{answer_chars} chars[/dim]")
-
-                    stream_cb = _answer_stream_cb
-
-                answer = self.nl_handler.answer_query(query, context, stream_callback=stream_cb)
-
-            from rich.panel import Panel
-            from rich.markdown import Markdown
-            from rich.text import Text
-
-            accent = _ui_accent_style()
-            body = (answer or "").strip()
-            if body:
-                renderable = Markdown(body)
-                _cliara_console().print(
-                    Panel(
-                        renderable,
-                        title=Text("Answer", style=accent),
-                        subtitle=Text(f"? {query}", style="dim"),
-                        border_style=accent,
-                        padding=(0, 1),
+            if commands:
+                stored = [self._redact_for_history(c) for c in commands]
+                # A command a secret was scrubbed from would replay the
+                # placeholder, so such results are not cached at all.
+                if stored == list(commands):
+                    self._nl_cache.put(
+                        cache_key, [stored, self._redact_for_history(explanation or "")]
                     )
-                )
-            else:
-                print_error("[Error] No answer content returned from the LLM.")
-            return
-
-        if not self.nl_handler.llm_enabled:
-            print_warning("[LLM not configured  -  run 'setup-llm' to enable natural language commands]")
-            return
-
-        ql = query if len(query) <= 48 else (query[:45] + "...")
-        with thinking_status(ql) as status:
-            progress_chars = 0
-            progress_tick = 0
-
-            def _nl_progress_callback(chunk: str) -> None:
-                nonlocal progress_chars, progress_tick
-                progress_chars += len(chunk or "")
-                next_tick = progress_chars // 120
-                if next_tick > progress_tick:
-                    progress_tick = next_tick
-                    status.update(f"[dim]{progress_chars} chars[/dim]")
 
-            # Safe for JSON agents: only updates spinner label, never prints tokens.
-            setattr(_nl_progress_callback, "__cliara_json_safe__", True)
-
-            commands, explanation, danger_level = self.nl_handler.process_query(
-                query,
-                context,
-                stream_callback=_nl_progress_callback,
-            )
-        
         if not commands:
             print_error(f"[Error] {explanation}")
             return
@@ -1436,6 +1475,108 @@ class CliaraShell(
         # Save to history for "save last"
         self.history.set_last_execution(commands)
 
+    def _nl_generate(
+        self, query: str, context: dict, save_as_name: Optional[str]
+    ) -> Tuple[Optional[List[str]], str, DangerLevel]:
+        """
+        Route *query* and, for the command path, ask the LLM for commands.
+
+        Informational queries are answered in place; that (and a missing
+        LLM) returns ``commands=None`` so the caller stops.
+        """
+        route = "commands"
+        if self.nl_handler.llm_enabled:
+            with thinking_status(query):
+                route = self.nl_handler.route_query_mode(query, context)
+
+        # Informational intent: answer directly, don't force command execution.
+        if route == "answer":
+            if save_as_name:
+                print_warning("[Cancelled] --save-as is only valid for executable command generation.")
+                return None, "", DangerLevel.SAFE
+
+            stream_cb = None
+            ql = query if len(query) <= 48 else (query[:45] + "...")
+            with thinking_status(ql) as status:
+                answer_chars = 0
+
+                if self.config.get("stream_llm", True):
+                    def _answer_stream_cb(chunk: str) -> None:
+                        nonlocal answer_chars
+                        answer_chars += len(chunk or "")
+                        if answer_chars and answer_chars % 120 == 0:
+                            status.update(f"[dim]{answer_chars} chars[/dim]")
+
+                    stream_cb = _answer_stream_cb
+
+                answer = self.nl_handler.answer_query(query, context, stream_callback=stream_cb)
+
+            from rich.panel import Panel
+            from rich.markdown import Markdown
+            from rich.text import Text
+
+            accent = _ui_accent_style()
+            body = (answer or "").strip()
+            if body:
+                renderable = Markdown(body)
+                _cliara_console().print(
+                    Panel(
+                        renderable,
+                        title=Text("Answer", style=accent),
+                        subtitle=Text(f"? {query}", style="dim"),
+                        border_style=accent,
+                        padding=(0, 1),
+                    )
+                )
+            else:
+                print_error("[Error] No answer content returned from the LLM.")
+            return None, "", DangerLevel.SAFE
+
+        if not self.nl_handler.llm_enabled:
+            print_warning("[LLM not configured  -  run 'setup-llm' to enable natural language commands]")
+            return None, "", DangerLevel.SAFE
+
+        ql = query if len(query) <= 48 else (query[:45] + "...")
+        with thinking_status(ql) as status:
+            progress_chars = 0
+            progress_tick = 0
+
+            def _nl_progress_callback(chunk: str) -> None:
+                nonlocal progress_chars, progress_tick
+                progress_chars += len(chunk or "")
+                next_tick = progress_chars // 120
+                if next_tick > progress_tick:
+                    progress_tick = next_tick
+                    status.update(f"[dim]{progress_chars} chars[/dim]")
+
+            # Safe for JSON agents: only updates spinner label, never prints tokens.
+            setattr(_nl_progress_callback, "__cliara_json_safe__", True)
+
+            commands, explanation, danger_level = self.nl_handler.process_query(
+                query,
+                context,
+                stream_callback=_nl_progress_callback,
+            )
+        return commands, explanation, danger_level
+
+    @staticmethod
+    def _pop_trailing_flag(text: str, flag: str) -> Tuple[str, bool]:
+        """Strip *flag* when it is the last whitespace-separated token of *text*."""
+        stripped = text.rstrip()
+        head = stripped[:-len(flag)]
+        if stripped.endswith(flag) and (not head or head[-1].isspace()):
+            return head.rstrip(), True
+        return text, False
+
+    @staticmethod
+    def _nl_cache_key(query: str, context: Dict[str, str]) -> str:
+        # The same words mean different commands in another directory or shell.
+        # Hashed (like the error cache key) so the cache file holds no query text.
+        raw = "\x1f".join(
+            (query.strip(), context.get("cwd", ""), context.get("os", ""), context.get("shell", ""))
+        )
+        return hashlib.blake2b(raw.encode("utf-8", "replace"), digest_size=16).hexdigest()
+
     def handle_fix(self):
         """
         Context-aware error repair: '? fix'
@@ -1518,11 +1659,7 @@ class CliaraShell(
         }
         pygments_theme = _pygments_theme_map.get(theme_name, theme_name)
 
-        context = {
-            "cwd": str(Path.cwd()),
-            "os": platform.system(),
-            "shell": self.shell_path or os.environ.get("SHELL", "bash"),
-        }
+        context = self._build_nl_context(os.getcwd())
 
         # Stream explanation token-by-token; animated spinner shows until first token.
         _explain_chunks: List[str] = []
@@ -1931,6 +2068,7 @@ class CliaraShell(
             else:
                 self.config.settings[key] = old_val
             self.config.save()
+            self._refresh_hot_config()
             cur_str = repr(cur_val) if cur_val is not None else "(not set)"
             old_str = repr(old_val) if old_val is not None else "(not set)"
             print_success(f"  Reverted {key}: {cur_str}  ->  {old_str}  {icons.OK}")
@@ -1967,6 +2105,7 @@ class CliaraShell(
             old_val = self.config.get(key)
             self._config_undo_stack.append((key, old_val))
             self.config.set(key, val)
+            self._refresh_hot_config()
             old_str = repr(old_val) if old_val is not None else "(not set)"
             print_success(f"  {key}: {old_str}  ->  {val!r}  {icons.OK}")
 
@@ -2129,6 +2268,8 @@ class CliaraShell(
             # Set provider in config so credential resolution picks it up
             self.config.settings["llm_provider"] = provider
             self.config._load_env_vars()
+            # Snapshot after _load_env_vars, which can also touch os.environ
+            self._refresh_child_env()
             try:
                 self.config.save()
             except Exception:
@@ -2163,6 +2304,7 @@ class CliaraShell(
                 return
             # Remove from process env so it doesn't leak into the current session
             os.environ.pop(env_var, None)
+            self._refresh_child_env()
             print()
             print_success(f"  Removed key for [{provider.upper()}]")
             # If that was the active provider, clear in-process LLM state so
@@ -2311,6 +2453,7 @@ class CliaraShell(
         if ok:
             self.config.settings["llm_provider"] = target
             self.config._load_env_vars()
+            self._refresh_child_env()
             # Clear incompatible stored model overrides (e.g. gemma4 on OpenAI).
             try:
                 self.config._normalize_models_for_provider(target)
@@ -2725,17 +2868,15 @@ class CliaraShell(
             if self._prev_cwd is None:
                 print_error("[Error] cd -: no previous directory")
                 return
-            target = Path(self._prev_cwd)
-            self._prev_cwd = str(Path.cwd())
+            target = self._prev_cwd
         else:
-            if not args:
-                target = Path.home()
-            else:
-                target = Path(args).expanduser()
-            self._prev_cwd = str(Path.cwd())
+            target = os.path.expanduser(args or "~")
 
         try:
+            old_cwd = os.getcwd()
             os.chdir(target)
+            # Only a successful cd moves the "cd -" target.
+            self._prev_cwd = old_cwd
             try:
                 store = getattr(self, "_jump_store", None)
                 if store is not None:
@@ -2958,13 +3099,17 @@ class CliaraShell(
         """
         flags = self._parse_push_flags(args)
 
+        # Steps 1-3 come from one `git status --porcelain=v2 --branch`: it
+        # fails outside a work tree and its "# branch.head" line names the branch.
+        status_r = _git_run(["git", "status", "--porcelain=v2", "-z", "--branch"])
+
         # --- 1. Are we in a git repo? ---
-        if _git_run(["git", "rev-parse", "--is-inside-work-tree"]).returncode != 0:
+        if status_r.returncode != 0:
             print_error("[Cliara] Not inside a git repository.")
             return
 
         # --- 2. Current branch ---
-        branch = (_git_run(["git", "branch", "--show-current"]).stdout or "").strip()
+        branch, changed_paths = self._parse_status_branch(status_r.stdout or "")
         if not branch:
             print_error("[Cliara] Detached HEAD state  -  checkout a branch first.")
             return
@@ -2980,11 +3125,18 @@ class CliaraShell(
             return
 
         # --- 3. Anything to commit? ---
-        status_output = (_git_run(["git", "status", "--porcelain"]).stdout or "").strip()
-        if not status_output:
+        if not changed_paths:
             self._push_existing_commits(branch, flags)
             return
 
+        # Ask the remote about the branch now, while the user stages and
+        # reviews the message; step 10 picks the answer up.
+        remote_probe = None
+        if (_cached_root_and_branch(os.getcwd())[0], branch) not in self._remote_branches:
+            probe_pool = ThreadPoolExecutor(max_workers=1)
+            remote_probe = probe_pool.submit(_git_probe_remote_branch, branch)
+            probe_pool.shutdown(wait=False)
+
         # --- 4. Show what changed ---
         print_info(f"\n[Cliara] Changes detected on '{branch}':\n")
         subprocess.run(["git", "-c", "color.status=always", "status", "--short"])
@@ -3031,7 +3183,7 @@ class CliaraShell(
             return
 
         # --- 10. Push (set upstream on first push) ---
-        if not self._push_current_branch(branch):
+        if not self._push_current_branch(branch, remote_probe=remote_probe):
             return
         print_success(f"\n[Cliara] Successfully pushed to '{branch}'!")
 
@@ -3087,7 +3239,7 @@ class CliaraShell(
         """
         interactive = sys.stdin.isatty() and self.config.get("push_selective_staging", True)
         if not interactive:
-            subprocess.run(["git", "add", "-A"], capture_output=True, encoding="utf-8", errors="replace")
+            _git_ok(["git", "add", "-A"])
             return self._has_staged_changes()
 
         try:
@@ -3099,7 +3251,7 @@ class CliaraShell(
             return False
 
         if choice in ("", "a", "all"):
-            subprocess.run(["git", "add", "-A"], capture_output=True, encoding="utf-8", errors="replace")
+            _git_ok(["git", "add", "-A"])
         elif choice in ("s", "select"):
             self._stage_select_files()
         elif choice in ("p", "patch"):
@@ -3134,7 +3286,7 @@ class CliaraShell(
         if not sel:
             return
         if sel in ("a", "all"):
-            subprocess.run(["git", "add", "-A"], capture_output=True, encoding="utf-8", errors="replace")
+            _git_ok(["git", "add", "-A"])
             return
         chosen: List[str] = []
         for tok in sel.replace(",", " ").split():
@@ -3143,10 +3295,7 @@ class CliaraShell(
                 if 1 <= idx <= len(entries):
                     chosen.append(entries[idx - 1])
         if chosen:
-            subprocess.run(
-                ["git", "add", "--", *chosen],
-                capture_output=True, encoding="utf-8", errors="replace",
-            )
+            _git_ok(["git", "add", "--", *chosen])
         else:
             print_dim("  No valid selection; nothing staged.")
 
@@ -3160,12 +3309,26 @@ class CliaraShell(
     @staticmethod
     def _staged_diff_bundle() -> Tuple[str, str, List[str]]:
         """Return (diff --stat, full diff, changed files) for the staged index."""
-        diff_stat = (_git_run(["git", "diff", "--cached", "--stat"]).stdout or "").strip()
-        diff_content = (_git_run(["git", "diff", "--cached"]).stdout or "").strip()
-        files = [
-            f for f in (_git_run(["git", "diff", "--cached", "--name-only"]).stdout or "").strip().splitlines()
-            if f
-        ]
+        # --patch-with-stat prints the --stat block and then the full diff,
+        # which starts at the first "diff --git" header (stat lines are
+        # indented, so they never match).
+        with ThreadPoolExecutor(max_workers=1) as pool:
+            diff_f = pool.submit(
+                _git_read_capped,
+                ["git", "diff", "--cached", "--no-color", "--patch-with-stat"],
+                _PUSH_DIFF_MAX_BYTES,
+            )
+            names_r = _git_run(["git", "diff", "--cached", "--name-only", "-z"])
+            out, truncated = diff_f.result()
+        out = "\n" + out
+        split = out.find("\ndiff --git ")
+        if split < 0:
+            split = len(out)
+        diff_stat = out[:split].strip()
+        diff_content = out[split:].strip()
+        if truncated:
+            diff_content += f"\n\n... (diff truncated at {_PUSH_DIFF_MAX_BYTES // 1024} KB) ..."
+        files = [f for f in (names_r.stdout or "").split("\0") if f]
         return diff_stat, diff_content, files
 
     def _generate_commit_message(
@@ -3175,12 +3338,8 @@ class CliaraShell(
         # Don't stream to stdout — the message is shown in a confirmation panel
         # below, and printing it twice looks redundant.
         anim = StreamingThinkingAnimation().start()
-        context = {
-            "cwd": str(Path.cwd()),
-            "os": platform.system(),
-            "shell": self.shell_path or os.environ.get("SHELL", "bash"),
-            "branch": branch,
-        }
+        context = self._build_nl_context(os.getcwd())
+        context["branch"] = branch
         try:
             commit_msg = self.nl_handler.generate_commit_message(
                 diff_stat, diff_content, files, context,
@@ -3203,7 +3362,7 @@ class CliaraShell(
         print_dim(f"  Files:  {n_files} changed")
         print()
         try:
-            response = input("Accept? (y)es / (e)dit / (n)o: ").strip().lower()
+            response = input("Accept? (y)es / (e)dit / (n)o [y]: ").strip().lower()
         except (EOFError, KeyboardInterrupt):
             print()
             return None
@@ -3217,7 +3376,7 @@ class CliaraShell(
                 print_warning("[Cancelled]")
                 return None
             return custom
-        if response not in ("y", "yes"):
+        if response not in ("", "y", "yes"):
             print_warning("[Cancelled]")
             return None
         return commit_msg
@@ -3273,7 +3432,7 @@ class CliaraShell(
             print()
             return False
         if resp in ("r", "retry"):
-            subprocess.run(["git", "add", "-A"], capture_output=True)
+            _git_ok(["git", "add", "-A"])
             return self._commit_with_hook_recovery(
                 commit_msg, amend=amend, no_verify=False, no_edit=no_edit
             )
@@ -3284,22 +3443,38 @@ class CliaraShell(
             )
         return False
 
-    def _push_current_branch(self, branch: str, *, amended: bool = False) -> bool:
+    def _push_current_branch(
+        self, branch: str, *, amended: bool = False, remote_probe: Optional[Future] = None,
+    ) -> bool:
         """Push ``branch`` to origin, setting upstream on first push.
 
         When ``amended`` is set (history was rewritten), uses
         ``--force-with-lease`` so we never clobber concurrent remote work.
+        ``remote_probe`` is a pending :func:`_git_probe_remote_branch`; if it
+        could not reach the remote, we fall back to an interactive ls-remote.
         """
-        remote_exists = bool(
-            (_git_run(["git", "ls-remote", "--heads", "origin", branch]).stdout or "").strip()
-        )
+        key = (_cached_root_and_branch(os.getcwd())[0], branch)
+        remote_exists = True if key in self._remote_branches else None
+        if remote_exists is None and remote_probe is not None:
+            remote_exists = remote_probe.result()
+        if remote_exists is None:
+            remote_exists = bool(
+                (_git_run(["git", "ls-remote", "--heads", "origin", branch]).stdout or "").strip()
+            )
         if not remote_exists:
             print_dim(f"Branch '{branch}' is new on remote  -  setting up tracking...")
-            return self.execute_shell_command(f"git push -u origin {branch}")
-        if amended:
+            ok = self.execute_shell_command(f"git push -u origin {branch}")
+        elif amended:
             print_dim("Amended commit rewrites history  -  pushing with --force-with-lease...")
-            return self.execute_shell_command(f"git push --force-with-lease origin {branch}")
-        return self.execute_shell_command(f"git push origin {branch}")
+            ok = self.execute_shell_command(f"git push --force-with-lease origin {branch}")
+        else:
+            ok = self.execute_shell_command(f"git push origin {branch}")
+        # A failed push may mean the remote branch is gone; ask again next time.
+        if ok:
+            self._remote_branches.add(key)
+        else:
+            self._remote_branches.discard(key)
+        return ok
 
     def _push_existing_commits(self, branch: str, flags: Dict[str, bool]) -> None:
         """Clean tree path: push any unpushed commits, then offer a PR."""
@@ -3710,7 +3885,7 @@ class CliaraShell(
 
     def _unstage_all(self):
         """Reset the staging area (undo git add -A)."""
-        subprocess.run(["git", "reset"], capture_output=True)
+        _git_ok(["git", "reset"])
 
     # ------------------------------------------------------------------
     # Pre-push secret scan
@@ -3946,7 +4121,7 @@ class CliaraShell(
                 parts.append(f"{self.nl_handler.provider} ready")
         else:
             parts.append("no LLM")
-        cwd = _fmt_path(str(Path.cwd()))
+        cwd = _fmt_path(os.getcwd())
         parts.append(cwd)
         if self.current_session:
             parts.append(f"session: {self.current_session.name}")
@@ -3963,6 +4138,11 @@ class CliaraShell(
     def _print_exit_message(self):
         """Styled exit message: 2 lines, plus session resume hint if a session is active."""
         self._flush_semantic_history()
+        self._flush_session_writes()
+        self.history.flush()
+        self._nl_cache.flush()
+        self._err_cache.flush()
+        self.macros.flush()
         try:
             self._shutdown_auto_index()
         except Exception:
@@ -4086,11 +4266,7 @@ class CliaraShell(
         Lint a command: show AI explanation + diff preview (if any), then ask to run.
         Like a dry run  -  explain before running.
         """
-        context = {
-            "cwd": str(Path.cwd()),
-            "os": platform.system(),
-            "shell": self.shell_path or os.environ.get("SHELL", "bash"),
-        }
+        context = self._build_nl_context(os.getcwd())
         explanation = self.nl_handler.explain_command(command, context, stream_callback=None)
         one_line = (explanation or "").strip().split("\n")[0].strip()
         if len(one_line) > 200:
@@ -4129,12 +4305,10 @@ class CliaraShell(
         print_info(f"\n[Explain] {command}")
         print_dim("Analyzing command...\n")
 
+        cwd_str = os.getcwd()
+
         # Build context
-        context = {
-            "cwd": str(Path.cwd()),
-            "os": platform.system(),
-            "shell": self.shell_path or os.environ.get("SHELL", "bash"),
-        }
+        context = self._build_nl_context(cwd_str)
 
         stream_cb = self._stream_callback_for_console() if self.config.get("stream_llm", True) else None
         explanation = self.nl_handler.explain_command(command, context, stream_callback=stream_cb)
@@ -4164,7 +4338,7 @@ class CliaraShell(
             self._semantic_history.update_summary_for_command(
                 safe_command,
                 one_line,
-                str(Path.cwd()),
+                cwd_str,
                 embedding=embedding,
             )
 
@@ -4188,257 +4362,274 @@ class CliaraShell(
 
     def show_help(self):
         """Show main help message."""
-        nl = self.config.get('nl_prefix', '?')
-
-        print_header("\n" + "=" * 60)
-        print_info("  Cliara Help")
-        print_header("=" * 60)
-
-        print_info("\n  Normal Commands")
-        print_dim("  " + "-" * 38)
-        print_dim("  Just type any command  -  it passes through to your shell")
-        print()
-        print_help_example("ls, cd, git status, npm install", label="Examples")
-        print()
-
-        print_info("  Ambient")
-        print_dim("  " + "-" * 38)
-        print_help_cmd("pulse", "Explain the prompt pulse glyph")
-        print()
-        print_help_example("pulse")
-        print()
-
-        print_info("  Natural Language")
-        print_dim("  " + "-" * 38)
-        if self.nl_handler.llm_enabled:
-            print_help_cmd(f"{nl} <query>", "Use natural language")
-        else:
-            print_help_cmd(f"{nl} <query>", "Use natural language (requires API key)")
-        print_help_cmd(f"{nl} <query> --save-as <n>", "Generate & save as macro")
-        print()
-        print_help_example(f"{nl} kill process on port 3000")
-        print()
-
-        print_info("  Explain & Lint")
-        print_dim("  " + "-" * 38)
-        print_help_cmd("explain <command>", "Plain-English explanation of any command")
-        print_help_cmd(
-            "explain last",
-            "Last run: command + output + exit code (one explanation)",
-        )
-        print_help_cmd(f"{nl} explain last", "Same as explain last")
-        print_help_cmd(
-            "lint <command>",
-            "Explain + show impact, then ask to run (dry run)",
-        )
-        print()
-        print_help_example("explain git rebase -i HEAD~3")
-        print_help_example("lint find . -name '*.py' -exec rm {} \\;")
-        print()
-
-        print_info("  Semantic History Search")
-        print_dim("  " + "-" * 38)
-        print_help_cmd(f"{nl} find <what>", "Search past commands by meaning")
-        print_help_cmd(f"{nl} when did I ...", "e.g. when did I fix the login bug")
-        print_help_cmd(f"{nl} what did I run ...", "e.g. what did I run to deploy last time")
-        print_dim("  Requires LLM; uses stored summaries of your commands.\n")
-
-        print_info("  Ghost Run (parallel-universe dry run)")
-        print_dim("  " + "-" * 38)
-        print_help_cmd("ghost <command>", "Run it in a forked sandbox; see the real diff first")
-        print_dim("  Forks the cwd (hardlinks), runs the command THERE, shows exactly")
-        print_dim("  what would be deleted/modified — then one Enter makes it real.")
-        print_dim("  Also offered as 'g' at destructive-command confirmations.")
-        print()
-        print_help_example("ghost rm -rf dist")
-        print_help_example("ghost git clean -fdx")
-        print_dim("  Deletion grammar only (rm/del/erase/rd, git clean); refuses pipes,")
-        print_dim("  network commands, and absolute paths — honestly, with reasons.\n")
-
-        print_info("  Output Archive (Time-Machine)")
-        print_dim("  " + "-" * 38)
-        print_help_cmd("outputs", "Status — what command output is archived here")
-        print_help_cmd("outputs search <what>", "Search archived stdout/stderr by meaning")
-        print_help_cmd("outputs on / off", "Enable or disable archiving (off by default)")
-        print_help_cmd("outputs clear", "Delete this project's archived output")
-        print_dim("  Opt-in: stores secret-scrubbed digests of command output locally.")
-        print_dim(f"  {nl} find / when-did-I answers quote archived output automatically.\n")
-
-        print_info("  Codebase RAG")
-        print_dim("  " + "-" * 38)
-        print_help_cmd("index", "Index git-tracked files into a local vector store")
-        print_help_cmd("index rebuild", "Full re-index (e.g. after switching models)")
-        print_help_cmd("index status", "Show files/chunks indexed and embedding model")
-        print_help_cmd("index clear", "Delete the index for this repo")
-        print_help_cmd("index auto [on|off]", "Self-maintenance: keep the index fresh automatically")
-        print_help_cmd("ask <question>", "Answer from the code, with file:line citations")
-        print_help_cmd(f"{nl} how does <X> work", "Same, when an index exists")
-        print()
-        print_help_example("index")
-        print_help_example("? how does auth work")
-        print_dim("  Incremental: re-running `index` only re-embeds changed files.")
-        print_dim("  Index Sentinel keeps an existing index fresh on its own — no manual rebuilds.\n")
-
-        print_info("  Macros")
-        print_dim("  " + "-" * 38)
-        print_dim("  Short commands are the default; macro ... does the same with full words (e.g. macro list = ml).")
-        print_help_cmd("mc [description]", "Create from English  -  suggested name + steps")
-        print_help_cmd("ma <name>", "Add macro (line-by-line commands)")
-        print_help_cmd("ma <name> --nl", "Keep name; steps from English")
-        print_help_cmd("ma --nl", "Same as mc")
-        print_help_cmd("ml [--tag <tag>]", "List macros  (filter by tag)")
-        print_help_cmd("mr <name>", "Run a macro")
-        print_help_cmd("ms <name>", "Save last run as macro")
-        print_help_cmd("m <sub> [args]", "Passthrough  -  same as macro <sub> ...")
-        print_help_cmd("<macro-name>", "Run  -  type the saved name alone")
-        print_dim("  More commands: type mh in the shell (mst, msh, msr, mch, mrn, me, md).\n")
-        print()
-
-        print_info("  Quick Fix")
-        print_dim("  " + "-" * 38)
-        print_dim("  When a command fails, Cliara automatically shows a fix hint:")
-        print_dim("    hint: try 'python3 script.py' (Tab to use)")
-        print_dim("  Press Tab on an empty prompt to fill in the fix, then Enter.")
-        print_help_cmd(f"{nl} fix", "Full interactive diagnosis")
-        print()
-
-        print_info("  Code Review")
-        print_dim("  " + "-" * 38)
-        print_help_cmd("review", "Review staged changes pre-commit (bugs, tests, APIs)")
-        print_help_cmd("review unstaged", "Review unstaged working-tree changes")
-        print_help_cmd("review all", "Review staged + unstaged together")
-        print_help_cmd(f"{nl} review", "Same as review")
-        print_dim("  Read-only: surfaces likely bugs + missing tests; commits nothing.\n")
-
-        print_info("  Smart Push")
-        print_dim("  " + "-" * 38)
-        print_help_cmd("push", "Stage, scan for secrets, auto-commit, and push")
-        print_dim("  Runs detect-secrets on staged files before committing.")
-        print_dim("  Bypass a line: add  # cliara-noscan  inline.")
-        print_dim("  Disable scan: config set secret_scan_on_push false")
-        print_help_cmd("secret-scan", "Scan staged files for secrets on demand")
-        print_dim("  (feat:, fix:, docs:, ...) from the diff. Accept, edit, or cancel.\n")
-
-        print_info("  Prune Branches")
-        print_dim("  " + "-" * 38)
-        print_help_cmd("prune branches", "Delete merged local branches + prune remotes")
-        print_dim("  Shows a numbered list; pick 'all' or ranges like 1-3,5.\n")
-
-        print_info("  Task Sessions")
-        print_dim("  " + "-" * 38)
-        print_help_cmd(
-            "ss <name> [ -- <intent>]",
-            "Start a task (shortcut for session start)",
-            pad_to=36,
-        )
-        print_help_cmd("session resume <name>", "Resume and see summary + next step")
-        print_help_cmd("se [note]", "End session (shortcut)")
-        print_help_cmd("se --reflect", "End with closeout prompts")
-        print_help_cmd(
-            "session list / show / note",
-            "List, show, or add notes",
-            pad_to=36,
-        )
-        print_help_cmd(
-            "session snapshot --chat [name]",
-            "Copy session for Copilot/Cursor",
-            pad_to=36,
-        )
-        print_dim("  Sessions persist across terminal closes  -  resume anytime.\n")
-
-        print_info("  Copilot / Cursor")
-        print_dim("  " + "-" * 38)
-        print_help_cmd(
-            "chat copy",
-            "Copy last-run markdown (cwd, exit, stderr) to clipboard",
-        )
-        print_help_cmd(
-            "chat polish",
-            "Optional: LLM-compress clipboard (chat_polish_enabled)",
-        )
-        print_help_cmd(
-            "last / retry",
-            "Re-run the last shell command (skip Copilot Gate)",
-        )
-        print()
-
-        print_info("  Smart Deploy")
-        print_dim("  " + "-" * 38)
-        print_help_cmd("deploy", "Auto-detect project and deploy")
-        print_help_cmd("deploy config", "Show saved deploy config")
-        print_help_cmd("deploy history", "Show deploy history")
-        print_help_cmd("deploy reset", "Re-detect deploy target")
-        print_dim("  Detects Vercel, Netlify, Fly.io, Docker, npm, PyPI, and more.")
-        print_dim("  Remembers your config  -  second deploy is just 'deploy' + 'y'.\n")
-
-        print_info("  Theme")
-        print_dim("  " + "-" * 38)
-        print_help_cmd("theme", "List color themes and show current (alias: themes)")
-        print_help_cmd(
-            "theme <name>",
-            "Set theme (same as themes <name>; light = white/snow on dark)",
-        )
-        print_dim("  Stored in ~/.cliara/config.json  -  applies immediately.\n")
-
-        print_info("  Diff Preview")
-        print_dim("  " + "-" * 38)
-        print_dim("  Destructive commands (rm, git checkout, git clean,")
-        print_dim("  git reset) show exactly what will be affected first.")
-        print()
-        print_help_example("rm *.log  ->  shows each file and total size")
-        print()
+        from cliara.console import get_ui_theme
 
-        print_info("  Cross-Platform Translation")
-        print_dim("  " + "-" * 38)
-        print_dim("  If a command doesn't exist on your OS, Cliara suggests")
-        print_dim("  the equivalent automatically.")
-        print()
-        print_help_example("grep on Windows  ->  Select-String (PowerShell)")
-        print()
+        nl = self.config.get('nl_prefix', '?')
+        console = _cliara_console()
+        llm_enabled = bool(self.nl_handler.llm_enabled)
+        # The text only varies with these inputs: render it once through
+        # Rich and replay the captured output afterwards.
+        key = (nl, llm_enabled, get_ui_theme(), console.width)
+        text = self._help_text_cache.get(key)
+        if text is None:
+            with console.capture() as capture:
+                self._render_help(nl, llm_enabled)
+            text = self._help_text_cache[key] = capture.get()
+        console.file.write(text)
+        console.file.flush()
+
+    def _render_help(self, nl: str, llm_enabled: bool):
+        """Print the main help text (captured and cached by show_help)."""
+        with buffered_output():
+            print_header("\n" + "=" * 60)
+            print_info("  Cliara Help")
+            print_header("=" * 60)
+
+            print_info("\n  Normal Commands")
+            print_dim("  " + "-" * 38)
+            print_dim("  Just type any command  -  it passes through to your shell")
+            print_plain()
+            print_help_example("ls, cd, git status, npm install", label="Examples")
+            print_plain()
+
+            print_info("  Ambient")
+            print_dim("  " + "-" * 38)
+            print_help_cmd("pulse", "Explain the prompt pulse glyph")
+            print_plain()
+            print_help_example("pulse")
+            print_plain()
+
+            print_info("  Natural Language")
+            print_dim("  " + "-" * 38)
+            if llm_enabled:
+                print_help_cmd(f"{nl} <query>", "Use natural language")
+            else:
+                print_help_cmd(f"{nl} <query>", "Use natural language (requires API key)")
+            print_help_cmd(f"{nl} <query> --save-as <n>", "Generate & save as macro")
+            print_plain()
+            print_help_example(f"{nl} kill process on port 3000")
+            print_plain()
+
+            print_info("  Explain & Lint")
+            print_dim("  " + "-" * 38)
+            print_help_cmd("explain <command>", "Plain-English explanation of any command")
+            print_help_cmd(
+                "explain last",
+                "Last run: command + output + exit code (one explanation)",
+            )
+            print_help_cmd(f"{nl} explain last", "Same as explain last")
+            print_help_cmd(
+                "lint <command>",
+                "Explain + show impact, then ask to run (dry run)",
+            )
+            print_plain()
+            print_help_example("explain git rebase -i HEAD~3")
+            print_help_example("lint find . -name '*.py' -exec rm {} \\;")
+            print_plain()
+
+            print_info("  Semantic History Search")
+            print_dim("  " + "-" * 38)
+            print_help_cmd(f"{nl} find <what>", "Search past commands by meaning")
+            print_help_cmd(f"{nl} when did I ...", "e.g. when did I fix the login bug")
+            print_help_cmd(f"{nl} what did I run ...", "e.g. what did I run to deploy last time")
+            print_dim("  Requires LLM; uses stored summaries of your commands.\n")
+
+            print_info("  Ghost Run (parallel-universe dry run)")
+            print_dim("  " + "-" * 38)
+            print_help_cmd("ghost <command>", "Run it in a forked sandbox; see the real diff first")
+            print_dim("  Forks the cwd (hardlinks), runs the command THERE, shows exactly")
+            print_dim("  what would be deleted/modified — then one Enter makes it real.")
+            print_dim("  Also offered as 'g' at destructive-command confirmations.")
+            print_plain()
+            print_help_example("ghost rm -rf dist")
+            print_help_example("ghost git clean -fdx")
+            print_dim("  Deletion grammar only (rm/del/erase/rd, git clean); refuses pipes,")
+            print_dim("  network commands, and absolute paths — honestly, with reasons.\n")
+
+            print_info("  Output Archive (Time-Machine)")
+            print_dim("  " + "-" * 38)
+            print_help_cmd("outputs", "Status — what command output is archived here")
+            print_help_cmd("outputs search <what>", "Search archived stdout/stderr by meaning")
+            print_help_cmd("outputs on / off", "Enable or disable archiving (off by default)")
+            print_help_cmd("outputs clear", "Delete this project's archived output")
+            print_dim("  Opt-in: stores secret-scrubbed digests of command output locally.")
+            print_dim(f"  {nl} find / when-did-I answers quote archived output automatically.\n")
+
+            print_info("  Codebase RAG")
+            print_dim("  " + "-" * 38)
+            print_help_cmd("index", "Index git-tracked files into a local vector store")
+            print_help_cmd("index rebuild", "Full re-index (e.g. after switching models)")
+            print_help_cmd("index status", "Show files/chunks indexed and embedding model")
+            print_help_cmd("index clear", "Delete the index for this repo")
+            print_help_cmd("index auto [on|off]", "Self-maintenance: keep the index fresh automatically")
+            print_help_cmd("ask <question>", "Answer from the code, with file:line citations")
+            print_help_cmd(f"{nl} how does <X> work", "Same, when an index exists")
+            print_plain()
+            print_help_example("index")
+            print_help_example("? how does auth work")
+            print_dim("  Incremental: re-running `index` only re-embeds changed files.")
+            print_dim("  Index Sentinel keeps an existing index fresh on its own — no manual rebuilds.\n")
+
+            print_info("  Macros")
+            print_dim("  " + "-" * 38)
+            print_dim("  Short commands are the default; macro ... does the same with full words (e.g. macro list = ml).")
+            print_help_cmd("mc [description]", "Create from English  -  suggested name + steps")
+            print_help_cmd("ma <name>", "Add macro (line-by-line commands)")
+            print_help_cmd("ma <name> --nl", "Keep name; steps from English")
+            print_help_cmd("ma --nl", "Same as mc")
+            print_help_cmd("ml [--tag <tag>]", "List macros  (filter by tag)")
+            print_help_cmd("mr <name>", "Run a macro")
+            print_help_cmd("ms <name>", "Save last run as macro")
+            print_help_cmd("m <sub> [args]", "Passthrough  -  same as macro <sub> ...")
+            print_help_cmd("<macro-name>", "Run  -  type the saved name alone")
+            print_dim("  More commands: type mh in the shell (mst, msh, msr, mch, mrn, me, md).\n")
+            print_plain()
+
+            print_info("  Quick Fix")
+            print_dim("  " + "-" * 38)
+            print_dim("  When a command fails, Cliara automatically shows a fix hint:")
+            print_dim("    hint: try 'python3 script.py' (Tab to use)")
+            print_dim("  Press Tab on an empty prompt to fill in the fix, then Enter.")
+            print_help_cmd(f"{nl} fix", "Full interactive diagnosis")
+            print_plain()
+
+            print_info("  Code Review")
+            print_dim("  " + "-" * 38)
+            print_help_cmd("review", "Review staged changes pre-commit (bugs, tests, APIs)")
+            print_help_cmd("review unstaged", "Review unstaged working-tree changes")
+            print_help_cmd("review all", "Review staged + unstaged together")
+            print_help_cmd(f"{nl} review", "Same as review")
+            print_dim("  Read-only: surfaces likely bugs + missing tests; commits nothing.\n")
+
+            print_info("  Smart Push")
+            print_dim("  " + "-" * 38)
+            print_help_cmd("push", "Stage, scan for secrets, auto-commit, and push")
+            print_dim("  Runs detect-secrets on staged files before committing.")
+            print_dim("  Bypass a line: add  # cliara-noscan  inline.")
+            print_dim("  Disable scan: config set secret_scan_on_push false")
+            print_help_cmd("secret-scan", "Scan staged files for secrets on demand")
+            print_dim("  (feat:, fix:, docs:, ...) from the diff. Accept, edit, or cancel.\n")
+
+            print_info("  Prune Branches")
+            print_dim("  " + "-" * 38)
+            print_help_cmd("prune branches", "Delete merged local branches + prune remotes")
+            print_dim("  Shows a numbered list; pick 'all' or ranges like 1-3,5.\n")
+
+            print_info("  Task Sessions")
+            print_dim("  " + "-" * 38)
+            print_help_cmd(
+                "ss <name> [ -- <intent>]",
+                "Start a task (shortcut for session start)",
+                pad_to=36,
+            )
+            print_help_cmd("session resume <name>", "Resume and see summary + next step")
+            print_help_cmd("se [note]", "End session (shortcut)")
+            print_help_cmd("se --reflect", "End with closeout prompts")
+            print_help_cmd(
+                "session list / show / note",
+                "List, show, or add notes",
+                pad_to=36,
+            )
+            print_help_cmd(
+                "session snapshot --chat [name]",
+                "Copy session for Copilot/Cursor",
+                pad_to=36,
+            )
+            print_dim("  Sessions persist across terminal closes  -  resume anytime.\n")
 
-        print_info("  AI Provider Setup")
-        print_dim("  " + "-" * 38)
-        print_help_cmd("use", "Show active provider and all available options")
-        print_help_cmd(
-            "use <provider>",
-            "Switch provider live: use openai / use ollama / use groq",
-        )
-        print_help_cmd("key", "Show / set / remove / test API keys (key set openai sk-...)")
-        print_help_cmd(
-            "setup-llm",
-            "Configure an AI provider (Groq, Gemini, Ollama, OpenAI...)",
-        )
-        print_help_cmd("setup-ollama", "Set up a local Ollama model")
-        print_help_cmd(
-            "cliara login",
-            "Log in to Cliara Cloud (GitHub OAuth, free tier)",
-        )
-        print_help_cmd("cliara logout", "Sign out and clear stored token")
-        print_dim("  Free options: Groq (groq.com) · Gemini (aistudio.google.com) · Ollama (local)\n")
-
-        print_info("  Other")
-        print_dim("  " + "-" * 38)
-        print_help_cmd("help", "Show this help")
-        print_help_cmd("tips", "Show quick-tips panel (startup banner)")
-        print_help_cmd("tips off / tips on", "Disable or re-enable the 'Did you know?' tip footer")
-        print_help_cmd("last", "Repeat the last command")
-        print_help_cmd("doctor", "Setup health check (shell, LLM, macros, config)")
-        print_help_cmd("history [N]", "Show last N commands (default 20)")
-        print_help_cmd("history clear", "Wipe command history (also: clear-history)")
-        print_help_cmd(
-            f"{nl} find / when did I ...",
-            "Search history by meaning (semantic)",
-            pad_to=36,
-        )
-        print_help_cmd(
-            "config set semantic_history_enabled false",
-            "disable semantic history & ? find",
-            pad_to=42,
-        )
-        print_help_cmd("config undo", "Revert the last config set (up to 20 levels)")
-        print_help_cmd("version / status / readme", "Show version, auth, or generate README")
-        print_help_cmd("exit / Ctrl+C", "Quit Cliara")
+            print_info("  Copilot / Cursor")
+            print_dim("  " + "-" * 38)
+            print_help_cmd(
+                "chat copy",
+                "Copy last-run markdown (cwd, exit, stderr) to clipboard",
+            )
+            print_help_cmd(
+                "chat polish",
+                "Optional: LLM-compress clipboard (chat_polish_enabled)",
+            )
+            print_help_cmd(
+                "last / retry",
+                "Re-run the last shell command (skip Copilot Gate)",
+            )
+            print_plain()
+
+            print_info("  Smart Deploy")
+            print_dim("  " + "-" * 38)
+            print_help_cmd("deploy", "Auto-detect project and deploy")
+            print_help_cmd("deploy config", "Show saved deploy config")
+            print_help_cmd("deploy history", "Show deploy history")
+            print_help_cmd("deploy reset", "Re-detect deploy target")
+            print_dim("  Detects Vercel, Netlify, Fly.io, Docker, npm, PyPI, and more.")
+            print_dim("  Remembers your config  -  second deploy is just 'deploy' + 'y'.\n")
+
+            print_info("  Theme")
+            print_dim("  " + "-" * 38)
+            print_help_cmd("theme", "List color themes and show current (alias: themes)")
+            print_help_cmd(
+                "theme <name>",
+                "Set theme (same as themes <name>; light = white/snow on dark)",
+            )
+            print_dim("  Stored in ~/.cliara/config.json  -  applies immediately.\n")
+
+            print_info("  Diff Preview")
+            print_dim("  " + "-" * 38)
+            print_dim("  Destructive commands (rm, git checkout, git clean,")
+            print_dim("  git reset) show exactly what will be affected first.")
+            print_plain()
+            print_help_example("rm *.log  ->  shows each file and total size")
+            print_plain()
+
+            print_info("  Cross-Platform Translation")
+            print_dim("  " + "-" * 38)
+            print_dim("  If a command doesn't exist on your OS, Cliara suggests")
+            print_dim("  the equivalent automatically.")
+            print_plain()
+            print_help_example("grep on Windows  ->  Select-String (PowerShell)")
+            print_plain()
+
+            print_info("  AI Provider Setup")
+            print_dim("  " + "-" * 38)
+            print_help_cmd("use", "Show active provider and all available options")
+            print_help_cmd(
+                "use <provider>",
+                "Switch provider live: use openai / use ollama / use groq",
+            )
+            print_help_cmd("key", "Show / set / remove / test API keys (key set openai sk-...)")
+            print_help_cmd(
+                "setup-llm",
+                "Configure an AI provider (Groq, Gemini, Ollama, OpenAI...)",
+            )
+            print_help_cmd("setup-ollama", "Set up a local Ollama model")
+            print_help_cmd(
+                "cliara login",
+                "Log in to Cliara Cloud (GitHub OAuth, free tier)",
+            )
+            print_help_cmd("cliara logout", "Sign out and clear stored token")
+            print_dim("  Free options: Groq (groq.com) · Gemini (aistudio.google.com) · Ollama (local)\n")
+
+            print_info("  Other")
+            print_dim("  " + "-" * 38)
+            print_help_cmd("help", "Show this help")
+            print_help_cmd("tips", "Show quick-tips panel (startup banner)")
+            print_help_cmd("tips off / tips on", "Disable or re-enable the 'Did you know?' tip footer")
+            print_help_cmd("last", "Repeat the last command")
+            print_help_cmd("doctor", "Setup health check (shell, LLM, macros, config)")
+            print_help_cmd("history [N]", "Show last N commands (default 20)")
+            print_help_cmd("history clear", "Wipe command history (also: clear-history)")
+            print_help_cmd(
+                f"{nl} find / when did I ...",
+                "Search history by meaning (semantic)",
+                pad_to=36,
+            )
+            print_help_cmd(
+                "config set semantic_history_enabled false",
+                "disable semantic history & ? find",
+                pad_to=42,
+            )
+            print_help_cmd("config undo", "Revert the last config set (up to 20 levels)")
+            print_help_cmd("version / status / readme", "Show version, auth, or generate README")
+            print_help_cmd("exit / Ctrl+C", "Quit Cliara")
 
-        print_header("\n" + "=" * 60 + "\n")
+            print_header("\n" + "=" * 60 + "\n")
 
 
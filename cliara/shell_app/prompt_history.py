@@ -0,0 +1,28 @@
+"""prompt_toolkit history backed directly by Cliara's CommandHistory.
+
+Arrow-up recall and auto-suggest read the entries CommandHistory already
+holds instead of a second copy seeded into an ``InMemoryHistory``.
+"""
+
+from typing import Iterable
+
+from prompt_toolkit.history import History
+
+from cliara.shell_app.runtime import CommandHistory
+
+
+class CommandHistoryView(History):
+    """Read-through view of a :class:`CommandHistory` for ``PromptSession``."""
+
+    def __init__(self, history: CommandHistory):
+        super().__init__()
+        self._history = history
+
+    def load_history_strings(self) -> Iterable[str]:
+        # Most recent first, as prompt_toolkit expects.
+        return reversed(self._history.history)
+
+    def store_string(self, string: str) -> None:
+        # handle_input already records (and redacts) every accepted line in
+        # CommandHistory; prompt_toolkit keeps its own in-session copy.
+        pass
@@ -1,19 +1,20 @@
 """Shared runtime helpers for Cliara shell orchestration."""
 
+import atexit
 import os
-import platform
 import random
 import re
+import string
 import sys
 import threading
 import time
+from collections import deque
 from contextlib import contextmanager
-from datetime import datetime, timedelta
 from pathlib import Path
-from typing import Callable, Dict, List, Optional, Tuple
+from typing import Callable, Deque, FrozenSet, List, Optional, Tuple
 
 from cliara import icons
-from cliara.file_lock import with_file_lock
+from cliara.file_lock import atomic_write, with_file_lock
 from cliara.safety import DangerLevel
 
 # ---------------------------------------------------------------------------
@@ -221,19 +222,35 @@ def _supports_color() -> bool:
     return True
 
 _COLOR = _supports_color()
+_IS_WINDOWS = sys.platform.startswith("win")
+_ansi_ready = False
 
-# Enable ANSI escape sequences on Windows 10+
-if _COLOR and platform.system() == "Windows":
-    os.system("")
+
+def _ensure_ansi_enabled() -> None:
+    """Enable ANSI escape sequences on Windows 10+ the first time output needs them.
+
+    Deferred from import time so importing this module never spawns the
+    ``os.system("")`` subprocess when nothing is printed.
+    """
+    global _ansi_ready
+    if _ansi_ready:
+        return
+    _ansi_ready = True
+    if _COLOR and _IS_WINDOWS:
+        os.system("")
 
 
 def _c(code: str, text: str) -> str:
     """Wrap *text* with an ANSI escape if colors are enabled (progress bar, spinner)."""
-    return f"\033[{code}m{text}\033[0m" if _COLOR else text
+    if not _COLOR:
+        return text
+    _ensure_ansi_enabled()
+    return f"\033[{code}m{text}\033[0m"
 
 
 def _cliara_console():
     """Lazy import to avoid circular deps; Rich used for all Cliara print_* output."""
+    _ensure_ansi_enabled()
     from cliara.console import get_console
     return get_console()
 
@@ -314,6 +331,22 @@ def print_dim(msg: str, end: str = "\n"):
     _cliara_console().print(msg, style="dim", end=end)
 
 
+def print_plain(msg: str = "") -> None:
+    """Print *msg* verbatim through the Cliara console (no markup, no highlighting)."""
+    _cliara_console().print(msg, markup=False, highlight=False)
+
+
+@contextmanager
+def buffered_output():
+    """Hold every print_* line in the block and write them to the terminal at once.
+
+    Use for static listings (help, configs, tables) that would otherwise
+    cost one write + flush per line. Keep ``input()`` prompts outside.
+    """
+    with _cliara_console():
+        yield
+
+
 def safe_input(prompt: str, default: Optional[str] = None) -> Optional[str]:
     """``input()`` wrapper that returns *default* on EOF or Ctrl-C instead of raising.
 
@@ -337,7 +370,7 @@ def read_single_key_no_echo() -> Optional[str]:
         if not hasattr(sys.stdin, "isatty") or not sys.stdin.isatty():
             return None
 
-        if platform.system() == "Windows":
+        if _IS_WINDOWS:
             import msvcrt
 
             ch = msvcrt.getwch()
@@ -466,19 +499,28 @@ def _fmt_path(cwd: str, max_segments: int = 3) -> str:
 # Typo-tolerant "fix" detection
 # ---------------------------------------------------------------------------
 
-def _edit_distance(s: str, t: str) -> int:
-    """Levenshtein edit distance between two short strings."""
-    if len(s) < len(t):
-        return _edit_distance(t, s)
-    if not t:
-        return len(s)
-    prev = list(range(len(t) + 1))
-    for sc in s:
-        curr = [prev[0] + 1]
-        for j, tc in enumerate(t):
-            curr.append(min(curr[j] + 1, prev[j + 1] + 1, prev[j] + (0 if sc == tc else 1)))
-        prev = curr
-    return prev[-1]
+# Characters a one-key typo can introduce (whitespace excluded: a space
+# means a real multi-word query).
+_TYPO_ALPHABET = string.ascii_lowercase + string.digits + string.punctuation
+
+
+def _typo_variants(word: str) -> FrozenSet[str]:
+    """*word*, every string one edit away from it, and its permutations."""
+    out = {word}
+    out.update("".join(p) for p in itertools.permutations(word))
+    for i in range(len(word) + 1):
+        for ch in _TYPO_ALPHABET:
+            out.add(word[:i] + ch + word[i:])               # insertion
+            if i < len(word):
+                out.add(word[:i] + ch + word[i + 1:])       # substitution
+        if i < len(word):
+            out.add(word[:i] + word[i + 1:])                # deletion
+    return frozenset(w for w in out if len(w) >= 2)
+
+
+# Built once at import so each check is a single set lookup.
+_FIX_WORDS = _typo_variants("fix")
+_WHY_WORDS = _typo_variants("why")
 
 
 def _looks_like_fix(query: str) -> bool:
@@ -489,35 +531,14 @@ def _looks_like_fix(query: str) -> bool:
     the user.  Only considers single short words so normal NL queries
     like 'fix the deploy script' are NOT caught.
     """
-    word = query.strip().lower()
-    if word == "fix":
-        return True
-    # Multi-word  ->  real NL query, not a typo
-    if " " in word or len(word) > 5 or len(word) < 2:
-        return False
-    # Single substitution / insertion / deletion
-    if _edit_distance(word, "fix") <= 1:
-        return True
-    # Adjacent-key transposition like "fxi" or "ifx"
-    if sorted(word) == sorted("fix"):
-        return True
-    return False
+    return query.strip().lower() in _FIX_WORDS
 
 
 def _looks_like_why(query: str) -> bool:
     """
     Return True if *query* is 'why' or an obvious typo (for regression deep-dive).
     """
-    word = query.strip().lower()
-    if word == "why":
-        return True
-    if " " in word or len(word) > 4 or len(word) < 2:
-        return False
-    if _edit_distance(word, "why") <= 1:
-        return True
-    if sorted(word) == sorted("why"):
-        return True
-    return False
+    return query.strip().lower() in _WHY_WORDS
 
 
 def _is_explain_last_rest(rest: str) -> bool:
@@ -708,6 +729,9 @@ def _is_codebase_question_intent(query: str) -> bool:
 # Startup progress bar
 # ---------------------------------------------------------------------------
 
+_ANIMATE_STARTUP = bool(os.getenv("CLIARA_ANIMATE_STARTUP"))
+
+
 class _StartupProgress:
     """
     Pip/npm-style progress bar for startup initialization.
@@ -725,25 +749,22 @@ class _StartupProgress:
         self._finished = False
         self._silent = silent
 
+        # Prefer Unicode blocks for a polished bar; fall back on legacy encodings.
+        enc = (getattr(sys.stdout, "encoding", "") or "").lower()
+        use_unicode_bar = ("utf" in enc or "65001" in enc)
+        # Full-width runs of each bar character; _render slices them per step.
+        self._bar_full = ("█" if use_unicode_bar else "#") * self.BAR_WIDTH
+        self._bar_blank = ("░" if use_unicode_bar else ".") * self.BAR_WIDTH
+        self._last_drawn: Optional[Tuple[int, int, str]] = None
+
     # -- internal helpers ---------------------------------------------------
     def _render(self):
         """Redraw the progress line in-place, respecting terminal width."""
         frac = self.current / self.total if self.total else 1
         filled = int(frac * self.BAR_WIDTH)
-        empty = self.BAR_WIDTH - filled
-
-        # Prefer Unicode blocks for a polished bar; fall back on legacy encodings.
-        enc = (getattr(sys.stdout, "encoding", "") or "").lower()
-        use_unicode_bar = ("utf" in enc or "65001" in enc)
-        bar_filled_char = "█" if use_unicode_bar else "#"
-        bar_empty_char = "░" if use_unicode_bar else "."
-
-        bar_filled = _c("36", bar_filled_char * filled) if _COLOR else bar_filled_char * filled
-        bar_empty = _c("2", bar_empty_char * empty) if _COLOR else bar_empty_char * empty
-        pct = f"{int(frac * 100):>3}%"
+        percent = int(frac * 100)
 
         # Fixed-width prefix:  "  " + 30-char bar + " NNN%  " = 39 visible chars
-        prefix = f"  {bar_filled}{bar_empty} {pct}  "
         prefix_visible_len = 2 + self.BAR_WIDTH + 1 + 4 + 2  # 39
 
         # Truncate the label so the full line never exceeds terminal width
@@ -754,10 +775,41 @@ class _StartupProgress:
         max_label = max(cols - prefix_visible_len - 1, 0)  # -1 safety margin
         label = self._label[:max_label]
 
+        # Nothing visible changed since the last redraw: skip the write.
+        drawn = (filled, percent, label)
+        if drawn == self._last_drawn:
+            return
+        self._last_drawn = drawn
+
+        bar_filled = _c("36", self._bar_full[:filled])
+        bar_empty = _c("2", self._bar_blank[filled:])
+        prefix = f"  {bar_filled}{bar_empty} {percent:>3}%  "
+
         line = f"{prefix}{label}"
         # \r returns to column 0; \033[K clears from cursor to end of line
         clear = "\033[K" if _COLOR else " " * max(cols - prefix_visible_len - len(label), 0)
-        sys.stdout.write(f"\r{line}{clear}")
+        self._write(f"\r{line}{clear}")
+
+    @staticmethod
+    def _write(text: str):
+        """Write straight to the terminal fd, skipping the text layer.
+
+        Falls back to ``sys.stdout`` when it is not a real tty (pipes,
+        captured streams), on Windows (the console decodes raw bytes with
+        its own code page, not ``sys.stdout.encoding``), or if the raw
+        write fails.
+        """
+        try:
+            if os.name != "nt" and sys.stdout.isatty():
+                sys.stdout.flush()  # keep ordering with earlier print()s
+                data = text.encode(sys.stdout.encoding or "utf-8", errors="replace")
+                fd = sys.stdout.fileno()
+                while data:
+                    data = data[os.write(fd, data):]
+                return
+        except (AttributeError, OSError, ValueError):
+            pass
+        sys.stdout.write(text)
         sys.stdout.flush()
 
     # -- public API ---------------------------------------------------------
@@ -768,9 +820,10 @@ class _StartupProgress:
         self.current = min(self.current + 1, self.total)
         self._label = label
         self._render()
-        # Tiny pause so the user can actually see the bar move  -  without
-        # this, fast steps would flash by invisibly.
-        time.sleep(0.08)
+        # Opt-in pause so the bar can be watched (demos / recordings); by
+        # default startup runs at the speed of the real work.
+        if _ANIMATE_STARTUP:
+            time.sleep(0.08)
 
     def finish(self):
         """Complete the bar and move to the next line."""
@@ -780,8 +833,7 @@ class _StartupProgress:
         self.current = self.total
         self._label = _c("32", "Ready!") if _COLOR else "Ready!"
         self._render()
-        sys.stdout.write("\n")
-        sys.stdout.flush()
+        self._write("\n")
 
 
 # ---------------------------------------------------------------------------
@@ -927,20 +979,51 @@ class _LiveTimer:
         return f"{h}h{m:02d}m"
 
 
+def _read_tail_lines(path: Path, n: int, chunk_size: int = 64 * 1024) -> List[str]:
+    """Return the last *n* non-blank lines of *path*.
+
+    Reads backwards in *chunk_size* blocks, so the cost depends on *n* rather
+    than on how large the file has grown.
+    """
+    if n <= 0:
+        return []
+    with open(path, "rb") as f:
+        pos = f.seek(0, os.SEEK_END)
+        data = b""
+        lines: List[bytes] = []
+        while pos > 0:
+            step = min(chunk_size, pos)
+            pos -= step
+            f.seek(pos)
+            data = f.read(step) + data
+            lines = data.split(b"\n")
+            if pos > 0:
+                lines = lines[1:]  # first piece may start mid-line
+            if sum(1 for line in lines if line.strip()) >= n:
+                break
+    text = [line.decode("utf-8", errors="replace").rstrip("\r") for line in lines]
+    return [line for line in text if line.strip()][-n:]
+
+
 class CommandHistory:
     """Track command history with on-disk persistence and readline support."""
 
     # Type for (exit_code, timestamp) per entry; None means unknown (e.g. before meta was added)
     _Meta = Tuple[Optional[int], Optional[float]]
 
+    _FLUSH_EVERY = 20   # queued commands before history_file is appended to
+    _TRIM_EVERY = 500   # adds between checks for an oversized history_file
+    _READLINE_BULK_MIN = 200  # above this, GNU readline loads history_file itself
+
     def __init__(
         self,
         max_size: int = 1000,
         history_file: Optional[Path] = None,
         redactor: Optional[Callable[[str], str]] = None,
     ):
-        self.history: List[str] = []
-        self.exit_meta: List["CommandHistory._Meta"] = []  # (exit_code, timestamp) per entry
+        # Bounded deques: appending past max_size evicts the oldest entry in O(1).
+        self.history: Deque[str] = deque(maxlen=max_size)
+        self.exit_meta: Deque["CommandHistory._Meta"] = deque(maxlen=max_size)  # (exit_code, timestamp) per entry
         self.max_size = max_size
         # Scrubs secrets from a command before it is stored (memory + disk +
         # readline). Identity by default. The live command the user typed is
@@ -953,10 +1036,15 @@ class CommandHistory:
             (history_file.parent / "history_meta.json") if history_file else None
         )
         self._readline = None  # Will be set during setup_readline()
+        # Commands waiting to be appended to history_file (see flush()), and
+        # adds since the file was last checked for trimming.
+        self._pending_lines: List[str] = []
+        self._adds_since_trim = 0
 
         # Load persisted history from disk
         if self.history_file:
             self._load_from_file()
+            atexit.register(self.flush)
     
     # ------------------------------------------------------------------
     # Readline integration (arrow-key recall across sessions)
@@ -977,9 +1065,26 @@ class CommandHistory:
             
             self._readline = readline
             
-            # Feed persisted history into readline's buffer
-            for cmd in self.history:
-                readline.add_history(cmd)
+            # Feed persisted history into readline's buffer. GNU readline can
+            # load the whole file in one C call; libedit and pyreadline3 use
+            # a different file format, so they get the per-entry loop.
+            seeded = False
+            if (
+                len(self.history) > self._READLINE_BULK_MIN
+                and self.history_file
+                and "libedit" not in (getattr(readline, "__doc__", "") or "")
+                and not sys.platform.startswith("win")
+            ):
+                try:
+                    self.flush()
+                    readline.read_history_file(str(self.history_file))
+                    seeded = True
+                except OSError:
+                    readline.clear_history()
+            if not seeded:
+                for cmd in self.history:
+                    readline.add_history(cmd)
+            readline.set_history_length(self.max_size)
             
             # Try to bind tab-completion (nice-to-have, not essential)
             try:
@@ -1001,18 +1106,18 @@ class CommandHistory:
             return
         try:
             with with_file_lock(self.history_file):
-                with open(self.history_file, "r", encoding="utf-8") as f:
-                    lines = [line.rstrip("\n") for line in f if line.strip()]
                 # Keep only the last max_size entries
-                self.history = lines[-self.max_size:]
+                self.history = deque(
+                    _read_tail_lines(self.history_file, self.max_size), maxlen=self.max_size
+                )
         except Exception:
             # Corrupt / unreadable file  -  start fresh
-            self.history = []
+            self.history = deque(maxlen=self.max_size)
         self._load_meta()
 
     def _load_meta(self):
         """Load exit code and timestamp meta; must match length of history."""
-        self.exit_meta = [(None, None)] * len(self.history)
+        self.exit_meta = deque([(None, None)] * len(self.history), maxlen=self.max_size)
         if not self._meta_file or not self._meta_file.exists():
             return
         try:
@@ -1035,9 +1140,9 @@ class CommandHistory:
                     loaded.append((None, None))
             # Align: pad at front if we have fewer meta than history
             pad = len(self.history) - len(loaded)
-            self.exit_meta = [(None, None)] * max(0, pad) + loaded
+            self.exit_meta = deque([(None, None)] * max(0, pad) + loaded, maxlen=self.max_size)
         except Exception:
-            self.exit_meta = [(None, None)] * len(self.history)
+            self.exit_meta = deque([(None, None)] * len(self.history), maxlen=self.max_size)
 
     def _save_meta(self):
         """Persist exit_meta to history_meta.json (last max_size entries)."""
@@ -1054,16 +1159,28 @@ class CommandHistory:
             pass
     
     def _append_to_file(self, command: str):
-        """Append a single command to the on-disk history file."""
+        """Queue a command for the on-disk history file; written in batches."""
         if not self.history_file:
             return
+        self._pending_lines.append(command + "\n")
+        if len(self._pending_lines) >= self._FLUSH_EVERY:
+            self.flush()
+
+    def flush(self):
+        """Write queued commands to the history file (one open + write)."""
+        if not self.history_file or not self._pending_lines:
+            return
+        lines, self._pending_lines = self._pending_lines, []
         try:
             self.history_file.parent.mkdir(parents=True, exist_ok=True)
             with with_file_lock(self.history_file):
                 with open(self.history_file, "a", encoding="utf-8") as f:
-                    f.write(command + "\n")
+                    f.writelines(lines)
         except Exception:
             pass  # Non-critical  -  don't crash the shell
+        if self._adds_since_trim >= self._TRIM_EVERY:
+            self._adds_since_trim = 0
+            self._trim_file()
     
     def _trim_file(self):
         """Trim the on-disk file to max_size lines (called occasionally)."""
@@ -1071,12 +1188,16 @@ class CommandHistory:
             return
         try:
             with with_file_lock(self.history_file):
-                with open(self.history_file, "r", encoding="utf-8") as f:
-                    lines = f.readlines()
-                if len(lines) > self.max_size * 2:
-                    # Only trim when the file is significantly over limit
-                    with open(self.history_file, "w", encoding="utf-8") as f:
-                        f.writelines(lines[-self.max_size:])
+                # Only trim when the file is significantly over limit.  Reading
+                # just past that mark from the end answers this without
+                # scanning the whole file.
+                tail = _read_tail_lines(self.history_file, self.max_size * 2 + 1)
+                if len(tail) <= self.max_size * 2:
+                    return
+                atomic_write(
+                    self.history_file,
+                    "".join(line + "\n" for line in tail[-self.max_size:]),
+                )
         except Exception:
             pass
     
@@ -1095,13 +1216,10 @@ class CommandHistory:
             pass
         self.history.append(command)
         self.exit_meta.append((None, None))
-        if len(self.history) > self.max_size:
-            self.history.pop(0)
-            self.exit_meta.pop(0)
 
         # Persist to disk
+        self._adds_since_trim += 1
         self._append_to_file(command)
-        self._trim_file()
         self._save_meta()
 
         # Push into readline buffer so arrow-up sees it immediately
@@ -1122,12 +1240,12 @@ class CommandHistory:
         self, n: int
     ) -> List[Tuple[str, Optional[int], Optional[float]]]:
         """Get last n commands with (exit_code, timestamp); (None, None) if unknown."""
-        commands = self.history[-n:] if n < len(self.history) else self.history.copy()
+        commands = self.get_recent(n)
         start = len(self.history) - len(commands)
+        metas = list(itertools.islice(self.exit_meta, start, None))
         result = []
         for i, cmd in enumerate(commands):
-            idx = start + i
-            meta = self.exit_meta[idx] if idx < len(self.exit_meta) else (None, None)
+            meta = metas[i] if i < len(metas) else (None, None)
             result.append((cmd, meta[0], meta[1]))
         return result
 
@@ -1141,13 +1259,16 @@ class CommandHistory:
     
     def get_recent(self, n: int = 10) -> List[str]:
         """Get n most recent commands."""
-        return self.history[-n:] if n < len(self.history) else self.history.copy()
+        if 0 < n < len(self.history):
+            return list(itertools.islice(self.history, len(self.history) - n, None))
+        return list(self.history)
 
     def clear_all(self) -> None:
         """Remove all command history from memory, disk, and readline (if active)."""
         self.history.clear()
         self.exit_meta.clear()
         self.last_commands.clear()
+        self._pending_lines.clear()
         if self.history_file:
             try:
                 self.history_file.parent.mkdir(parents=True, exist_ok=True)
@@ -1,6 +1,6 @@
 """Session, reflection, chat, and graph command mixin for Cliara shell."""
 
-import platform
+import os
 from pathlib import Path
 from typing import Any, Dict, List, Optional, Tuple
 
@@ -12,8 +12,9 @@ from cliara.chat_export import (
     format_session_for_chat,
 )
 from cliara.execution_graph import build_execution_tree, export_tree_json, render_execution_tree
-from cliara.session_store import CLOSEOUT_KEYS, TaskSession, _get_branch, _get_project_root
+from cliara.session_store import CLOSEOUT_KEYS, TaskSession, _cached_root_and_branch
 from cliara.shell_app.runtime import (
+    buffered_output,
     _cliara_console,
     _ui_accent_style,
     pick_thinking_word,
@@ -21,6 +22,7 @@ from cliara.shell_app.runtime import (
     print_error,
     print_header,
     print_info,
+    print_plain,
     print_success,
     print_warning,
 )
@@ -32,6 +34,8 @@ class SessionCommandMixin:
         """
         Task session subcommands: start, resume, end (optional --reflect), list, show, note, help.
         """
+        # Every subcommand reads the store; make sure queued commands are on disk.
+        self._flush_session_writes()
         parts = subcommand.split(maxsplit=1)
         sub = (parts[0].lower() if parts else "").strip()
         rest = (parts[1] if len(parts) > 1 else "").strip()
@@ -94,9 +98,7 @@ class SessionCommandMixin:
             print_error("[Cliara] Session name cannot be empty.")
             return
 
-        cwd = Path.cwd()
-        project_root = _get_project_root(cwd)
-        branch = _get_branch(cwd)
+        project_root, branch = _cached_root_and_branch(os.getcwd())
 
         if self.current_session:
             print_info(f"[Cliara] Ending current session '{self.current_session.name}'.")
@@ -135,8 +137,7 @@ class SessionCommandMixin:
             print_error("[Cliara] Usage: session resume <name>")
             print_dim("  Use 'session list' to see session names.")
             return
-        cwd = Path.cwd()
-        project_root = _get_project_root(cwd)
+        cwd, project_root = self._current_project_root()
         session = self.session_store.get_by_key(name, project_root)
         if session is None:
             print_error(f"[Cliara] No session named '{name}' in this project.")
@@ -434,28 +435,28 @@ class SessionCommandMixin:
 
     def _session_list(self):
         """List all sessions, or for current project only."""
-        cwd = Path.cwd()
-        project_root = _get_project_root(cwd)
-        sessions = self.session_store.list_by_project(project_root)
-        if not sessions:
-            print_info("[Cliara] No task sessions yet.")
-            print_dim("  ss <name> or session start ...   to start one")
-            return
-        print_info(f"\n[Cliara] Task sessions ({len(sessions)}):\n")
-        for s in sessions:
-            status = "ended" if s.is_ended else "active"
-            intent_preview = (s.intent[:40] + "...") if len(s.intent or "") > 40 else (s.intent or "")
-            print(f"  {s.name}")
-            print_dim(f"    {status}  -  {s.updated}  -  {intent_preview}")
-        print()
+        with buffered_output():
+            cwd, project_root = self._current_project_root()
+            sessions = self.session_store.list_by_project(project_root)
+            if not sessions:
+                print_info("[Cliara] No task sessions yet.")
+                print_dim("  ss <name> or session start ...   to start one")
+                return
+            print_info(f"\n[Cliara] Task sessions ({len(sessions)}):\n")
+            for s in sessions:
+                status = "ended" if s.is_ended else "active"
+                intent = s.intent or ""
+                intent_preview = intent[:40] + ("..." if len(intent) > 40 else "")
+                print_plain(f"  {s.name}")
+                print_dim(f"    {status}  -  {s.updated}  -  {intent_preview}")
+            print_plain()
 
     def _session_show(self, name: str):
         """Show full summary of a session without resuming."""
         if not name:
             print_error("[Cliara] Usage: session show <name>")
             return
-        cwd = Path.cwd()
-        project_root = _get_project_root(cwd)
+        cwd, project_root = self._current_project_root()
         session = self.session_store.get_by_key(name, project_root)
         if session is None:
             print_error(f"[Cliara] No session named '{name}' in this project.")
@@ -480,8 +481,8 @@ class SessionCommandMixin:
 
     def _build_chat_bundle_text(self) -> str:
         """Markdown for last shell run + cwd (for Copilot/Cursor)."""
-        cwd = str(Path.cwd())
-        branch = _get_branch(Path(cwd))
+        cwd = os.getcwd()
+        branch = _cached_root_and_branch(cwd)[1]
         reg_snap = None
         if self.config.get("chat_export_include_regression_snapshot"):
             reg_snap = regression.gather_current_snapshot(Path(cwd))
@@ -500,7 +501,7 @@ class SessionCommandMixin:
         return format_last_run_bundle(
             cwd=cwd,
             shell=default_shell_label(self.shell_path),
-            os_name=platform.system(),
+            os_name=self._os_name,
             branch=branch,
             last_command=self.last_command,
             last_exit_code=self.last_exit_code,
@@ -566,8 +567,7 @@ class SessionCommandMixin:
             return
         name_tokens = [t for t in tokens if t != "--chat"]
         name = " ".join(name_tokens).strip() if name_tokens else None
-        cwd = Path.cwd()
-        project_root = _get_project_root(cwd)
+        cwd, project_root = self._current_project_root()
         if name:
             session = self.session_store.get_by_key(name, project_root)
         else:
@@ -586,27 +586,27 @@ class SessionCommandMixin:
 
     def _session_help(self):
         """Show session command help."""
-        print_info("\n[Cliara] Task sessions  -  persistent, resumable workflow context\n")
-        print("  ss <name> [ -- <intent>]       Short for session start (name can be multi-word)")
-        print("  session start <name> [ -- <intent>]   Same as ss")
-        print("  session resume <name>          Resume and see summary + suggested next step")
-        print("  se [note]                      Short for session end (optional closing note)")
-        print("  se --reflect                   Short for session end --reflect")
-        print("  session end [note]             Same as se")
-        print("  session end --reflect          Closeout prompts (blocked / decided / next; LLM-tailored if configured)")
-        print("  session list                   List sessions for this project")
-        print("  session show <name>             Show session summary without resuming")
-        print("  session graph [name]            Show execution graph (tree); optional: export [file], export --json <file>")
-        print("  session snapshot --chat [name]  Copy session + last-run markdown for Copilot/Cursor")
-        print("  session note <text>            Add a note to the current session")
-        print("  session help                   Show this help")
-        print_dim("\n  Sessions are keyed by name + project (git root). Close the terminal")
-        print_dim("  and run 'session resume <name>' later to continue.\n")
+        with buffered_output():
+            print_info("\n[Cliara] Task sessions  -  persistent, resumable workflow context\n")
+            print_plain("  ss <name> [ -- <intent>]       Short for session start (name can be multi-word)")
+            print_plain("  session start <name> [ -- <intent>]   Same as ss")
+            print_plain("  session resume <name>          Resume and see summary + suggested next step")
+            print_plain("  se [note]                      Short for session end (optional closing note)")
+            print_plain("  se --reflect                   Short for session end --reflect")
+            print_plain("  session end [note]             Same as se")
+            print_plain("  session end --reflect          Closeout prompts (blocked / decided / next; LLM-tailored if configured)")
+            print_plain("  session list                   List sessions for this project")
+            print_plain("  session show <name>             Show session summary without resuming")
+            print_plain("  session graph [name]            Show execution graph (tree); optional: export [file], export --json <file>")
+            print_plain("  session snapshot --chat [name]  Copy session + last-run markdown for Copilot/Cursor")
+            print_plain("  session note <text>            Add a note to the current session")
+            print_plain("  session help                   Show this help")
+            print_dim("\n  Sessions are keyed by name + project (git root). Close the terminal")
+            print_dim("  and run 'session resume <name>' later to continue.\n")
 
     def _session_graph(self, rest: str):
         """Show execution graph for current or named session. Optional: export [path] or export --json <path>."""
-        cwd = Path.cwd()
-        project_root = _get_project_root(cwd)
+        cwd, project_root = self._current_project_root()
 
         # Parse: rest can be "", "<name>", "export [path]", "export --json <path>", or "<name> export ..."
         export_json = False
@@ -4,12 +4,65 @@ Supports multiple storage backends: JSON, PostgreSQL.
 """
 
 from abc import ABC, abstractmethod
-from typing import Dict, List, Optional, TYPE_CHECKING
+from contextlib import contextmanager
+from dataclasses import dataclass, field
+from typing import Any, Dict, Iterable, Iterator, List, Optional, TYPE_CHECKING
 
 if TYPE_CHECKING:
     from cliara.macros import Macro
 
 
+@dataclass
+class MacroTable:
+    """
+    Column-wise view of a macro library, sorted by name.
+
+    Holds just what listings render (name, description, commands, params,
+    tags, run count) as parallel lists, so ``macro list`` never has to build
+    a Macro object per entry.
+    """
+
+    names: List[str] = field(default_factory=list)
+    descriptions: List[str] = field(default_factory=list)
+    commands: List[List[str]] = field(default_factory=list)
+    params: List[List[str]] = field(default_factory=list)
+    tags: List[List[str]] = field(default_factory=list)
+    run_counts: List[int] = field(default_factory=list)
+
+    def __len__(self) -> int:
+        return len(self.names)
+
+    def append(self, name: str, data: Dict[str, Any]) -> None:
+        """Append one row from a macro's ``to_dict()``-shaped data."""
+        commands = data.get("commands") or []
+        self.names.append(name)
+        self.descriptions.append(data.get("description") or "")
+        self.commands.append(commands if isinstance(commands, list) else [commands])
+        self.params.append(data.get("params") or [])
+        self.tags.append(data.get("tags") or [])
+        self.run_counts.append(data.get("run_count") or 0)
+
+    @classmethod
+    def from_macros(cls, macros: Iterable['Macro']) -> 'MacroTable':
+        """Build a table from Macro objects."""
+        table = cls()
+        for macro in sorted(macros, key=lambda m: m.name):
+            table.append(macro.name, macro.to_dict())
+        return table
+
+    def select(self, rows: Iterable[int]) -> 'MacroTable':
+        """Return a new table with only the given row indices."""
+        table = MacroTable()
+        for i in rows:
+            table.names.append(self.names[i])
+            table.descriptions.append(self.descriptions[i])
+            table.commands.append(self.commands[i])
+            table.params.append(self.params[i])
+            table.tags.append(self.tags[i])
+            table.run_counts.append(self.run_counts[i])
+        return table
+
+
 class StorageBackend(ABC):
     """Abstract base class for all storage backends."""
     
@@ -108,3 +161,53 @@ class StorageBackend(ABC):
             Number of macros
         """
         pass
+    
+    def add_many(self, macros: List['Macro'], user_id: Optional[str] = None) -> int:
+        """
+        Add or update several macros.
+        
+        Backends that can write a batch in one round trip should override this.
+        
+        Args:
+            macros: Macros to save
+            user_id: Optional user ID for multi-user support
+        
+        Returns:
+            Number of macros written
+        """
+        for macro in macros:
+            self.add(macro, user_id=user_id)
+        return len(macros)
+    
+    def flush(self):
+        """
+        Persist anything the backend buffers; called on clean shutdown.
+        
+        Backends that write through immediately need not override this.
+        """
+        pass
+    
+    @contextmanager
+    def transaction(self) -> Iterator[None]:
+        """
+        Group several writes so they are committed together.
+        
+        Backends without transactions write through immediately; this
+        default is a no-op.
+        """
+        yield
+    
+    def list_table(self, user_id: Optional[str] = None) -> MacroTable:
+        """
+        Get a column-wise listing of all macros, sorted by name.
+        
+        Backends that can produce the columns without materializing every
+        Macro should override this.
+        
+        Args:
+            user_id: Optional user ID to filter by
+        
+        Returns:
+            MacroTable of all macros
+        """
+        return MacroTable.from_macros(self.list_all(user_id=user_id).values())
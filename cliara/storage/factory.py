@@ -22,7 +22,8 @@ def get_storage_backend(config: Dict[str, Any]) -> StorageBackend:
     Configuration options:
         - storage_backend: "json" (default) or "postgres"
         - For JSON: storage_path (path to macros.json)
-        - For Postgres: connection_string or individual params (host, port, database, user, password)
+        - For Postgres: connection_string or individual params (host, port, database, user, password);
+          postgres.prepared_statements applies to either form
     """
     backend_type = config.get("storage_backend", "json").lower()
     
@@ -32,12 +33,15 @@ def get_storage_backend(config: Dict[str, Any]) -> StorageBackend:
     
     elif backend_type == "postgres":
         # Try connection string first
+        postgres_config = config.get("postgres", {})
         connection_string = config.get("connection_string")
         if connection_string:
-            return PostgresStorage(connection_string=connection_string)
+            return PostgresStorage(
+                connection_string=connection_string,
+                prepared_statements=postgres_config.get("prepared_statements", False),
+            )
         
         # Otherwise use individual parameters
-        postgres_config = config.get("postgres", {})
         return PostgresStorage(**postgres_config)
     
     else:
@@ -1,19 +1,65 @@
 """
 JSON storage backend (current implementation).
 Maintained for backward compatibility and as fallback.
+
+macros.json holds a snapshot; each add/delete is appended as one JSON line
+to macros.wal next to it and replayed on load. The journal is folded back
+into the snapshot once it grows past twice the snapshot's size.
 """
 
 import json
+import mmap
+import os
 from pathlib import Path
-from typing import Dict, List, Optional, TYPE_CHECKING
+from typing import Any, Dict, FrozenSet, List, Optional, Set, Tuple, TYPE_CHECKING
+
+try:
+    import orjson
+    ORJSON_AVAILABLE = True
+except ImportError:
+    ORJSON_AVAILABLE = False
 
-from cliara.file_lock import with_file_lock
-from cliara.storage import StorageBackend
+from cliara.file_lock import atomic_write, with_file_lock
+from cliara.storage import MacroTable, StorageBackend
 
 if TYPE_CHECKING:
     from cliara.macros import Macro
 
 
+# Never compact a journal smaller than this, however small the snapshot.
+_WAL_COMPACT_MIN_BYTES = 64 * 1024
+# Snapshots at least this large are parsed straight from an mmap (orjson
+# only) instead of being read into a bytes copy first.
+_MMAP_MIN_BYTES = 1024 * 1024
+
+
+def _dumps(obj: Any, indent: bool = False) -> bytes:
+    """Serialize to UTF-8 JSON, with orjson when it is installed."""
+    if ORJSON_AVAILABLE:
+        return orjson.dumps(obj, option=orjson.OPT_INDENT_2 if indent else 0)
+    return json.dumps(obj, indent=2 if indent else None, ensure_ascii=False).encode("utf-8")
+
+
+def _load_file(path: Path) -> Any:
+    """Parse a JSON file; large files are parsed in place from an mmap."""
+    if ORJSON_AVAILABLE:
+        with open(path, 'rb') as f:
+            size = os.fstat(f.fileno()).st_size
+            if size >= _MMAP_MIN_BYTES and size > 0:
+                with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mm:
+                    with memoryview(mm) as view:
+                        return orjson.loads(view)
+            return orjson.loads(f.read())
+    return json.loads(path.read_bytes())
+
+
+def _loads(data: bytes) -> Any:
+    """Parse JSON bytes; raises json.JSONDecodeError (orjson's subclasses it)."""
+    if ORJSON_AVAILABLE:
+        return orjson.loads(data)
+    return json.loads(data)
+
+
 class JSONStorage(StorageBackend):
     """JSON file-based storage backend."""
     
@@ -25,8 +71,19 @@ class JSONStorage(StorageBackend):
             storage_path: Path to macros.json file
         """
         self.storage_path = Path(storage_path).expanduser()
+        self.wal_path = self.storage_path.with_suffix(".wal")
         self._ensure_storage()
-        self.macros: Dict[str, Macro] = self._load_macros()
+        # Raw per-macro dicts as read from disk (on first use, see _raw);
+        # Macro objects are built on first access and kept in self.macros.
+        self._raw_data: Optional[Dict[str, Dict[str, Any]]] = None
+        self.macros: Dict[str, Macro] = {}
+        self._table: Optional[MacroTable] = None
+        # Lowercased "name\0description\0tags..." per macro plus the set of
+        # characters they contain; rebuilt lazily after add/delete.
+        self._search_rows: Optional[List[Tuple[str, str]]] = None
+        self._search_chars: FrozenSet[str] = frozenset()
+        # trigram -> indices into _search_rows whose haystack contains it.
+        self._search_trigrams: Dict[str, Set[int]] = {}
     
     def _ensure_storage(self):
         """Ensure storage directory and file exist."""
@@ -34,66 +91,190 @@ class JSONStorage(StorageBackend):
         if not self.storage_path.exists():
             self.storage_path.write_text("{}")
     
-    def _load_macros(self) -> Dict[str, 'Macro']:
-        """Load macros from JSON file."""
-        from cliara.macros import Macro  # Import here to avoid circular import
+    @property
+    def _raw(self) -> Dict[str, Dict[str, Any]]:
+        """Raw macro dicts, read from disk the first time they are needed.
+        
+        One-shot entry points (``cliara -c``, ``cliara do``) build the shell
+        but often never touch a macro, so they skip the read entirely.
+        """
+        if self._raw_data is None:
+            self._raw_data = self._load_macros()
+        return self._raw_data
+    
+    def _load_macros(self) -> Dict[str, Dict[str, Any]]:
+        """Load raw macro dicts from the snapshot plus the journal."""
+        with with_file_lock(self.storage_path):
+            return self._read_disk()
+    
+    def _read_disk(self) -> Dict[str, Dict[str, Any]]:
+        """Read the snapshot and replay the journal. Caller holds the file lock."""
         try:
-            with with_file_lock(self.storage_path):
-                with open(self.storage_path, 'r', encoding='utf-8') as f:
-                    data = json.load(f)
-            return {
-                name: Macro.from_dict(name, macro_data)
-                for name, macro_data in data.items()
-            }
-        except (json.JSONDecodeError, FileNotFoundError):
-            return {}
-    
-    def _save_macros(self):
-        """Save macros to JSON file."""
-        data = {name: macro.to_dict() for name, macro in self.macros.items()}
+            data = _load_file(self.storage_path)
+        except (json.JSONDecodeError, UnicodeDecodeError, FileNotFoundError):
+            data = {}
+        if not isinstance(data, dict):
+            data = {}
+        macros = {name: d for name, d in data.items() if isinstance(d, dict)}
+        try:
+            with open(self.wal_path, 'rb') as f:
+                for line in f:
+                    try:
+                        op = _loads(line)
+                    except (json.JSONDecodeError, UnicodeDecodeError):
+                        continue  # torn last line from an interrupted write
+                    if not isinstance(op, dict) or not isinstance(op.get("name"), str):
+                        continue
+                    if op.get("op") == "put" and isinstance(op.get("macro"), dict):
+                        macros[op["name"]] = op["macro"]
+                    elif op.get("op") == "del":
+                        macros.pop(op["name"], None)
+        except FileNotFoundError:
+            pass
+        return macros
+    
+    def _materialize(self, name: str) -> Optional['Macro']:
+        """Return the Macro for *name*, building it from the raw dict if needed."""
+        macro = self.macros.get(name)
+        if macro is None and name in self._raw:
+            from cliara.macros import Macro  # Import here to avoid circular import
+            macro = Macro.from_dict(name, self._raw[name])
+            self.macros[name] = macro
+        return macro
+    
+    def _append_op(self, op: Dict[str, Any]):
+        """Append one operation to the journal, compacting when it grows large."""
+        line = _dumps(op) + b"\n"
         with with_file_lock(self.storage_path):
-            with open(self.storage_path, 'w', encoding='utf-8') as f:
-                json.dump(data, f, indent=2, ensure_ascii=False)
+            with open(self.wal_path, 'a+b') as f:
+                # Start on a fresh line if an interrupted write left a partial one.
+                if f.seek(0, os.SEEK_END) > 0:
+                    f.seek(-1, os.SEEK_END)
+                    if f.read(1) != b"\n":
+                        line = b"\n" + line
+                f.write(line)
+                wal_size = f.tell()
+            try:
+                snapshot_size = self.storage_path.stat().st_size
+            except OSError:
+                snapshot_size = 0
+            if wal_size > max(2 * snapshot_size, _WAL_COMPACT_MIN_BYTES):
+                self._compact()
+    
+    def _compact(self):
+        """Fold the journal into macros.json. Caller holds the file lock."""
+        # Rebuild from disk rather than memory so ops appended by another
+        # Cliara process since we loaded are kept.
+        data = self._read_disk()
+        # The journal is truncated next, so the snapshot must be on disk.
+        atomic_write(self.storage_path, _dumps(data, indent=True), fsync=True)
+        with open(self.wal_path, 'w', encoding='utf-8'):
+            pass
+    
+    def flush(self):
+        """Fold the journal into macros.json on clean shutdown.
+        
+        Exports, backups and the migrate tool read macros.json directly and
+        would otherwise miss macros that only exist in macros.wal.
+        """
+        try:
+            if self.wal_path.stat().st_size == 0:
+                return
+            with with_file_lock(self.storage_path):
+                self._compact()
+        except OSError:
+            pass
     
     def get(self, name: str, user_id: Optional[str] = None) -> Optional['Macro']:
         """Get a macro by name."""
-        return self.macros.get(name)
+        return self._materialize(name)
     
     def add(self, macro: 'Macro', user_id: Optional[str] = None) -> 'Macro':
         """Add or update a macro."""
         self.macros[macro.name] = macro
-        self._save_macros()
+        self._raw[macro.name] = macro.to_dict()
+        self._search_rows = None
+        self._table = None
+        self._append_op({"op": "put", "name": macro.name, "macro": self._raw[macro.name]})
         return macro
     
     def delete(self, name: str, user_id: Optional[str] = None) -> bool:
         """Delete a macro."""
-        if name in self.macros:
-            del self.macros[name]
-            self._save_macros()
+        if name in self._raw:
+            del self._raw[name]
+            self.macros.pop(name, None)
+            self._search_rows = None
+            self._table = None
+            self._append_op({"op": "del", "name": name})
             return True
         return False
     
     def list_all(self, user_id: Optional[str] = None) -> Dict[str, 'Macro']:
-        """List all macros."""
-        return self.macros.copy()
+        """List all macros (a snapshot: later adds/deletes don't touch it)."""
+        if len(self.macros) != len(self._raw):
+            # Materialize the rest, keeping the on-disk order.
+            self.macros = {name: self._materialize(name) for name in self._raw}
+        return dict(self.macros)
+    
+    def list_table(self, user_id: Optional[str] = None) -> MacroTable:
+        """Column-wise listing built from the raw dicts (no Macro objects)."""
+        if self._table is None:
+            table = MacroTable()
+            for name in sorted(self._raw):
+                macro = self.macros.get(name)
+                table.append(name, macro.to_dict() if macro is not None else self._raw[name])
+            self._table = table
+        return self._table
     
     def search(self, query: str, user_id: Optional[str] = None) -> List['Macro']:
         """Search macros."""
         query_lower = query.lower()
-        results = []
-        
-        for macro in self.macros.values():
-            if (query_lower in macro.name.lower() or
-                query_lower in macro.description.lower() or
-                any(query_lower in tag.lower() for tag in macro.tags)):
-                results.append(macro)
-        
-        return results
+        if "\0" in query_lower:
+            return []
+        if self._search_rows is None:
+            # Built from the raw dicts: only hits become Macro objects.
+            self._search_rows = [
+                (
+                    "\0".join([
+                        name,
+                        data.get("description") or "",
+                        *(str(t) for t in data.get("tags") or []),
+                    ]).lower(),
+                    name,
+                )
+                for name, data in self._raw.items()
+            ]
+            self._search_chars = frozenset("".join(hay for hay, _ in self._search_rows))
+            trigrams: Dict[str, Set[int]] = {}
+            for i, (hay, _) in enumerate(self._search_rows):
+                for j in range(len(hay) - 2):
+                    tri = hay[j:j + 3]
+                    if "\0" not in tri:
+                        trigrams.setdefault(tri, set()).add(i)
+            self._search_trigrams = trigrams
+
+        # A character no macro contains anywhere rules out every match.
+        if not set(query_lower) <= self._search_chars:
+            return []
+        rows = self._search_rows
+        if len(query_lower) >= 3:
+            # Only rows containing every trigram of the query can match.
+            postings = []
+            for j in range(len(query_lower) - 2):
+                posting = self._search_trigrams.get(query_lower[j:j + 3])
+                if not posting:
+                    return []
+                postings.append(posting)
+            postings.sort(key=len)
+            candidates = set(postings[0]).intersection(*postings[1:])
+            rows = [rows[i] for i in sorted(candidates)]
+        # "\0" separates the fields, so a match can never span two of them.
+        return [self._materialize(name) for hay, name in rows if query_lower in hay]
     
     def exists(self, name: str, user_id: Optional[str] = None) -> bool:
         """Check if macro exists."""
-        return name in self.macros
+        return name in self._raw
     
     def count(self, user_id: Optional[str] = None) -> int:
         """Get total count."""
-        return len(self.macros)
+        return len(self._raw)
@@ -3,20 +3,31 @@ PostgreSQL storage backend for Cliara.
 Supports millions of macros with fast queries and multi-user support.
 """
 
+import io
 import json
 import os
-from typing import Dict, List, Optional
+import threading
+import time
+import weakref
+from contextlib import contextmanager
+from typing import Dict, Iterator, List, Optional, Tuple
 from datetime import datetime
 from pathlib import Path
 
 try:
     import psycopg2
-    from psycopg2.extras import RealDictCursor
-    from psycopg2.pool import SimpleConnectionPool
+    from psycopg2.extras import Json, NamedTupleCursor, execute_values
+    from psycopg2.pool import ThreadedConnectionPool
     PSYCOPG2_AVAILABLE = True
 except ImportError:
     PSYCOPG2_AVAILABLE = False
 
+try:
+    import orjson
+    ORJSON_AVAILABLE = True
+except ImportError:
+    ORJSON_AVAILABLE = False
+
 from cliara.storage import StorageBackend
 from typing import TYPE_CHECKING
 
@@ -24,6 +35,131 @@ if TYPE_CHECKING:
     from cliara.macros import Macro
 
 
+# libpq settings applied unless the connection string overrides them: TCP
+# keepalives so a pooled connection dropped by a NAT or load balancer is
+# noticed instead of hanging.
+_CONNECT_DEFAULTS = {
+    "application_name": "cliara",
+    "keepalives": 1,
+    "keepalives_idle": 30,
+    "keepalives_interval": 10,
+    "keepalives_count": 3,
+}
+
+# Server-side cap on abandoned transactions, SET on each new connection (not
+# passed as the "options" startup parameter, which PgBouncer rejects).
+_IDLE_IN_TRANSACTION_TIMEOUT_MS = 60_000
+
+# Batches larger than this are loaded with COPY instead of multi-row INSERTs.
+_COPY_MIN_ROWS = 1024
+
+# count() trusts the planner's row estimate above this many rows rather than
+# scanning; count_exact() always scans.
+_EXACT_COUNT_MAX = 10_000
+
+# get() results (misses included) are reused for this many seconds; this
+# process's own writes evict them immediately.
+_GET_CACHE_TTL = 5.0
+_GET_CACHE_MAX = 256
+
+# Rows fetched per round trip by iter_all()'s server-side cursor.
+_STREAM_PAGE_ROWS = 1000
+
+_BULK_COLUMNS = (
+    "user_id, name, commands, description, tags, params, "
+    "created_at, run_count, last_run"
+)
+_BULK_UPSERT = """
+    ON CONFLICT (user_id, name)
+    DO UPDATE SET
+        commands = EXCLUDED.commands,
+        description = EXCLUDED.description,
+        tags = EXCLUDED.tags,
+        params = EXCLUDED.params,
+        updated_at = CURRENT_TIMESTAMP,
+        run_count = EXCLUDED.run_count,
+        last_run = EXCLUDED.last_run
+"""
+
+
+_MACRO_COLUMNS = (
+    "name, commands, description, tags, params, created_at, run_count, last_run"
+)
+
+# Point-lookup statements: name -> (PREPARE parameter types, SQL). With
+# prepared_statements on they are prepared once per pooled connection so
+# lookups skip parse/plan; otherwise the SQL runs as a plain query.
+_STATEMENTS = {
+    "cliara_get": ("(text, text)", f"""
+        SELECT {_MACRO_COLUMNS} FROM macros WHERE name = %s AND user_id = %s"""),
+    "cliara_get_anon": ("(text)", f"""
+        SELECT {_MACRO_COLUMNS} FROM macros WHERE name = %s AND user_id IS NULL"""),
+    "cliara_delete": ("(text, text)", """
+        DELETE FROM macros WHERE name = %s AND user_id = %s"""),
+    "cliara_delete_anon": ("(text)", """
+        DELETE FROM macros WHERE name = %s AND user_id IS NULL"""),
+    "cliara_upsert": ("(text, text, jsonb, text, text[], jsonb, timestamp, integer, timestamp)", f"""
+        INSERT INTO macros ({_BULK_COLUMNS})
+        VALUES (%s, %s, %s, %s, %s, %s, %s, %s, %s)
+        {_BULK_UPSERT}"""),
+}
+
+
+def _numbered_params(sql: str) -> str:
+    """Rewrite %s placeholders as $1, $2, ... for PREPARE."""
+    parts = sql.split("%s")
+    out = [parts[0]]
+    for i, part in enumerate(parts[1:], 1):
+        out.append(f"${i}")
+        out.append(part)
+    return "".join(out)
+
+
+def _user_filter(user_id: Optional[str]) -> str:
+    """WHERE predicate selecting *user_id*'s rows (bind it as %(user_id)s).
+    
+    Kept as two forms rather than IS NOT DISTINCT FROM, which the
+    (user_id, name) index cannot serve.
+    """
+    return "user_id = %(user_id)s" if user_id else "user_id IS NULL"
+
+
+def _copy_field(value) -> str:
+    """Encode one value for COPY's text format (\\N is NULL)."""
+    if value is None:
+        return "\\N"
+    return (
+        str(value)
+        .replace("\\", "\\\\")
+        .replace("\t", "\\t")
+        .replace("\n", "\\n")
+        .replace("\r", "\\r")
+    )
+
+
+def _json_text(obj) -> str:
+    """Serialize to a JSON string, with orjson when it is installed."""
+    if ORJSON_AVAILABLE:
+        return orjson.dumps(obj).decode("utf-8")
+    return json.dumps(obj)
+
+
+def _as_list(value) -> list:
+    """Coerce a JSON column value that psycopg2 did not decode to a list."""
+    if isinstance(value, str):
+        value = orjson.loads(value) if ORJSON_AVAILABLE else json.loads(value)
+    return list(value) if value else []
+
+
+def _pg_array(items: List[str]) -> str:
+    """Format a list of strings as a PostgreSQL array literal."""
+    quoted = (
+        '"' + str(item).replace("\\", "\\\\").replace('"', '\\"') + '"'
+        for item in items
+    )
+    return "{" + ",".join(quoted) + "}"
+
+
 class PostgresStorage(StorageBackend):
     """PostgreSQL-based storage backend."""
     
@@ -36,6 +172,10 @@ class PostgresStorage(StorageBackend):
                 Format: postgresql://user:<secret>@host:port/database
             **kwargs: Alternative connection parameters
                 - host, port, database, user, password
+                - pool_size: maximum pooled connections (default 10)
+                - prepared_statements: PREPARE point lookups once per
+                  connection (default False; leave off behind
+                  transaction-pooling proxies such as PgBouncer)
         """
         if not PSYCOPG2_AVAILABLE:
             raise ImportError(
@@ -57,17 +197,124 @@ class PostgresStorage(StorageBackend):
             # Build DSN-style connection string without hardcoding secrets
             self.connection_string = f"postgresql://{user}:{db_password}@{host}:{port}/{database}"
         
-        # Test connection and initialize schema
+        # Connections are reused across calls instead of paying the
+        # TCP/TLS/auth handshake per query; this also tests the connection.
+        # Connection settings given in the DSN win over our defaults.
+        connect_params = {
+            **_CONNECT_DEFAULTS,
+            **psycopg2.extensions.parse_dsn(self.connection_string),
+        }
+        self.pool_size = int(kwargs.get('pool_size', 10))
+        self.prepared_statements = bool(kwargs.get('prepared_statements', False))
+        # Rows come back as namedtuples: the row class is built once per
+        # query shape instead of a dict per row.
+        self._pool = ThreadedConnectionPool(
+            minconn=1,
+            maxconn=self.pool_size,
+            cursor_factory=NamedTupleCursor,
+            **connect_params,
+        )
+        # Connection shared by a transaction() block, per thread.
+        self._local = threading.local()
+        # (name, user_id) -> (macro or None, time.monotonic() when read)
+        self._cache: Dict[Tuple[str, Optional[str]], Tuple[Optional['Macro'], float]] = {}
+        self._cache_lock = threading.Lock()
+        self._macro_cls = None  # cliara.macros.Macro, imported on first row
+        # Pooled connections already configured / holding _STATEMENTS.
+        self._configured: 'weakref.WeakSet' = weakref.WeakSet()
+        self._prepared: 'weakref.WeakSet' = weakref.WeakSet()
         self._init_schema()
     
-    def _get_connection(self):
-        """Get database connection."""
-        return psycopg2.connect(self.connection_string)
+    @contextmanager
+    def _conn(self, prepare: bool = True) -> Iterator['psycopg2.extensions.connection']:
+        """Borrow a pooled connection; any open transaction is rolled back on return.
+        
+        Inside transaction() every call on this thread shares one connection.
+        """
+        shared = getattr(self._local, 'conn', None)
+        if shared is not None:
+            yield shared
+            return
+        conn = self._pool.getconn()
+        try:
+            if conn not in self._configured:
+                self._configure_session(conn)
+            if prepare and self.prepared_statements and conn not in self._prepared:
+                with conn.cursor() as cur:
+                    for name, (types, sql) in _STATEMENTS.items():
+                        cur.execute(f"PREPARE {name} {types} AS {_numbered_params(sql)}")
+                conn.commit()
+                self._prepared.add(conn)
+            yield conn
+        finally:
+            self._pool.putconn(conn)
+    
+    def _configure_session(self, conn):
+        """Apply per-session settings to a new pooled connection.
+        
+        Best effort: a server or pooler that refuses the SET just runs
+        without the idle-in-transaction cap.
+        """
+        try:
+            with conn.cursor() as cur:
+                cur.execute(
+                    "SET idle_in_transaction_session_timeout = "
+                    f"{int(_IDLE_IN_TRANSACTION_TIMEOUT_MS)}"
+                )
+            conn.commit()
+        except psycopg2.Error:
+            conn.rollback()
+        self._configured.add(conn)
+    
+    def _run(self, cur, statement: str, args: tuple):
+        """Run one of _STATEMENTS, via EXECUTE when it is prepared."""
+        if self.prepared_statements:
+            placeholders = ", ".join(["%s"] * len(args))
+            cur.execute(f"EXECUTE {statement} ({placeholders})", args)
+        else:
+            cur.execute(_STATEMENTS[statement][1], args)
+    
+    def _run_for_user(self, cur, statement: str, name: str, user_id: Optional[str]):
+        """Run *statement* for macro *name*, or its _anon twin without a user."""
+        if user_id:
+            self._run(cur, statement, (name, user_id))
+        else:
+            self._run(cur, f"{statement}_anon", (name,))
+    
+    def _commit(self, conn):
+        """Commit, unless a transaction() block will commit for us."""
+        if getattr(self._local, 'conn', None) is None:
+            conn.commit()
+    
+    @contextmanager
+    def transaction(self) -> Iterator[None]:
+        """Group writes on this thread into one transaction, committed on exit.
+        
+        Any exception rolls the whole group back. Nested blocks join the
+        outer one.
+        """
+        if getattr(self._local, 'conn', None) is not None:
+            yield
+            return
+        with self._conn() as conn:
+            self._local.conn = conn
+            try:
+                yield
+                conn.commit()
+            except BaseException:
+                conn.rollback()
+                raise
+            finally:
+                self._local.conn = None
+    
+    def close(self):
+        """Close every pooled connection."""
+        self._pool.closeall()
     
     def _init_schema(self):
         """Initialize database schema."""
-        conn = self._get_connection()
-        try:
+        # The prepared statements reference the table, so prepare afterwards.
+        with self._conn(prepare=False) as conn:
             with conn.cursor() as cur:
                 # Create macros table
                 cur.execute("""
@@ -92,270 +339,300 @@ class PostgresStorage(StorageBackend):
                     ALTER TABLE macros ADD COLUMN IF NOT EXISTS params JSONB DEFAULT '[]'
                 """)
                 
-                # Create indexes for performance
-                cur.execute("""
-                    CREATE INDEX IF NOT EXISTS idx_macros_user_name 
-                    ON macros(user_id, name)
-                """)
+                # Create indexes for performance. (user_id, name) lookups use
+                # the UNIQUE constraint's index; a second copy only slowed writes.
+                cur.execute("DROP INDEX IF EXISTS idx_macros_user_name")
                 
                 cur.execute("""
                     CREATE INDEX IF NOT EXISTS idx_macros_tags 
                     ON macros USING GIN(tags)
                 """)
                 
+                # Public macros in get_public_macros()' order, so the LIMIT
+                # reads the first rows of the index instead of sorting.
+                cur.execute("DROP INDEX IF EXISTS idx_macros_public")
                 cur.execute("""
-                    CREATE INDEX IF NOT EXISTS idx_macros_public 
-                    ON macros(is_public) WHERE is_public = TRUE
+                    CREATE INDEX IF NOT EXISTS idx_macros_public_popular
+                    ON macros(run_count DESC, created_at DESC) WHERE is_public = TRUE
                 """)
                 
-                # Full-text search index (removed - can cause issues, search uses ILIKE instead)
-                # Full-text search is handled via ILIKE queries in search() method
+                # No query filters on commands; the GIN index only slowed writes.
+                cur.execute("DROP INDEX IF EXISTS idx_macros_commands_gin")
                 
-                conn.commit()
-        finally:
-            conn.close()
-    
-    def get(self, name: str, user_id: Optional[str] = None) -> Optional['Macro']:
-        """Get a macro by name."""
-        conn = self._get_connection()
-        try:
-            with conn.cursor(cursor_factory=RealDictCursor) as cur:
-                if user_id:
+                # Tags joined into one string (immutable, so it can be indexed);
+                # the separator keeps a search match from spanning two tags.
+                cur.execute("""
+                    CREATE OR REPLACE FUNCTION cliara_tags_text(text[])
+                    RETURNS text LANGUAGE sql IMMUTABLE
+                    AS $$ SELECT array_to_string($1, E'\\x1f') $$
+                """)
+                
+                # Trigram indexes let search()'s ILIKE '%q%' use an index
+                # instead of a sequential scan. pg_trgm may need privileges we
+                # don't have; search still works without it, just unindexed.
+                cur.execute("SAVEPOINT trgm")
+                try:
+                    cur.execute("CREATE EXTENSION IF NOT EXISTS pg_trgm")
                     cur.execute("""
-                        SELECT name, commands, description, tags, params,
-                               created_at, run_count, last_run
-                        FROM macros
-                        WHERE name = %s AND user_id = %s
-                    """, (name, user_id))
-                else:
+                        CREATE INDEX IF NOT EXISTS idx_macros_name_trgm
+                        ON macros USING GIN (name gin_trgm_ops)
+                    """)
+                    cur.execute("""
+                        CREATE INDEX IF NOT EXISTS idx_macros_description_trgm
+                        ON macros USING GIN (description gin_trgm_ops)
+                    """)
                     cur.execute("""
-                        SELECT name, commands, description, tags, params,
-                               created_at, run_count, last_run
-                        FROM macros
-                        WHERE name = %s AND user_id IS NULL
-                    """, (name,))
+                        CREATE INDEX IF NOT EXISTS idx_macros_tags_trgm
+                        ON macros USING GIN (cliara_tags_text(tags) gin_trgm_ops)
+                    """)
+                    cur.execute("RELEASE SAVEPOINT trgm")
+                except psycopg2.Error:
+                    cur.execute("ROLLBACK TO SAVEPOINT trgm")
                 
+                conn.commit()
+    
+    def get(self, name: str, user_id: Optional[str] = None) -> Optional['Macro']:
+        """Get a macro by name (answered from a short-lived cache when fresh)."""
+        key = (name, user_id)
+        with self._cache_lock:
+            hit = self._cache.get(key)
+        if hit is not None and time.monotonic() - hit[1] < _GET_CACHE_TTL:
+            return hit[0]
+        
+        with self._conn() as conn:
+            with conn.cursor() as cur:
+                self._run_for_user(cur, "cliara_get", name, user_id)
                 row = cur.fetchone()
-                if row:
-                    return self._row_to_macro(row)
-                return None
-        finally:
-            conn.close()
+        macro = self._row_to_macro(row) if row else None
+        # Rows read inside transaction() may yet be rolled back; don't keep them.
+        if getattr(self._local, 'conn', None) is None:
+            with self._cache_lock:
+                if len(self._cache) >= _GET_CACHE_MAX:
+                    self._cache.clear()
+                self._cache[key] = (macro, time.monotonic())
+        return macro
+    
+    def _evict(self, name: Optional[str] = None, user_id: Optional[str] = None):
+        """Drop *name* from the get() cache, or everything when name is None."""
+        with self._cache_lock:
+            if name is None:
+                self._cache.clear()
+            else:
+                self._cache.pop((name, user_id), None)
     
     def add(self, macro: 'Macro', user_id: Optional[str] = None) -> 'Macro':
         """Add or update a macro."""
-        conn = self._get_connection()
-        try:
+        self._evict(macro.name, user_id)
+        with self._conn() as conn:
             with conn.cursor() as cur:
                 params = getattr(macro, 'params', []) or []
-                cur.execute("""
-                    INSERT INTO macros
-                    (user_id, name, commands, description, tags, params,
-                     created_at, updated_at, run_count, last_run)
-                    VALUES (%s, %s, %s, %s, %s, %s, %s, CURRENT_TIMESTAMP, %s, %s)
-                    ON CONFLICT (user_id, name)
-                    DO UPDATE SET
-                        commands = EXCLUDED.commands,
-                        description = EXCLUDED.description,
-                        tags = EXCLUDED.tags,
-                        params = EXCLUDED.params,
-                        updated_at = CURRENT_TIMESTAMP,
-                        run_count = EXCLUDED.run_count,
-                        last_run = EXCLUDED.last_run
-                """, (
+                self._run(cur, "cliara_upsert", (
                     user_id,
                     macro.name,
-                    json.dumps(macro.commands),
+                    Json(macro.commands),
                     macro.description,
                     macro.tags,
-                    json.dumps(params),
+                    Json(params),
                     macro.created,
                     macro.run_count,
                     macro.last_run
                 ))
-                conn.commit()
+                self._commit(conn)
             return macro
-        finally:
-            conn.close()
     
-    def delete(self, name: str, user_id: Optional[str] = None) -> bool:
-        """Delete a macro."""
-        conn = self._get_connection()
-        try:
+    def add_many(self, macros: List['Macro'], user_id: Optional[str] = None) -> int:
+        """Upsert many macros in one transaction.
+        
+        Batches of more than _COPY_MIN_ROWS go through COPY into a staging
+        table; smaller ones use execute_values, a page of rows per round trip.
+        
+        Returns:
+            Number of macros written
+        """
+        macros = list(macros)
+        if not macros:
+            return 0
+        self._evict()
+        with self._conn() as conn:
             with conn.cursor() as cur:
-                if user_id:
-                    cur.execute(
-                        "DELETE FROM macros WHERE name = %s AND user_id = %s",
-                        (name, user_id)
-                    )
+                if len(macros) > _COPY_MIN_ROWS:
+                    self._copy_upsert(cur, macros, user_id)
                 else:
-                    cur.execute(
-                        "DELETE FROM macros WHERE name = %s AND user_id IS NULL",
-                        (name,)
+                    rows = [
+                        (
+                            user_id,
+                            macro.name,
+                            Json(macro.commands),
+                            macro.description,
+                            macro.tags,
+                            Json(getattr(macro, 'params', []) or []),
+                            macro.created,
+                            macro.run_count,
+                            macro.last_run,
+                        )
+                        for macro in macros
+                    ]
+                    execute_values(
+                        cur,
+                        f"INSERT INTO macros ({_BULK_COLUMNS}) VALUES %s {_BULK_UPSERT}",
+                        rows,
+                        page_size=1000,
                     )
+                self._commit(conn)
+        return len(macros)
+    
+    def _copy_upsert(self, cur, macros: List['Macro'], user_id: Optional[str]):
+        """COPY *macros* into a temp staging table, then upsert them into macros."""
+        cur.execute(
+            "CREATE TEMP TABLE macros_stage (LIKE macros INCLUDING DEFAULTS) ON COMMIT DROP"
+        )
+        buf = io.StringIO()
+        for macro in macros:
+            fields = (
+                user_id,
+                macro.name,
+                _json_text(macro.commands),
+                macro.description,
+                _pg_array(macro.tags) if macro.tags is not None else None,
+                _json_text(getattr(macro, 'params', []) or []),
+                macro.created,
+                macro.run_count,
+                macro.last_run,
+            )
+            buf.write("\t".join(_copy_field(f) for f in fields))
+            buf.write("\n")
+        buf.seek(0)
+        cur.copy_expert(f"COPY macros_stage ({_BULK_COLUMNS}) FROM STDIN", buf)
+        cur.execute(
+            f"INSERT INTO macros ({_BULK_COLUMNS}) "
+            f"SELECT {_BULK_COLUMNS} FROM macros_stage {_BULK_UPSERT}"
+        )
+    
+    def delete(self, name: str, user_id: Optional[str] = None) -> bool:
+        """Delete a macro."""
+        self._evict(name, user_id)
+        with self._conn() as conn:
+            with conn.cursor() as cur:
+                self._run_for_user(cur, "cliara_delete", name, user_id)
                 deleted = cur.rowcount > 0
-                conn.commit()
+                self._commit(conn)
                 return deleted
-        finally:
-            conn.close()
     
     def list_all(self, user_id: Optional[str] = None) -> Dict[str, 'Macro']:
         """List all macros for a user."""
-        conn = self._get_connection()
-        try:
-            with conn.cursor(cursor_factory=RealDictCursor) as cur:
-                if user_id:
-                    cur.execute("""
-                        SELECT name, commands, description, tags, params,
-                               created_at, run_count, last_run
-                        FROM macros
-                        WHERE user_id = %s
-                        ORDER BY name
-                    """, (user_id,))
-                else:
-                    cur.execute("""
-                        SELECT name, commands, description, tags, params,
-                               created_at, run_count, last_run
-                        FROM macros
-                        WHERE user_id IS NULL
-                        ORDER BY name
-                    """)
+        return dict(self.iter_all(user_id=user_id))
+    
+    def iter_all(self, user_id: Optional[str] = None) -> Iterator[Tuple[str, 'Macro']]:
+        """Yield (name, macro) for a user, streamed from a server-side cursor.
+        
+        Rows arrive _STREAM_PAGE_ROWS at a time, so memory stays flat however
+        many macros there are. The pooled connection is held until the
+        iterator is exhausted or closed.
+        """
+        with self._conn() as conn:
+            with conn.cursor(name='macro_list_stream') as cur:
+                cur.itersize = _STREAM_PAGE_ROWS
+                cur.execute(f"""
+                    SELECT {_MACRO_COLUMNS}
+                    FROM macros
+                    WHERE {_user_filter(user_id)}
+                    ORDER BY name
+                """, {"user_id": user_id})
                 
-                rows = cur.fetchall()
-                return {row['name']: self._row_to_macro(row) for row in rows}
-        finally:
-            conn.close()
+                for row in cur:
+                    yield row.name, self._row_to_macro(row)
     
     def search(self, query: str, user_id: Optional[str] = None) -> List['Macro']:
         """Full-text search macros."""
-        conn = self._get_connection()
-        try:
-            with conn.cursor(cursor_factory=RealDictCursor) as cur:
-                # Use PostgreSQL full-text search
-                search_query = f"%{query}%"
-                
-                if user_id:
-                    cur.execute("""
-                        SELECT name, commands, description, tags, params,
-                               created_at, run_count, last_run
-                        FROM macros
-                        WHERE user_id = %s
-                        AND (
-                            name ILIKE %s OR
-                            description ILIKE %s OR
-                            EXISTS (
-                                SELECT 1 FROM unnest(tags) AS tag
-                                WHERE tag ILIKE %s
-                            )
-                        )
-                        ORDER BY
-                            CASE
-                                WHEN name ILIKE %s THEN 1
-                                WHEN description ILIKE %s THEN 2
-                                ELSE 3
-                            END,
-                            name
-                    """, (user_id, search_query, search_query, search_query,
-                          search_query, search_query))
-                else:
-                    cur.execute("""
-                        SELECT name, commands, description, tags, params,
-                               created_at, run_count, last_run
-                        FROM macros
-                        WHERE user_id IS NULL
-                        AND (
-                            name ILIKE %s OR
-                            description ILIKE %s OR
-                            EXISTS (
-                                SELECT 1 FROM unnest(tags) AS tag
-                                WHERE tag ILIKE %s
-                            )
-                        )
-                        ORDER BY
-                            CASE
-                                WHEN name ILIKE %s THEN 1
-                                WHEN description ILIKE %s THEN 2
-                                ELSE 3
-                            END,
-                            name
-                    """, (search_query, search_query, search_query,
-                          search_query, search_query))
+        with self._conn() as conn:
+            with conn.cursor() as cur:
+                # Substring match; the ILIKE arms are served by the trigram indexes.
+                args = {"q": f"%{query}%", "user_id": user_id}
+                # Rank is computed once per hit in the select list and sorted on.
+                cur.execute(f"""
+                    SELECT {_MACRO_COLUMNS},
+                           CASE
+                               WHEN name ILIKE %(q)s THEN 1
+                               WHEN description ILIKE %(q)s THEN 2
+                               ELSE 3
+                           END AS rank
+                    FROM macros
+                    WHERE {_user_filter(user_id)}
+                    AND (
+                        name ILIKE %(q)s OR
+                        description ILIKE %(q)s OR
+                        cliara_tags_text(tags) ILIKE %(q)s
+                    )
+                    ORDER BY rank, name
+                """, args)
                 
                 rows = cur.fetchall()
                 return [self._row_to_macro(row) for row in rows]
-        finally:
-            conn.close()
     
     def exists(self, name: str, user_id: Optional[str] = None) -> bool:
         """Check if macro exists."""
-        conn = self._get_connection()
-        try:
-            with conn.cursor() as cur:
-                if user_id:
-                    cur.execute(
-                        "SELECT 1 FROM macros WHERE name = %s AND user_id = %s LIMIT 1",
-                        (name, user_id)
-                    )
-                else:
-                    cur.execute(
-                        "SELECT 1 FROM macros WHERE name = %s AND user_id IS NULL LIMIT 1",
-                        (name,)
-                    )
-                return cur.fetchone() is not None
-        finally:
-            conn.close()
+        return self.get(name, user_id) is not None
     
     def count(self, user_id: Optional[str] = None) -> int:
-        """Get total count of macros."""
-        conn = self._get_connection()
-        try:
+        """Get total count of macros (the planner's estimate once it is large)."""
+        with self._conn() as conn:
             with conn.cursor() as cur:
-                if user_id:
-                    cur.execute(
-                        "SELECT COUNT(*) FROM macros WHERE user_id = %s",
-                        (user_id,)
-                    )
-                else:
-                    cur.execute(
-                        "SELECT COUNT(*) FROM macros WHERE user_id IS NULL"
-                    )
+                cur.execute(
+                    f"EXPLAIN (FORMAT JSON) SELECT 1 FROM macros WHERE {_user_filter(user_id)}",
+                    {"user_id": user_id}
+                )
+                plan = cur.fetchone()[0]
+        if isinstance(plan, str):
+            plan = json.loads(plan)
+        estimate = int(plan[0]["Plan"]["Plan Rows"])
+        if estimate > _EXACT_COUNT_MAX:
+            return estimate
+        return self.count_exact(user_id)
+    
+    def count_exact(self, user_id: Optional[str] = None) -> int:
+        """Get the exact count of macros (scans the user's rows)."""
+        with self._conn() as conn:
+            with conn.cursor() as cur:
+                cur.execute(
+                    f"SELECT COUNT(*) FROM macros WHERE {_user_filter(user_id)}",
+                    {"user_id": user_id}
+                )
                 return cur.fetchone()[0]
-        finally:
-            conn.close()
     
-    def _row_to_macro(self, row: dict) -> 'Macro':
+    def _row_to_macro(self, row: tuple) -> 'Macro':
         """Convert database row to Macro object."""
-        from cliara.macros import Macro  # Import here to avoid circular import
+        Macro = self._macro_cls
+        if Macro is None:
+            from cliara.macros import Macro  # Import here to avoid circular import
+            self._macro_cls = Macro
         
-        # JSONB is returned as dict/list by psycopg2, but we need to ensure it's a list
-        commands = row['commands']
-        if isinstance(commands, str):
-            commands = json.loads(commands)
-        elif not isinstance(commands, list):
-            commands = list(commands) if commands else []
-
-        raw_params = row.get('params') or []
-        if isinstance(raw_params, str):
-            raw_params = json.loads(raw_params)
-        params = list(raw_params) if raw_params else []
+        # psycopg2 decodes JSONB to lists; anything else is a legacy/odd row.
+        commands = row.commands
+        if type(commands) is not list:
+            commands = _as_list(commands)
+        params = row.params
+        if type(params) is not list:
+            params = _as_list(params)
+        tags = row.tags
+        if type(tags) is not list:
+            tags = list(tags) if tags else []
 
         macro = Macro(
-            name=row['name'],
+            name=row.name,
             commands=commands,
-            description=row['description'] or "",
-            tags=list(row['tags']) if row['tags'] else [],
+            description=row.description or "",
+            tags=tags,
             params=params,
-            created=row['created_at'].isoformat() if row['created_at'] else None
+            created=row.created_at.isoformat() if row.created_at else None
         )
-        macro.run_count = row['run_count'] or 0
-        macro.last_run = row['last_run'].isoformat() if row['last_run'] else None
+        macro.run_count = row.run_count or 0
+        macro.last_run = row.last_run.isoformat() if row.last_run else None
         return macro
     
     def get_public_macros(self, limit: int = 100) -> List['Macro']:
         """Get public macros (for marketplace feature)."""
-        conn = self._get_connection()
-        try:
-            with conn.cursor(cursor_factory=RealDictCursor) as cur:
+        with self._conn() as conn:
+            with conn.cursor() as cur:
                 cur.execute("""
                     SELECT name, commands, description, tags, params,
                            created_at, run_count, last_run
@@ -367,13 +644,11 @@ class PostgresStorage(StorageBackend):
                 
                 rows = cur.fetchall()
                 return [self._row_to_macro(row) for row in rows]
-        finally:
-            conn.close()
     
     def set_public(self, name: str, user_id: str, is_public: bool) -> bool:
         """Set macro public/private status."""
-        conn = self._get_connection()
-        try:
+        self._evict(name, user_id)
+        with self._conn() as conn:
             with conn.cursor() as cur:
                 cur.execute("""
                     UPDATE macros
@@ -381,7 +656,5 @@ class PostgresStorage(StorageBackend):
                     WHERE name = %s AND user_id = %s
                 """, (is_public, name, user_id))
                 updated = cur.rowcount > 0
-                conn.commit()
+                self._commit(conn)
                 return updated
-        finally:
-            conn.close()
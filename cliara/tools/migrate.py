@@ -4,6 +4,7 @@ Migration tool to migrate macros from JSON to PostgreSQL.
 
 import json
 import sys
+from concurrent.futures import ThreadPoolExecutor, as_completed
 from pathlib import Path
 from typing import Optional
 
@@ -13,6 +14,10 @@ from cliara.storage.postgres_backend import PostgresStorage
 from cliara.config import Config
 
 
+# Macros per add_many call (and so per transaction) during migration.
+_MIGRATE_CHUNK_SIZE = 10_000
+
+
 def migrate_json_to_postgres(
     json_path: Path,
     postgres_config: dict,
@@ -53,19 +58,40 @@ def migrate_json_to_postgres(
         print("\nMake sure PostgreSQL is running and credentials are correct.")
         return 0
     
-    # Migrate each macro
+    # Migrate in chunks, each one add_many transaction, written in parallel
+    # over the storage's connection pool.
+    macros = list(json_macros.values())
+    chunks = [
+        macros[i:i + _MIGRATE_CHUNK_SIZE]
+        for i in range(0, len(macros), _MIGRATE_CHUNK_SIZE)
+    ]
     migrated = 0
     failed = 0
     
     print("\nMigrating macros...")
-    for name, macro in json_macros.items():
-        try:
-            postgres_storage.add(macro)
-            migrated += 1
-            print(f"  ✓ {name}")
-        except Exception as e:
-            failed += 1
-            print(f"  ✗ {name}: {e}")
+    try:
+        workers = min(len(chunks), postgres_storage.pool_size)
+        with ThreadPoolExecutor(max_workers=workers) as pool:
+            futures = {pool.submit(postgres_storage.add_many, chunk): chunk for chunk in chunks}
+            for future in as_completed(futures):
+                chunk = futures[future]
+                label = chunk[0].name if len(chunk) == 1 else f"{chunk[0].name} .. {chunk[-1].name}"
+                try:
+                    migrated += future.result()
+                    print(f"  ✓ {label} ({len(chunk)})")
+                except Exception as e:
+                    # A failure rolls back only its own chunk; retry its
+                    # macros one at a time so only the bad ones fail.
+                    print(f"  ! {label} ({len(chunk)}): {e}; retrying one by one")
+                    for macro in chunk:
+                        try:
+                            postgres_storage.add(macro)
+                            migrated += 1
+                        except Exception as err:
+                            failed += 1
+                            print(f"  ✗ {macro.name}: {err}")
+    finally:
+        postgres_storage.close()
     
     print(f"\nMigration complete: {migrated} migrated, {failed} failed")
     return migrated
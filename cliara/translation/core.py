@@ -10,9 +10,12 @@ Covers the most common Unix <-> Windows translations:
   Windows -> Unix    (CMD & PowerShell cmdlets -> bash/zsh equivalents)
 """
 
+import functools
+import os
 import re
 import shlex
 import platform
+import time
 from shutil import which
 from typing import Optional, Tuple, List, Dict, Callable
 
@@ -27,6 +30,11 @@ def is_powershell(shell_path: str) -> bool:
     return "powershell" in lower or "pwsh" in lower
 
 
+# Pipeline / chain separators; get_base_command only needs what precedes the first.
+_CHAIN_SEP_RE = re.compile(r"\||&&|;")
+
+
+@functools.lru_cache(maxsize=1024)
 def get_base_command(command: str) -> Optional[str]:
     """
     Extract the base command name from a full command string.
@@ -39,7 +47,7 @@ def get_base_command(command: str) -> Optional[str]:
         return None
 
     # Take only the first command in a pipeline / chain
-    first_cmd = re.split(r"\||\&\&|;", command)[0].strip()
+    first_cmd = _CHAIN_SEP_RE.split(command, maxsplit=1)[0].strip()
 
     parts = first_cmd.split()
     for part in parts:
@@ -51,9 +59,28 @@ def get_base_command(command: str) -> Optional[str]:
     return None
 
 
+# PATH lookups are cached per (name, PATH) and re-checked at most this often,
+# so a tool installed mid-session is picked up shortly after.
+_WHICH_TTL_S = 30.0
+
+
+@functools.lru_cache(maxsize=512)
+def _cached_which(cmd_name: str, path: str, pathext: str, cwd: str, bucket: int) -> bool:
+    return which(cmd_name) is not None
+
+
 def command_exists(cmd_name: str) -> bool:
     """Return True if *cmd_name* is found on the system PATH."""
-    return which(cmd_name) is not None
+    if os.sep in cmd_name or (os.altsep and os.altsep in cmd_name):
+        return which(cmd_name) is not None
+    return _cached_which(
+        cmd_name,
+        os.environ.get("PATH", ""),
+        os.environ.get("PATHEXT", ""),
+        # Windows also searches the current directory first.
+        os.getcwd() if os.name == "nt" else "",
+        int(time.monotonic() // _WHICH_TTL_S),
+    )
 
 
 # ---------------------------------------------------------------------------